@@ -0,0 +1,85 @@
+"""
+Memory blocks allocated by move generation, per get_valid_moves call and per make/undo pair.
+The move cache is disabled so every call runs the generator.
+
+Blocks are counted by sampling sys.getallocatedblocks() on every (Python and C) call/return and adding up the
+increases, which is a close lower bound on the number of allocations. Peak bytes is the high-water mark traced by
+tracemalloc during the call.
+
+Usage:
+    python benchmarks/allocations.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chess.starting_pieces import STARTING_FEN  # noqa: E402
+from chess.state import GameState  # noqa: E402
+
+POSITIONS = {
+    "startpos": STARTING_FEN,
+    "kiwipete": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "position6": "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+}
+CALLS = 200
+
+
+def allocated_blocks(fn: Callable) -> int:
+    """ Memory blocks allocated while running fn """
+    total, last = 0, sys.getallocatedblocks()
+
+    def profile(frame, event, arg):
+        nonlocal total, last
+        now = sys.getallocatedblocks()
+        if now > last:
+            total += now - last
+        last = now
+
+    sys.setprofile(profile)
+    try:
+        fn()
+    finally:
+        sys.setprofile(None)
+    return total
+
+
+def peak_bytes(fn: Callable) -> int:
+    """ Traced memory high-water mark while running fn """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - before
+
+
+def microseconds(fn: Callable) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        fn()
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+def main() -> None:
+    print(f"{'position':<10} {'':<16} {'blocks':>8} {'peak bytes':>11} {'us':>9}")
+    for name, fen in POSITIONS.items():
+        state = GameState.from_fen(fen)
+        state.move_cache.max_entries = 0
+        moves = state.get_valid_moves()
+
+        def make_undo() -> None:
+            for move in moves:
+                state._make_move(move)
+                state.undo_move()
+
+        for label, fn, per in (("get_valid_moves", state.get_valid_moves, 1), ("make/undo", make_undo, len(moves))):
+            blocks = allocated_blocks(fn) / per
+            print(f"{name:<10} {label:<16} {blocks:>8.1f} {peak_bytes(fn) / per:>11.0f} {microseconds(fn) / per:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,17 +16,24 @@ class Game:
     def __init__(self):
         self.state = GameState()
         self.settings = Settings
-        self.gui = GUI(settings=self.settings, board=self.state.board)
+        self.gui = GUI(settings=self.settings, state=self.state)
         self.event_handler = EventHandler(state=self.state)
         self.running = True
 
     def start(self) -> None:
-        """ Main interface used to start the game of chess """
+        """
+        Main interface used to start the game of chess.
+        The loop sleeps until there's an event, then repaints only what changed, at most MAX_FPS times a second.
+        """
         pygame.init()
+        pygame.event.set_blocked(pygame.MOUSEMOTION)  # Nothing follows the mouse, don't wake up for it
+        clock = pygame.time.Clock()
         logger.debug("Game started")
 
+        self.gui.draw()
+        pygame.display.flip()
         while self.running:
-            for e in pygame.event.get():
+            for e in [pygame.event.wait(), *pygame.event.get()]:
                 if e.type == pygame.QUIT:
                     self.running = False
                 elif e.type == pygame.MOUSEBUTTONDOWN:
@@ -42,9 +49,13 @@ class Game:
                         self.event_handler.right_click_square(row, col)
                 elif e.type == pygame.KEYDOWN:
                     self.event_handler.press_key(key=e.key)
+                elif e.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.gui.redraw()
 
-            self.gui.draw()
-            pygame.display.flip()
+            dirty = self.gui.draw()
+            if dirty:
+                pygame.display.update(dirty)
+            clock.tick(self.settings.MAX_FPS)
 
 
 def main():
@@ -0,0 +1,248 @@
+"""
+Vectorized evaluation and move generation of many positions at once with NumPy, for bulk game analysis.
+
+Positions are encoded in one of two int8 layouts:
+    squares: (N, 64), each square holds Piece.code + 1 (1-6 white pawn..king, 7-12 black pawn..king), 0 when empty
+    planes: (N, 12, 64), one 0/1 plane per Piece.code, the same layout as GameState.bitboards
+Squares are indexed like the bitboards (row * 8 + col, a8 first). The scores are the material plus piece-square
+table values of evaluation.py, in centipawns.
+"""
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .bitboard import (
+    BISHOP,
+    BLACK,
+    CASTLING_MOVES,
+    DIAGONAL_STEPS,
+    KING,
+    KING_ATTACKS,
+    KNIGHT,
+    KNIGHT_ATTACKS,
+    PAWN,
+    PAWN_ATTACKS,
+    QUEEN,
+    ROOK,
+    STRAIGHT_STEPS,
+    WHITE,
+)
+from .evaluation import PIECE_SQUARE_VALUES
+from .move import CASTLE, EN_PASSANT, PROMOTION
+from .state import GameState
+from .utils import EMPTY_SQUARE, Board
+
+# Score of each piece on each square from white's point of view (black pieces count negative), with a row of
+# zeros for the empty squares: [Piece.code + 1][square]
+SQUARE_WEIGHTS = np.concatenate(
+    [
+        np.zeros((1, 64), dtype=np.int32),
+        np.array(PIECE_SQUARE_VALUES[WHITE], dtype=np.int32),
+        -np.array(PIECE_SQUARE_VALUES[BLACK], dtype=np.int32),
+    ]
+)
+
+_SQUARES = np.arange(64)
+_PLANE_CODES = np.arange(1, 13, dtype=np.int8)  # Piece.code + 1 of each plane
+
+
+def encode_board(board: Board) -> np.ndarray:
+    """ (64,) squares encoding of an 8x8 board matrix, e.g. GameState.board """
+    return np.array(
+        [0 if piece == EMPTY_SQUARE else piece.code + 1 for row in board for piece in row],
+        dtype=np.int8,
+    )
+
+
+def encode_squares(states: Iterable[GameState]) -> np.ndarray:
+    """ (N, 64) squares encoding of the positions """
+    return np.array(
+        [[0 if piece == EMPTY_SQUARE else piece.code + 1 for piece in state.mailbox] for state in states],
+        dtype=np.int8,
+    ).reshape(-1, 64)
+
+
+def encode_planes(states: Iterable[GameState]) -> np.ndarray:
+    """ (N, 12, 64) planes encoding of the positions, unpacked straight from the bitboards """
+    bitboards = np.array([state.bitboards for state in states], dtype="<u8").reshape(-1, 12)
+    bits = np.unpackbits(bitboards.view(np.uint8).reshape(-1, 12, 8), axis=2, bitorder="little")
+    return bits.view(np.int8)
+
+
+def planes_to_squares(planes: np.ndarray) -> np.ndarray:
+    """ (N, 12, 64) planes to (N, 64) squares, the plane a square is set in gives its piece code """
+    return np.einsum("npq,p->nq", planes, _PLANE_CODES)
+
+
+def evaluate_batch(positions: np.ndarray, white_to_move: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Score N positions in (N, 64) squares or (N, 12, 64) planes layout, returns an (N,) int32 array.
+    Scores are from white's point of view, or from the player to move's if the white_to_move (N,) bool array is given.
+    """
+    positions = np.asarray(positions)
+    if positions.ndim == 3 and positions.shape[1:] == (12, 64):
+        positions = planes_to_squares(positions)
+    elif positions.ndim != 2 or positions.shape[1] != 64:
+        raise ValueError(f"Expected an (N, 64) or (N, 12, 64) array, got {positions.shape}")
+
+    # Look up every (piece, square) pair's score in one gather, then add up the rows
+    scores = SQUARE_WEIGHTS[positions, _SQUARES].sum(axis=1, dtype=np.int32)
+
+    if white_to_move is not None:
+        scores = np.where(white_to_move, scores, -scores)
+    return scores
+
+
+class BatchMoves(NamedTuple):
+    """ Moves of a batch of positions: moves[i] (packed like move.py) belongs to position boards[i] """
+
+    counts: np.ndarray  # (N,) number of moves of each position
+    boards: np.ndarray  # (M,) index of the position each move belongs to, ascending
+    moves: np.ndarray  # (M,) uint16 packed moves
+
+
+def _mask_table(table: List[int]) -> np.ndarray:
+    """ (64, 64) bool from-square -> to-square masks of a bitboard attack table """
+    return np.array([[bb >> square & 1 for square in range(64)] for bb in table], dtype=bool)
+
+
+def _ray_squares(d_row: int, d_col: int) -> np.ndarray:
+    """ (64, 7) squares along the ray from each square in order, padded with the off-board square 64 """
+    rays = np.full((64, 7), 64, dtype=np.intp)
+    for square in range(64):
+        row, col = divmod(square, 8)
+        for step in range(7):
+            row, col = row + d_row, col + d_col
+            if not (0 <= row <= 7 and 0 <= col <= 7):
+                break
+            rays[square, step] = row * 8 + col
+    return rays
+
+
+KNIGHT_MASKS = _mask_table(KNIGHT_ATTACKS)
+KING_MASKS = _mask_table(KING_ATTACKS)
+PAWN_MASKS = (_mask_table(PAWN_ATTACKS[WHITE]), _mask_table(PAWN_ATTACKS[BLACK]))
+STRAIGHT_RAYS = [_ray_squares(d_row, d_col) for d_row, d_col in STRAIGHT_STEPS]
+DIAGONAL_RAYS = [_ray_squares(d_row, d_col) for d_row, d_col in DIAGONAL_STEPS]
+
+_BATCH_CHUNK = 4096  # Positions generated at once, bounds the size of the (pieces, 65) targets matrix
+
+
+def generate_moves_batch(
+    positions: np.ndarray,
+    white_to_move: np.ndarray,
+    castling_rights: Optional[np.ndarray] = None,
+    en_passant: Optional[np.ndarray] = None,
+) -> BatchMoves:
+    """
+    Pseudo-legal moves of the player to move in N positions, (N, 64) squares or (N, 12, 64) planes layout.
+    castling_rights: (N,) bit flags as in bitboard.py, no castling if not given.
+    en_passant: (N,) en passant square or -1, no en passant if not given.
+    Pseudo-legal as in Piece.possible_moves: moves may leave the king in check. Castling only needs the right and
+    empty squares between the king and rook, whether the king passes through check is left to the legality test.
+    Moves of a position come out ordered by starting then destination square.
+    """
+    positions = np.asarray(positions)
+    if positions.ndim == 3 and positions.shape[1:] == (12, 64):
+        positions = planes_to_squares(positions)
+    elif positions.ndim != 2 or positions.shape[1] != 64:
+        raise ValueError(f"Expected an (N, 64) or (N, 12, 64) array, got {positions.shape}")
+
+    count = len(positions)
+    white_to_move = np.asarray(white_to_move, dtype=bool)
+    castling_rights = np.zeros(count, dtype=np.uint8) if castling_rights is None else np.asarray(castling_rights)
+    en_passant = np.full(count, -1, dtype=np.int8) if en_passant is None else np.asarray(en_passant)
+
+    chunks = [
+        _generate_chunk(
+            positions[start : start + _BATCH_CHUNK],
+            white_to_move[start : start + _BATCH_CHUNK],
+            castling_rights[start : start + _BATCH_CHUNK],
+            en_passant[start : start + _BATCH_CHUNK],
+        )
+        for start in range(0, count, _BATCH_CHUNK)
+    ]
+    boards = np.concatenate([boards + start for (boards, _), start in zip(chunks, range(0, count, _BATCH_CHUNK))])
+    moves = np.concatenate([moves for _, moves in chunks])
+    return BatchMoves(counts=np.bincount(boards, minlength=count), boards=boards, moves=moves)
+
+
+def _generate_chunk(
+    squares: np.ndarray, white_to_move: np.ndarray, castling_rights: np.ndarray, en_passant: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Board indexes and packed moves of a chunk of positions, see generate_moves_batch """
+    count = len(squares)
+    # Piece kind of every square for the player to move (-1 if empty or the opponent's), and the occupancy masks
+    kinds = squares.astype(np.int8) - np.where(white_to_move, 1, 7).astype(np.int8)[:, None]
+    own = (kinds >= 0) & (kinds < 6)
+    occupied = squares != 0
+    empty = ~occupied
+    occupied_padded = np.concatenate([occupied, np.ones((count, 1), dtype=bool)], axis=1)
+
+    # Work on the list of the pieces of the player to move: targets[i, to] for piece i, which is on board[i], start[i].
+    # The extra column is the off-board square the padded rays point at.
+    board, start = np.nonzero(own)
+    kind = kinds[board, start]
+    targets = np.zeros((len(board), 65), dtype=bool)
+
+    for leaper, masks in ((KNIGHT, KNIGHT_MASKS), (KING, KING_MASKS)):
+        pieces = np.nonzero(kind == leaper)[0]
+        targets[pieces, :64] = masks[start[pieces]]
+
+    # Sliders: along each ray, a square is reachable if no square before it is occupied
+    for rays, pieces in (
+        (STRAIGHT_RAYS, np.nonzero((kind == ROOK) | (kind == QUEEN))[0]),
+        (DIAGONAL_RAYS, np.nonzero((kind == BISHOP) | (kind == QUEEN))[0]),
+    ):
+        for ray in rays:
+            ray_squares = ray[start[pieces]]  # (pieces, 7)
+            blocked = occupied_padded[board[pieces, None], ray_squares]
+            reachable = np.ones_like(blocked)
+            reachable[:, 1:] = ~np.logical_or.accumulate(blocked[:, :-1], axis=1)
+            targets[pieces[:, None], ray_squares] |= reachable
+
+    targets = targets[:, :64] & ~own[board]
+
+    # Pawns capture enemy pieces and onto the en passant square, and push onto empty squares
+    pieces = np.nonzero(kind == PAWN)[0]
+    pawn_board, pawn_start = board[pieces], start[pieces]
+    white_pawn = white_to_move[pawn_board]
+    capturable = occupied & ~own
+    has_ep = en_passant >= 0
+    capturable[np.nonzero(has_ep)[0], en_passant[has_ep]] = True
+    attacks = np.where(white_pawn[:, None], PAWN_MASKS[WHITE][pawn_start], PAWN_MASKS[BLACK][pawn_start])
+    targets[pieces] = attacks & capturable[pawn_board]
+
+    step = np.where(white_pawn, -8, 8)
+    one_up = pawn_start + step
+    can_push = empty[pawn_board, one_up]
+    targets[pieces[can_push], one_up[can_push]] = True
+    two_up = one_up + step
+    on_start_row = np.where(white_pawn, pawn_start >> 3 == 6, pawn_start >> 3 == 1)
+    can_push &= on_start_row
+    can_push[can_push] &= empty[pawn_board[can_push], two_up[can_push]]
+    targets[pieces[can_push], two_up[can_push]] = True
+
+    # Castling, the rights say the king and rook are still on their starting squares
+    kings = np.nonzero(kind == KING)[0]
+    for side in (WHITE, BLACK):
+        for right, king_start, king_dest, must_be_empty, _ in CASTLING_MOVES[side]:
+            between = [square for square in range(64) if must_be_empty >> square & 1]
+            allowed = (castling_rights & right != 0) & empty[:, between].all(axis=1)
+            castles = kings[(start[kings] == king_start) & allowed[board[kings]]]
+            targets[castles, king_dest] = True
+
+    piece, dest = np.nonzero(targets)
+    board, start, moving = board[piece], start[piece], kind[piece]
+    moves = (start | dest << 6).astype(np.uint16)
+
+    # Flags. Promotions become four moves each: queen, rook, bishop, knight like Pawn.add_move_codes
+    is_pawn = moving == PAWN
+    moves[is_pawn & (dest == en_passant[board])] |= EN_PASSANT << 12
+    moves[(moving == KING) & (np.abs(dest - start) == 2)] |= CASTLE << 12
+    promotes = is_pawn & ((dest < 8) | (dest >= 56))
+    repeats = np.where(promotes, 4, 1)
+    board, moves, promotes = np.repeat(board, repeats), np.repeat(moves, repeats), np.repeat(promotes, repeats)
+    promotion_flags = np.array([PROMOTION + kind - KNIGHT for kind in (QUEEN, ROOK, BISHOP, KNIGHT)], dtype=np.uint16)
+    moves[promotes] |= np.tile(promotion_flags, np.count_nonzero(promotes) // 4) << 12
+    return board, moves
@@ -0,0 +1,116 @@
+"""
+Bitboard primitives used by GameState and the piece move generators.
+
+A bitboard is a 64-bit integer with one bit per square. Square indexes follow the board matrix used everywhere
+else in the project: index = row * 8 + col, so a8 is bit 0 and h1 is bit 63.
+"""
+from typing import Iterator, List, Tuple
+
+FULL = 0xFFFF_FFFF_FFFF_FFFF
+
+# Piece kinds and sides. A piece lives in GameState.bitboards[side * 6 + kind]
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+WHITE, BLACK = 0, 1
+
+# Castling rights bit flags
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+ALL_CASTLING_RIGHTS = WHITE_KINGSIDE | WHITE_QUEENSIDE | BLACK_KINGSIDE | BLACK_QUEENSIDE
+
+
+def square_index(row: int, col: int) -> int:
+    """ Row/col on the board matrix to a bitboard square index """
+    return row * 8 + col
+
+
+def iter_bits(bb: int) -> Iterator[int]:
+    """ Yield the square index of every set bit, lowest first """
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def _leaper_table(steps: Tuple[Tuple[int, int], ...]) -> List[int]:
+    """ For every square, the bitboard of the squares one of the (row, col) steps lands on """
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        attacks = 0
+        for d_row, d_col in steps:
+            if 0 <= row + d_row <= 7 and 0 <= col + d_col <= 7:
+                attacks |= 1 << square_index(row + d_row, col + d_col)
+        table.append(attacks)
+    return table
+
+
+def _ray_table(d_row: int, d_col: int) -> List[int]:
+    """ For every square, the bitboard of the squares from it (exclusive) to the edge of the board in one direction """
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        ray = 0
+        row, col = row + d_row, col + d_col
+        while 0 <= row <= 7 and 0 <= col <= 7:
+            ray |= 1 << square_index(row, col)
+            row, col = row + d_row, col + d_col
+        table.append(ray)
+    return table
+
+
+# Attack tables, computed once at import. Index them with the square the piece is on.
+KNIGHT_ATTACKS = _leaper_table(((1, 2), (-1, 2), (1, -2), (-1, -2), (2, 1), (-2, 1), (2, -1), (-2, -1)))
+KING_ATTACKS = _leaper_table(((0, -1), (0, 1), (1, -1), (1, 0), (1, 1), (-1, -1), (-1, 0), (-1, 1)))
+PAWN_ATTACKS = (_leaper_table(((-1, -1), (-1, 1))), _leaper_table(((1, -1), (1, 1))))  # [side][square]
+
+STRAIGHT_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))  # (row, col) steps
+DIAGONAL_STEPS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+# Slider directions: (ray table, whether the squares along the ray have increasing indexes).
+# The nearest blocker on a ray is its lowest set bit when increasing, the highest one otherwise.
+ROOK_DIRECTIONS = tuple((_ray_table(d_row, d_col), d_row * 8 + d_col > 0) for d_row, d_col in STRAIGHT_STEPS)
+BISHOP_DIRECTIONS = tuple((_ray_table(d_row, d_col), d_row * 8 + d_col > 0) for d_row, d_col in DIAGONAL_STEPS)
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+
+def sliding_attacks(sq: int, occupied: int, directions: tuple) -> int:
+    """
+    Squares a slider on sq attacks along the given directions. A ray stops at (and includes) the first blocker,
+    so the part of the ray behind the blocker is cut off with the blocker's own ray.
+    """
+    attacks = 0
+    for rays, increasing in directions:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1 if increasing else blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+# Every square a rook/bishop on the square would see on an empty board, a cheap first test before walking the rays
+ROOK_RAYS = [sliding_attacks(square, 0, ROOK_DIRECTIONS) for square in range(64)]
+BISHOP_RAYS = [sliding_attacks(square, 0, BISHOP_DIRECTIONS) for square in range(64)]
+
+# Castling: (right, king start, king destination, squares that must be empty, squares the king must not be attacked on)
+CASTLING_MOVES = {
+    WHITE: (
+        (WHITE_KINGSIDE, 60, 62, (1 << 61) | (1 << 62), (60, 61, 62)),
+        (WHITE_QUEENSIDE, 60, 58, (1 << 57) | (1 << 58) | (1 << 59), (60, 59, 58)),
+    ),
+    BLACK: (
+        (BLACK_KINGSIDE, 4, 6, (1 << 5) | (1 << 6), (4, 5, 6)),
+        (BLACK_QUEENSIDE, 4, 2, (1 << 1) | (1 << 2) | (1 << 3), (4, 3, 2)),
+    ),
+}
+
+# King destination -> (rook start, rook destination) for a castling move
+CASTLING_ROOK_MOVES = {62: (63, 61), 58: (56, 59), 6: (7, 5), 2: (0, 3)}
+
+# Castling rights kept when a piece moves from/to the square (moving the king or a rook, or capturing a rook)
+CASTLING_RIGHTS_MASK = [ALL_CASTLING_RIGHTS] * 64
+CASTLING_RIGHTS_MASK[60] = BLACK_KINGSIDE | BLACK_QUEENSIDE
+CASTLING_RIGHTS_MASK[63] = ALL_CASTLING_RIGHTS ^ WHITE_KINGSIDE
+CASTLING_RIGHTS_MASK[56] = ALL_CASTLING_RIGHTS ^ WHITE_QUEENSIDE
+CASTLING_RIGHTS_MASK[4] = WHITE_KINGSIDE | WHITE_QUEENSIDE
+CASTLING_RIGHTS_MASK[7] = ALL_CASTLING_RIGHTS ^ BLACK_KINGSIDE
+CASTLING_RIGHTS_MASK[0] = ALL_CASTLING_RIGHTS ^ BLACK_QUEENSIDE
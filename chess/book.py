@@ -0,0 +1,153 @@
+"""
+Opening book: a binary file of (position key, move, weight) records sorted by key, built from a game collection.
+
+The reader maps the file into memory and binary searches it, nothing is loaded up front. Processes that open the same
+book share its pages through the OS page cache instead of each holding a copy.
+
+File layout, little endian: the 8 byte magic BOOK_MAGIC, then 12 byte records (see RECORD) of
+    key: Zobrist key of the position (see zobrist.py), which covers the board, side to move, castling and en passant
+    move: packed move (see move.py)
+    weight: how often the move was played in the position, capped at 65535
+sorted by key, and by weight (highest first) for the moves of the same position.
+
+Usage:
+    python -m chess.book games.pgn.gz --output book.bin --plies 16 --min-games 3
+"""
+import argparse
+import logging
+import mmap
+import random
+import struct
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .move import Move
+from .pgn import PgnError, from_san, read_games
+from .state import GameState
+
+logger = logging.getLogger(__name__)
+
+BOOK_MAGIC = b"CHSBOOK1"
+RECORD = struct.Struct("<QHH")
+MAX_WEIGHT = 0xFFFF
+
+
+def build_book(
+    games: Iterable[Tuple[Dict[str, str], List[str]]], path: str, plies: int = 16, min_games: int = 1
+) -> int:
+    """
+    Write the book of the first plies moves of the games (headers and SAN moves, as read_games yields them).
+    A game is used up to its first illegal move, and skipped if its FEN header is bad. Moves played in fewer than
+    min_games games are left out.
+    Returns the number of records written.
+    """
+    counts = Counter()
+    for headers, sans in games:
+        try:
+            state = GameState(fen=headers.get("FEN"), move_cache_size=0)
+        except ValueError as error:
+            logger.debug(f"Skipping a game: {error}")
+            continue
+        for san in sans[:plies]:
+            try:
+                move = from_san(state, san)
+            except PgnError:
+                break
+            counts[state.key, move.code] += 1
+            state._make_move(move)
+
+    records = sorted(
+        ((key, code, min(count, MAX_WEIGHT)) for (key, code), count in counts.items() if count >= min_games),
+        key=lambda record: (record[0], -record[2], record[1]),
+    )
+    with open(path, "wb") as file:
+        file.write(BOOK_MAGIC)
+        for record in records:
+            file.write(RECORD.pack(*record))
+    return len(records)
+
+
+class _Keys:
+    """ Read only sequence view of the record keys, for bisect """
+
+    def __init__(self, data: mmap.mmap, length: int):
+        self.data = data
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> int:
+        return RECORD.unpack_from(self.data, len(BOOK_MAGIC) + index * RECORD.size)[0]
+
+
+class OpeningBook:
+    """
+    Memory mapped book file, looked up with a binary search over the record keys: O(log n) per position.
+    Use as a context manager, or call close().
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[: len(BOOK_MAGIC)] != BOOK_MAGIC or (len(self._data) - len(BOOK_MAGIC)) % RECORD.size:
+            self._data.close()
+            raise ValueError(f"{path} isn't an opening book")
+        self._keys = _Keys(self._data, (len(self._data) - len(BOOK_MAGIC)) // RECORD.size)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._data.close()
+
+    def entries(self, key: int) -> List[Tuple[int, int]]:
+        """ (move code, weight) of every book move of the position key, highest weight first """
+        entries = []
+        index = bisect_left(self._keys, key)
+        while index < len(self._keys):
+            record_key, code, weight = RECORD.unpack_from(self._data, len(BOOK_MAGIC) + index * RECORD.size)
+            if record_key != key:
+                break
+            entries.append((code, weight))
+            index += 1
+        return entries
+
+    def moves(self, state: GameState) -> List[Tuple[Move, int]]:
+        """ (move, weight) of the book moves in the position, skipping moves that aren't legal (key clashes) """
+        entries = self.entries(state.key)
+        if not entries:
+            return []
+        legal = set(state.get_valid_move_codes())
+        return [(Move.from_code(code, state.mailbox), weight) for code, weight in entries if code in legal]
+
+    def choose(self, state: GameState, rng: Optional[random.Random] = None) -> Optional[Move]:
+        """ Pick a book move at random in proportion to the weights, None when the position is out of the book """
+        moves = self.moves(state)
+        if not moves:
+            return None
+        return (rng or random).choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m chess.book", description="Build an opening book from PGN files")
+    parser.add_argument("paths", nargs="+", help="PGN files, .pgn.gz files are decompressed on the fly")
+    parser.add_argument("--output", "-o", default="book.bin", help="book file to write (default: book.bin)")
+    parser.add_argument("--plies", type=int, default=16, help="moves of each game that go in the book")
+    parser.add_argument("--min-games", type=int, default=1, help="leave out moves played in fewer games")
+    args = parser.parse_args(argv)
+
+    games = (game for path in args.paths for game in read_games(path))
+    records = build_book(games, args.output, plies=args.plies, min_games=args.min_games)
+    print(f"{records} moves written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
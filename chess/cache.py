@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class MoveCache:
+    """
+    Position keyed (Zobrist key) cache of legal moves with least recently used eviction.
+    max_entries: Cap on the number of positions held, 0 disables the cache.
+    hits/misses: Lookup counters, handy to see if the cap fits the workload.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._entries
+
+    def get(self, key: int) -> Optional[Any]:
+        """ Return the entry for the position (marking it as most recently used), None if it isn't cached """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def peek(self, key: int) -> Optional[Any]:
+        """ Return the entry for the position without touching the counters or the eviction order """
+        return self._entries.get(key)
+
+    def put(self, key: int, entry: Any) -> None:
+        """ Store the entry, evicting the least recently used position when the cache is full """
+        if self.max_entries <= 0:
+            return
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits, self.misses = 0, 0
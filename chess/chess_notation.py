@@ -25,7 +25,7 @@ class ChessNotationParser:
         return chess_notation
 
     @classmethod
-    def from_notation(cls, notation: str) -> tuple:
+    def from_notation(cls, notation: str) -> Square:
         """ Given a chess notation, return row/col on the board """
         file, rank = notation[0], notation[1]
-        return Square(cls.files_to_columns[file], cls.ranks_to_rows[rank])
+        return Square(row=cls.ranks_to_rows[rank], col=cls.files_to_columns[file])
@@ -0,0 +1,298 @@
+"""
+Computer opponent: a negamax alpha-beta search over GameState's legal move generator.
+
+Iterative deepening searches depth 1, 2, 3... until max_depth or the time budget runs out, keeping the result of
+the last finished depth. Each iteration is sped up by the previous ones through the transposition table (best move
+of every position searched, tried first next time) and killer moves (quiet moves that caused a cutoff at the same
+ply). Captures are ordered most valuable victim / least valuable attacker first, and the leaves are extended with a
+captures only quiescence search so the score isn't taken in the middle of an exchange.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from .bitboard import PAWN
+from .cache import MoveCache
+from .evaluation import evaluate
+from .move import EN_PASSANT, PROMOTION, Move
+from .settings import Settings
+from .state import GameState
+from .utils import EMPTY_SQUARE
+
+if TYPE_CHECKING:
+    from .book import OpeningBook
+    from .tablebase import Tablebase
+
+logger = logging.getLogger(__name__)
+
+INFINITY = 1_000_000
+MATE_SCORE = 100_000  # Mate in n plies scores MATE_SCORE - n
+MAX_PLY = 64
+# Scores within MAX_MATE_PLY of MATE_SCORE are mates: a tablebase hit on the last ply adds up to 253 plies to mate
+MAX_MATE_PLY = MAX_PLY + 256
+
+# Transposition table entry bounds
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+_TIME_CHECK_INTERVAL = 256  # Nodes searched between looks at the clock
+
+
+@dataclass
+class SearchResult:
+    best_move: Optional[Move]  # None if the player to move has no legal moves
+    score: int  # Centipawns from the point of view of the player to move
+    pv: List[Move] = field(default_factory=list)  # Principal variation, the expected line of play
+    nodes: int = 0
+    depth: int = 0  # Last depth searched to completion
+
+
+class _SearchTimeout(Exception):
+    """ Unwinds the search when the time budget runs out """
+
+
+class Searcher:
+    """
+    Holds the state of one search: the position (moves are made and undone on it in place), the node counter,
+    the deadline, killer moves per ply and the transposition table (position key -> depth, score, bound, move).
+    tablebase: Endgame tables that score the positions they cover exactly instead of searching them.
+    """
+
+    def __init__(
+        self,
+        state: GameState,
+        table_size: int = Settings.TRANSPOSITION_TABLE_SIZE,
+        tablebase: Optional["Tablebase"] = None,
+    ):
+        self.state = state
+        self.tablebase = tablebase
+        self.table = MoveCache(max_entries=table_size)
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.nodes = 0
+        self.deadline = None
+        self._pv = [[] for _ in range(MAX_PLY + 2)]  # Triangular PV table, _pv[ply] is the line from that ply
+
+    def search(self, max_depth: Optional[int] = None, time_limit_ms: Optional[int] = None) -> SearchResult:
+        """ Iterative deepening, see search() """
+        state = self.state
+        if max_depth is None:
+            max_depth = MAX_PLY if time_limit_ms is not None else Settings.SEARCH_DEPTH
+        max_depth = min(max_depth, MAX_PLY)
+        self.deadline = None if time_limit_ms is None else time.perf_counter() + time_limit_ms / 1000
+        self.nodes = 0
+
+        root_moves = state.get_valid_move_codes()
+        if not root_moves:
+            return SearchResult(best_move=None, score=-MATE_SCORE if state.in_check() else 0)
+
+        # Fallback if the first iteration doesn't finish in time
+        fallback = self._ordered(root_moves, 0, 0)[0]
+        result = SearchResult(best_move=Move.from_code(fallback, state.mailbox), score=0)
+        root_ply = len(state.move_log)
+
+        for depth in range(1, max_depth + 1):
+            try:
+                score = self._negamax(depth, -INFINITY, INFINITY, 0)
+            except _SearchTimeout:
+                # Take back the moves the interrupted search had on the board
+                while len(state.move_log) > root_ply:
+                    state.undo_move()
+                break
+
+            pv = self._pv_moves(self._pv[0])
+            result = SearchResult(best_move=pv[0], score=score, pv=pv, nodes=self.nodes, depth=depth)
+            logger.debug(f"depth {depth} score {score} nodes {self.nodes} pv {pv}")
+            if abs(score) >= MATE_SCORE - MAX_MATE_PLY:
+                break  # Found a forced mate, searching deeper won't change the move
+
+        result.nodes = self.nodes
+        return result
+
+    def search_fixed_depth(self, depth: int, ply: int = 0) -> Tuple[int, List[int]]:
+        """
+        One full window alpha-beta pass to exactly depth plies, without iterative deepening or a time limit.
+        ply: How far the position is from the root of the whole search, mate scores count plies from there.
+        Returns the score and the PV as move codes.
+        """
+        self.deadline = None
+        score = self._negamax(depth, -INFINITY, INFINITY, ply)
+        return score, list(self._pv[ply])
+
+    def _negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """ Score of the position for the player to move, searched depth plies deep within the (alpha, beta) window """
+        self._count_node()
+        self._pv[ply] = []
+        state = self.state
+        if self.tablebase is not None and ply:
+            probe = self.tablebase.probe(state)
+            if probe is not None:
+                return 0 if probe.wdl == 0 else probe.wdl * (MATE_SCORE - ply - probe.plies)
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(alpha, beta, ply)
+
+        key = state.key
+        table_move = 0
+        entry = self.table.get(key)
+        if entry is not None:
+            entry_depth, entry_score, bound, table_move = entry
+            if ply and entry_depth >= depth:
+                entry_score = _score_from_table(entry_score, ply)
+                if (
+                    bound == EXACT
+                    or (bound == LOWER_BOUND and entry_score >= beta)
+                    or (bound == UPPER_BOUND and entry_score <= alpha)
+                ):
+                    return entry_score
+
+        codes = state.get_valid_move_codes()
+        if not codes:
+            return -MATE_SCORE + ply if state.in_check() else 0
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, 0
+        mailbox = state.mailbox
+        for code in self._ordered(codes, table_move, ply):
+            is_quiet = mailbox[code >> 6 & 63] == EMPTY_SQUARE and not code >> 12 & (EN_PASSANT | PROMOTION)
+            state._make_move(Move.from_code(code, mailbox))
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            state.undo_move()
+
+            if score > best_score:
+                best_score, best_move = score, code
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [code] + self._pv[ply + 1]
+                    if alpha >= beta:
+                        if is_quiet:
+                            self._add_killer(code, ply)
+                        break
+
+        if best_score <= original_alpha:
+            bound = UPPER_BOUND
+        elif best_score >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.table.put(key, (depth, _score_to_table(best_score, ply), bound, best_move))
+        return best_score
+
+    def _quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        """ Only search captures and promotions, the player to move can also stand pat on the static evaluation """
+        self._count_node()
+        self._pv[ply] = []
+        state = self.state
+
+        # No legal moves is mate or stalemate, whatever the material says
+        codes = state.get_valid_move_codes()
+        if not codes:
+            return -MATE_SCORE + ply if state.in_check() else 0
+
+        stand_pat = evaluate(state)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        mailbox = state.mailbox
+        captures = [
+            code for code in codes if mailbox[code >> 6 & 63] != EMPTY_SQUARE or code >> 12 & (EN_PASSANT | PROMOTION)
+        ]
+        for code in self._ordered(captures, 0, ply):
+            state._make_move(Move.from_code(code, mailbox))
+            score = -self._quiescence(-beta, -alpha, ply + 1)
+            state.undo_move()
+
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+                self._pv[ply] = [code] + self._pv[ply + 1]
+        return alpha
+
+    def _ordered(self, codes: List[int], table_move: int, ply: int) -> List[int]:
+        """
+        Moves in the order they're searched: transposition table move, captures by MVV-LVA (most valuable victim,
+        least valuable attacker), promotions, killer moves, then the quiet moves.
+        """
+        mailbox = self.state.mailbox
+        killers = self.killers[ply]
+
+        def priority(code: int) -> int:
+            if code == table_move:
+                return 1_000
+            victim = mailbox[code >> 6 & 63]
+            if victim != EMPTY_SQUARE:
+                return 100 + victim.kind * 8 - mailbox[code & 63].kind
+            flag = code >> 12
+            if flag == EN_PASSANT:
+                return 100 + PAWN * 8 - PAWN
+            if flag & PROMOTION:
+                return 90 + flag
+            if code == killers[0]:
+                return 20
+            if code == killers[1]:
+                return 10
+            return 0
+
+        return sorted(codes, key=priority, reverse=True)
+
+    def _add_killer(self, code: int, ply: int) -> None:
+        """ Remember the quiet move that caused a cutoff, keeping the two most recent per ply """
+        killers = self.killers[ply]
+        if killers[0] != code:
+            killers[1], killers[0] = killers[0], code
+
+    def _count_node(self) -> None:
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes % _TIME_CHECK_INTERVAL and time.perf_counter() > self.deadline:
+            raise _SearchTimeout
+
+    def _pv_moves(self, codes: List[int]) -> List[Move]:
+        """ Wrap the PV codes into Move objects by playing the line out on the board """
+        state = self.state
+        moves = []
+        for code in codes:
+            move = Move.from_code(code, state.mailbox)
+            moves.append(move)
+            state._make_move(move)
+        for _ in moves:
+            state.undo_move()
+        return moves
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    """ Mate scores are stored relative to the position rather than the root """
+    if score >= MATE_SCORE - MAX_MATE_PLY:
+        return score + ply
+    if score <= -MATE_SCORE + MAX_MATE_PLY:
+        return score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    if score >= MATE_SCORE - MAX_MATE_PLY:
+        return score - ply
+    if score <= -MATE_SCORE + MAX_MATE_PLY:
+        return score + ply
+    return score
+
+
+def search(
+    state: GameState,
+    max_depth: Optional[int] = None,
+    time_limit_ms: Optional[int] = None,
+    book: Optional["OpeningBook"] = None,
+    tablebase: Optional["Tablebase"] = None,
+) -> SearchResult:
+    """
+    Find the best move for the player to move.
+    max_depth: Plies to search to, defaults to Settings.SEARCH_DEPTH when there's no time limit either.
+    time_limit_ms: Budget for the whole search, the result of the deepest finished iteration is returned.
+    book: Opening book to play from without searching while the position is in it.
+    tablebase: Endgame tables to score the positions they cover with.
+    The state is searched in place and left as it was.
+    """
+    if book is not None:
+        book_move = book.choose(state)
+        if book_move is not None:
+            return SearchResult(best_move=book_move, score=0, pv=[book_move])
+    return Searcher(state, tablebase=tablebase).search(max_depth=max_depth, time_limit_ms=time_limit_ms)
@@ -1,6 +1,7 @@
 import logging
 
 from .chess_notation import ChessNotationParser
+from .history import GameHistory
 from .move import Move
 from .state import GameState
 from .utils import EMPTY_SQUARE, Square
@@ -17,16 +18,20 @@ class EventHandler:
         player_clicks: Keeps track of player clicks on a square.
                        It can only contain a max of two clicks (starting square clicked, destination square clicked)
         squared_clicked: Tuple containing row/col of the square the player clicked.
+        history: Undo/redo and jumps through the moves played.
         """
         self.state = state
+        self.history = GameHistory(state)
         self.player_clicks = 0
         self.first_click_location = None
         self.second_click_location = None
 
         self.event_key_map = {
-            ord("u"): self.state.undo_move,
-            ord("r"): self.state.redo_move,
-            ord("z"): self.state.reset_game,
+            ord("u"): self.history.undo,
+            ord("r"): self.history.redo,
+            ord("b"): self.history.go_to_start,
+            ord("e"): self.history.go_to_end,
+            ord("z"): self.history.reset,
             ord("v"): self.state.print_valid_moves,
             ord("m"): self.state.print_move_log,
             ord("s"): self.state.score,
@@ -61,7 +66,7 @@ class EventHandler:
                 board=self.state.board,
             )
 
-            self.state.make_move(move)
+            self.history.make_move(move)
             self._reset_clicks()
 
     def right_click_square(self, row: int, col: int) -> None:
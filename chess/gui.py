@@ -1,87 +1,79 @@
 import logging
 import os
 import sys
+from typing import List, Optional
 
 import pygame
 from .settings import Settings
-from .utils import EMPTY_SQUARE, Board
+from .sprites import load_sprites
+from .state import GameState
+from .utils import EMPTY_SQUARE
 
 logger = logging.getLogger(__name__)
 
 
 class GUI:
-    """ Responsible for drawing the GUI (board, pieces, highlighting etc) """
-
-    def __init__(self, settings: Settings, board: Board):
-        self.board = board
+    """
+    Responsible for drawing the GUI (board, pieces, highlighting etc).
+    The empty board is rendered once into a background surface, and each draw only repaints the squares whose
+    piece changed since the previous one.
+    """
+
+    def __init__(self, settings: Settings, state: GameState):
+        self.state = state
         self.screen = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT))
         self.square_size = settings.SQUARE_SIZE
         self.board_colors = [pygame.Color(color) for color in settings.BOARD_COLORS]
         self.piece_images = {}
+        self.background = pygame.Surface((8 * self.square_size, 8 * self.square_size))
+        self._drawn: List[Optional[str]] = []  # Name of the piece shown on each square, empty until the first draw
 
-        self._load_piece_images(image_dir=settings.IMAGE_DIR)
-
-    def draw(self) -> None:
-        """ Main interface used to draw the entire gui """
+        self._load_piece_images(image_dir=settings.IMAGE_DIR, cache_dir=settings.SPRITE_CACHE_DIR)
         self._draw_board()
-        self._draw_pieces()
+
+    def draw(self) -> List[pygame.Rect]:
+        """ Main interface used to draw the gui, returns the areas of the screen that changed (for display.update) """
+        shown = [None if piece == EMPTY_SQUARE else piece.name for piece in self.state.mailbox]
+        if not self._drawn:
+            self.screen.blit(self.background, (0, 0))
+            changed = range(64)
+        else:
+            changed = [square for square in range(64) if shown[square] != self._drawn[square]]
+        self._drawn = shown
+
+        dirty = []
+        for square in changed:
+            rect = self._square_rect(square // 8, square % 8)
+            self.screen.blit(self.background, rect, area=rect)
+            if shown[square] is not None:
+                # 'blit' draws the image on the screen on the given square (piece.name has a 1-to-1 mapping to an img)
+                self.screen.blit(self.piece_images[shown[square]], rect)
+            dirty.append(rect)
+        return dirty
+
+    def redraw(self) -> None:
+        """ Repaint everything on the next draw, e.g. after the window was covered """
+        self._drawn = []
+
+    def _square_rect(self, row: int, col: int) -> pygame.Rect:
+        return pygame.Rect(col * self.square_size, row * self.square_size, self.square_size, self.square_size)
 
     def _draw_square(self, row: int, col: int) -> None:
-        """ Draw one square on the board for the given row/col """
+        """ Draw one square of the background for the given row/col """
         color = self.board_colors[((row + col) % 2)]
-        square = pygame.Rect(
-            col * self.square_size,
-            row * self.square_size,
-            self.square_size,
-            self.square_size,
-        )
-        pygame.draw.rect(surface=self.screen, color=color, rect=square)
+        pygame.draw.rect(surface=self.background, color=color, rect=self._square_rect(row, col))
 
     def _draw_board(self) -> None:
-        """ Draw the 8x8 chess board """
+        """ Render the empty 8x8 chess board into the background """
         for row in range(8):
             for col in range(8):
                 self._draw_square(row, col)
 
-    def _draw_piece(self, row: int, col: int) -> None:
-        """ Draw the piece on the given square (row/col) """
-        piece = self.board[row][col]
-        # TODO: Refactor to an enum?
-        if piece != EMPTY_SQUARE:
-            square = pygame.Rect(
-                col * self.square_size,
-                row * self.square_size,
-                self.square_size,
-                self.square_size,
-            )
-            # 'blit' draws the image on the screen on the given square (piece.name has a 1-to-1 mapping to an img name)
-            self.screen.blit(self.piece_images[piece.name], square)
-
-    def _draw_pieces(self) -> None:
-        """ Draw all the pieces on the chess board """
-        for row in range(8):
-            for col in range(8):
-                self._draw_piece(row, col)
-
-    @staticmethod
-    def _load_and_scale_image(image_path: str, width: int, height: int) -> pygame.Surface:
-        """ Load and re-scale the image to the specified width/height """
-        return pygame.transform.scale(pygame.image.load(os.path.abspath(image_path)), (width, height))
-
-    def _load_piece_images(self, image_dir: str) -> None:
-        """ Load all the piece images into self.peace_images dict. """
+    def _load_piece_images(self, image_dir: str, cache_dir: Optional[str]) -> None:
+        """ Load the piece sprites into self.piece_images dict, through the sprite cache """
 
         if not os.path.exists(image_dir):
             logger.error(f"Image path: '{image_dir}' doesnt exist. Failed to load images. Exiting")
             sys.exit(1)
 
-        images = os.listdir(image_dir)
-
-        for image_path in images:
-            piece = image_path.split(".")[0]  # get the filename without ext
-            loaded_piece_image = self._load_and_scale_image(
-                image_path=f"{image_dir}/{image_path}",
-                width=self.square_size,
-                height=self.square_size,
-            )
-            self.piece_images[piece] = loaded_piece_image
+        self.piece_images = load_sprites(image_dir=image_dir, size=self.square_size, cache_dir=cache_dir)
@@ -0,0 +1,128 @@
+"""
+Game history navigation: undo, redo and jumping to any ply of the game.
+
+The timeline is the move log plus the moves taken back since, as packed move codes, with the undo record of each
+move (what it captured and the state it changed, packed into an int, see GameState._undo_record) alongside. Undo is
+GameState.undo_move, which reverses a move from the delta the move left in the undo log, and redo plays the next code
+of the timeline again, both O(1). Every Settings.HISTORY_CHECKPOINT_INTERVAL plies the position alone is saved, so a
+jump restores the nearest checkpoint before the target, rebuilds the logs up to it from the timeline and only replays
+the plies after it.
+"""
+import logging
+from array import array
+from typing import Dict
+
+from .move import Move
+from .settings import Settings
+from .state import GameState
+
+logger = logging.getLogger(__name__)
+
+
+class GameHistory:
+    """
+    Undo/redo and jump to ply for the moves played on a GameState. Moves have to be played through make_move for
+    the history to see them, making a new move after an undo drops the moves that could have been redone.
+    """
+
+    def __init__(self, state: GameState, checkpoint_interval: int = Settings.HISTORY_CHECKPOINT_INTERVAL):
+        self.state = state
+        self.checkpoint_interval = checkpoint_interval
+        self.timeline = array("H", [move.code for move in state.move_log])
+        self._records = array("Q")  # GameState._undo_record of every move of the timeline
+        self._keys = array("Q")  # Position key before every move of the timeline
+        for ply in range(len(self.timeline)):
+            self._add_record(ply)
+        self._checkpoints: Dict[int, tuple] = {}  # Ply -> GameState checkpoint
+        self._save_checkpoint()
+
+    def __len__(self) -> int:
+        """ Plies in the timeline, including the ones that can be redone """
+        return len(self.timeline)
+
+    @property
+    def ply(self) -> int:
+        """ Plies played to get to the current position """
+        return len(self.state.move_log)
+
+    def make_move(self, move: Move) -> bool:
+        """ Play a move through GameState.make_move, returns whether it was valid and played """
+        ply = self.ply
+        self.state.make_move(move)
+        if self.ply == ply:
+            return False
+
+        # A new line, the moves that were taken back can't be redone anymore
+        del self.timeline[ply:], self._records[ply:], self._keys[ply:]
+        self.timeline.append(self.state.move_log[-1].code)
+        self._add_record(ply)
+        for saved in [saved for saved in self._checkpoints if saved > ply]:
+            del self._checkpoints[saved]
+        self._save_checkpoint()
+        return True
+
+    def undo(self) -> bool:
+        """ Take back the last move, returns False at the start of the game """
+        if not self.state.move_log:
+            return False
+        self.state.undo_move()
+        logger.debug(f"Undo to ply {self.ply}")
+        return True
+
+    def redo(self) -> bool:
+        """ Play the move that was taken back last, returns False when there's none """
+        ply = self.ply
+        if ply >= len(self.timeline):
+            return False
+        state = self.state
+        state._make_move(Move.from_code(self.timeline[ply], state.mailbox))
+        self._save_checkpoint()
+        state.get_valid_move_codes()  # Flag checkmate/stalemate for the player to move
+        logger.debug(f"Redo to ply {self.ply}")
+        return True
+
+    def go_to(self, ply: int) -> None:
+        """ Jump to the position after the given number of plies, from 0 (the start) to len(history) """
+        if not 0 <= ply <= len(self.timeline):
+            raise ValueError(f"Ply {ply} is outside of the game (0-{len(self.timeline)})")
+
+        # Start from the closest checkpoint before the target when that's fewer plies than from here
+        checkpoint_ply = max((saved for saved in self._checkpoints if saved <= ply), default=None)
+        if checkpoint_ply is not None and ply - checkpoint_ply < abs(ply - self.ply):
+            self.state._restore_checkpoint(
+                self._checkpoints[checkpoint_ply],
+                self.timeline[:checkpoint_ply],
+                self._records[:checkpoint_ply],
+                self._keys[:checkpoint_ply],
+            )
+
+        while self.ply > ply:
+            self.state.undo_move()
+        while self.ply < ply:
+            self.state._make_move(Move.from_code(self.timeline[self.ply], self.state.mailbox))
+            self._save_checkpoint()
+        self.state.get_valid_move_codes()
+
+    def go_to_start(self) -> None:
+        self.go_to(0)
+
+    def go_to_end(self) -> None:
+        self.go_to(len(self.timeline))
+
+    def reset(self) -> None:
+        """ Start a new game """
+        self.state.reset_game()
+        del self.timeline[:], self._records[:], self._keys[:]
+        self._checkpoints.clear()
+        self._save_checkpoint()
+
+    def _add_record(self, ply: int) -> None:
+        record, key = self.state._undo_record(ply)
+        self._records.append(record)
+        self._keys.append(key)
+
+    def _save_checkpoint(self) -> None:
+        """ Keep the current position if it's on a checkpoint ply that isn't saved yet """
+        ply = self.ply
+        if ply % self.checkpoint_interval == 0 and ply not in self._checkpoints:
+            self._checkpoints[ply] = self.state._save_checkpoint()
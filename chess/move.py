@@ -1,22 +1,50 @@
 import logging
+from typing import Optional
 
+from .bitboard import KING, KNIGHT, PAWN
 from .chess_notation import ChessNotationParser
-from .utils import Board, Color, Square
+from .utils import EMPTY_SQUARE, Board, Color, Mailbox, Square
 
 logger = logging.getLogger(__name__)
 
+# A move is packed into a 16-bit int: start square (bits 0-5) | destination square (bits 6-11) | flag (bits 12-15)
+# Squares are bitboard indexes (row * 8 + col), so move lists fit in an array("H").
+NORMAL, EN_PASSANT, CASTLE, PROMOTION = 0, 1, 2, 4  # Flags, a promotion flag also holds the piece: 4 + kind - KNIGHT
+
+
+def encode_move(start: int, dest: int, flag: int = NORMAL) -> int:
+    """ Pack a move into an int """
+    return start | dest << 6 | flag << 12
+
 
 class Move:
-    """ Abstraction that represents all the data in a player move. """
+    """
+    Abstraction that represents all the data in a player move.
+    The move itself is the packed int in `code`, everything else is derived from it. The pieces are looked up
+    when the move is created.
+    """
 
-    def __init__(self, start_square: Square, dest_square: Square, board: Board):
-        self.start_row = start_square.row
-        self.start_col = start_square.col
-        self.dest_row = dest_square.row
-        self.dest_col = dest_square.col
-        self.piece_to_move = board[self.start_row][self.start_col]
-        self.piece_to_capture = board[self.dest_row][self.dest_col]  # This can be an empty square
-        self.maker = self.piece_to_move.color if hasattr(self.piece_to_move, "color") else None
+    __slots__ = ("code", "piece_to_move", "piece_to_capture")
+
+    def __init__(self, start_square: Square, dest_square: Square, board: Board, promotion: Optional[int] = None):
+        """
+        promotion: Kind of piece (see bitboard.py) a pawn is promoted to on the last rank, None for any other move.
+        Castling and en passant are recognised from the piece being moved, like a player would.
+        """
+        self.piece_to_move = board[start_square.row][start_square.col]
+        self.piece_to_capture = board[dest_square.row][dest_square.col]  # This can be an empty square
+
+        flag = NORMAL
+        kind = getattr(self.piece_to_move, "kind", None)
+        if promotion is not None:
+            flag = PROMOTION + promotion - KNIGHT
+        elif kind == KING and abs(dest_square.col - start_square.col) == 2:
+            flag = CASTLE
+        elif kind == PAWN and dest_square.col != start_square.col and self.piece_to_capture == EMPTY_SQUARE:
+            flag = EN_PASSANT
+            self.piece_to_capture = board[start_square.row][dest_square.col]
+
+        self.code = encode_move(start_square.row * 8 + start_square.col, dest_square.row * 8 + dest_square.col, flag)
 
     def __repr__(self) -> str:
         """ Printable representation of a move made in chess notation """
@@ -28,15 +56,61 @@ class Move:
     def __eq__(self, other: "Move") -> bool:
         """ Checks if two moves are the same """
         if isinstance(other, Move):
-            if (
-                self.start_row == other.start_row
-                and self.dest_row == other.dest_row
-                and self.start_col == other.start_col
-                and self.dest_col == other.dest_col
-            ):
-                return True
+            return self.code == other.code
         return False
 
+    def __hash__(self) -> int:
+        return self.code
+
+    @property
+    def start(self) -> int:
+        """ Bitboard index of the starting square """
+        return self.code & 63
+
+    @property
+    def dest(self) -> int:
+        """ Bitboard index of the destination square """
+        return self.code >> 6 & 63
+
+    @property
+    def start_row(self) -> int:
+        return self.code >> 3 & 7
+
+    @property
+    def start_col(self) -> int:
+        return self.code & 7
+
+    @property
+    def dest_row(self) -> int:
+        return self.code >> 9 & 7
+
+    @property
+    def dest_col(self) -> int:
+        return self.code >> 6 & 7
+
+    @property
+    def maker(self) -> Optional[Color]:
+        """ Color of the player making the move """
+        return getattr(self.piece_to_move, "color", None)
+
+    @property
+    def promotion(self) -> Optional[int]:
+        """ Kind of piece the pawn is promoted to, None if the move isn't a promotion """
+        flag = self.code >> 12
+        return KNIGHT + flag - PROMOTION if flag & PROMOTION else None
+
+    @promotion.setter
+    def promotion(self, kind: int) -> None:
+        self.code = (self.code & 0xFFF) | (PROMOTION + kind - KNIGHT) << 12
+
+    @property
+    def is_en_passant(self) -> bool:
+        return self.code >> 12 == EN_PASSANT
+
+    @property
+    def is_castle(self) -> bool:
+        return self.code >> 12 == CASTLE
+
     def is_pawn_promotion(self) -> bool:
         """ Checks if the move is a pawn promotion for black or white """
         if self.maker == Color.WHITE and self.piece_to_move.value == 1 and self.dest_row == 0:
@@ -57,6 +131,17 @@ class Move:
             return True
         return False
 
+    @classmethod
+    def from_code(cls, code: int, mailbox: Mailbox) -> "Move":
+        """ Alternate constructor wrapping a packed move, the pieces are looked up in the flat mailbox """
+        move = cls.__new__(cls)
+        move.code = code
+        start, dest = code & 63, code >> 6 & 63
+        move.piece_to_move = mailbox[start]
+        # En passant captures the pawn beside the starting square, not on the destination
+        move.piece_to_capture = mailbox[(start & 56) | (dest & 7)] if code >> 12 == EN_PASSANT else mailbox[dest]
+        return move
+
     @classmethod
     def from_chess_notation(cls, notation: str, board: Board) -> "Move":
         """
@@ -0,0 +1,87 @@
+"""
+Parallel search by root splitting: every legal move at the root is searched to a fixed depth in its own worker
+process, and the best of the returned scores is played. The workers don't share a hash table, so the total node
+count is higher than a single process search to the same depth, but the moves are searched side by side.
+Workers rebuild the position from its FEN, GameState itself doesn't pickle.
+
+Usage:
+    python -m chess.parallel --depth 4 --workers 8
+    python -m chess.parallel --depth 3 --workers 4 --fen "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .engine import MATE_SCORE, SearchResult, Searcher
+from .move import Move
+from .starting_pieces import STARTING_FEN
+from .state import GameState
+
+
+def search_root_move(fen: str, code: int, depth: int) -> Tuple[int, List[int], int]:
+    """
+    Worker: play the root move and search the reply with a fixed depth alpha-beta pass of depth - 1 plies.
+    Returns the score for the player making the root move, the PV (as move codes) starting with the move, and nodes.
+    """
+    state = GameState.from_fen(fen)
+    state._make_move(Move.from_code(code, state.mailbox))
+    searcher = Searcher(state)
+    # The reply is one ply from the root, so mate scores come out counted from the root
+    score, pv = searcher.search_fixed_depth(depth - 1, ply=1)
+    return -score, [code] + pv, searcher.nodes
+
+
+def parallel_search(state: GameState, depth: int, workers: Optional[int] = None) -> SearchResult:
+    """
+    Search every root move in a pool of worker processes (os.cpu_count() by default).
+    The state isn't modified, workers get its FEN.
+    """
+    codes = list(state.get_valid_move_codes())
+    if not codes:
+        return SearchResult(best_move=None, score=-MATE_SCORE if state.in_check() else 0)
+
+    fen = state.to_fen()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        results = list(executor.map(search_root_move, [fen] * len(codes), codes, [depth] * len(codes)))
+
+    best_score, best_pv, _ = max(results, key=lambda result: result[0])
+    nodes = sum(result[2] for result in results)
+
+    # Wrap the PV codes by playing the line out
+    pv = []
+    for code in best_pv:
+        move = Move.from_code(code, state.mailbox)
+        pv.append(move)
+        state._make_move(move)
+    for _ in pv:
+        state.undo_move()
+
+    return SearchResult(best_move=pv[0], score=best_score, pv=pv, nodes=nodes, depth=depth)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m chess.parallel", description="Root splitting parallel search")
+    parser.add_argument("--depth", type=int, default=3, help="plies to search every root move to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="scaling is reported from 1 up to this")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to search (default: starting position)")
+    args = parser.parse_args(argv)
+
+    state = GameState.from_fen(args.fen)
+    print(f"{'workers':>7} {'nodes':>10} {'seconds':>9} {'nodes/s':>10} {'speedup':>8}  best move")
+    baseline = None
+    for workers in range(1, args.workers + 1):
+        start = time.perf_counter()
+        result = parallel_search(state, depth=args.depth, workers=workers)
+        elapsed = time.perf_counter() - start
+        nodes_per_second = result.nodes / elapsed if elapsed else 0
+        baseline = baseline or nodes_per_second
+        print(
+            f"{workers:>7} {result.nodes:>10} {elapsed:>9.3f} {nodes_per_second:>10.0f} "
+            f"{nodes_per_second / baseline:>7.2f}x  {result.best_move} ({result.score})"
+        )
+
+
+if __name__ == "__main__":
+    main()
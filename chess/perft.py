@@ -0,0 +1,82 @@
+"""
+Perft: count the leaf nodes of the legal move tree to a given depth.
+Comparing the counts against published reference numbers is the standard correctness test for a move generator,
+and nodes per second is the throughput number we track for it.
+
+Usage:
+    python -m chess.perft 4
+    python -m chess.perft 3 --fen "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+    python -m chess.perft 3 --divide
+"""
+import argparse
+import time
+from typing import Dict, List, Optional
+
+from .chess_notation import ChessNotationParser
+from .move import Move
+from .piece import PIECE_CLASSES
+from .starting_pieces import STARTING_FEN
+from .state import GameState
+
+
+def perft(state: GameState, depth: int) -> int:
+    """ Number of leaf nodes in the legal move tree of the given depth """
+    if depth == 0:
+        return 1
+
+    moves = state.get_valid_moves()
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        state._make_move(move)
+        nodes += perft(state, depth - 1)
+        state.undo_move()
+    return nodes
+
+
+def divide(state: GameState, depth: int) -> Dict[str, int]:
+    """ Perft split by root move, the usual way to track down which move a wrong count comes from """
+    counts = {}
+    for move in state.get_valid_moves():
+        state._make_move(move)
+        counts[_move_notation(move)] = perft(state, depth - 1)
+        state.undo_move()
+    return counts
+
+
+def _move_notation(move: Move) -> str:
+    """ e.g. e2->e4, or e7->e8=Queen for promotions """
+    start = ChessNotationParser.from_row_and_col(row=move.start_row, col=move.start_col)
+    dest = ChessNotationParser.from_row_and_col(row=move.dest_row, col=move.dest_col)
+    promotion = f"={PIECE_CLASSES[move.promotion].__name__}" if move.promotion is not None else ""
+    return f"{start}->{dest}{promotion}"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m chess.perft", description="Count move generation leaf nodes")
+    parser.add_argument("depth", type=int, help="depth to count to, every depth from 1 up to it is reported")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to start from (default: starting position)")
+    parser.add_argument("--divide", action="store_true", help="split the count at the final depth by root move")
+    args = parser.parse_args(argv)
+
+    state = GameState.from_fen(args.fen)
+
+    if args.divide:
+        counts = divide(state, args.depth)
+        for notation, nodes in sorted(counts.items()):
+            print(f"{notation}: {nodes}")
+        print(f"\nMoves: {len(counts)}\nNodes: {sum(counts.values())}")
+        return
+
+    print(f"{'depth':>5} {'nodes':>12} {'seconds':>10} {'nodes/s':>12}")
+    for depth in range(1, args.depth + 1):
+        start = time.perf_counter()
+        nodes = perft(state, depth)
+        elapsed = time.perf_counter() - start
+        print(f"{depth:>5} {nodes:>12} {elapsed:>10.3f} {nodes / elapsed if elapsed else 0:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Streaming PGN (Portable Game Notation) reading and writing.
+
+read_games yields one game at a time while reading the file line by line, so memory use depends on the longest game
+rather than the size of the archive. Paths ending in .gz are (de)compressed on the fly.
+
+    for headers, moves in read_games("archive.pgn.gz"):
+        ...  # moves are SAN strings, e.g. ["e4", "e5", "Nf3"]
+
+    for headers, moves in read_games("archive.pgn", replay=True):
+        ...  # moves are Move objects, checked for legality by playing them through a GameState
+
+    with PgnWriter("out.pgn") as writer:
+        writer.write_game(state, headers={"White": "Kasparov", "Black": "Deep Blue"})
+"""
+import gzip
+import io
+import re
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from .bitboard import KING, KNIGHT, PAWN
+from .chess_notation import ChessNotationParser
+from .move import CASTLE, EN_PASSANT, PROMOTION, Move
+from .starting_pieces import STARTING_FEN
+from .state import GameState
+from .utils import EMPTY_SQUARE
+
+SAN_PIECE_LETTERS = "PNBRQK"  # Indexed by Piece.kind
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+
+_HEADER = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+_SAN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+_MOVE_NUMBER = re.compile(r"^\d+\.+")
+_LINE_LENGTH = 80
+
+
+class PgnError(ValueError):
+    """ The PGN can't be read, or a move in it isn't legal """
+
+
+def read_games(
+    source: Union[str, TextIO], replay: bool = False
+) -> Iterator[Tuple[Dict[str, str], List[Union[str, Move]]]]:
+    """
+    Yield (headers, moves) for every game in a PGN file, given a path (.pgn or .pgn.gz) or an open text file.
+    Comments, variations and annotation glyphs are skipped. The result is in headers["Result"].
+    replay: Play each game through a GameState (from the FEN header if it has one) and yield Move objects instead
+            of SAN strings, raises PgnError on an illegal or ambiguous move.
+    """
+    if isinstance(source, str):
+        with _open(source, "r") as file:
+            yield from read_games(file, replay=replay)
+        return
+
+    for headers, sans in _parse_games(source):
+        if not replay:
+            yield headers, sans
+            continue
+
+        state = GameState(fen=headers.get("FEN"), move_cache_size=0)
+        moves = []
+        for san in sans:
+            move = from_san(state, san)
+            state._make_move(move)
+            moves.append(move)
+        yield headers, moves
+
+
+def _parse_games(file: TextIO) -> Iterator[Tuple[Dict[str, str], List[str]]]:
+    """ Split the stream into games, one line at a time """
+    headers, moves = {}, []
+    comment_depth = variation_depth = 0  # Inside {comments} / (variations), which can span lines
+
+    for line in file:
+        if comment_depth == 0 and variation_depth == 0:
+            header = _HEADER.match(line)
+            if header:
+                if moves:  # A game without a result token, the next one starts here
+                    yield headers, moves
+                    headers, moves = {}, []
+                headers[header.group(1)] = header.group(2).replace('\\"', '"')
+                continue
+            if line.startswith("%"):  # Escaped line
+                continue
+
+        for token in _tokens(line):
+            if token == "{":
+                comment_depth += 1
+            elif token == "}":
+                comment_depth = max(comment_depth - 1, 0)
+            elif comment_depth:
+                continue
+            elif token == ";":
+                break  # Rest of line comment
+            elif token == "(":
+                variation_depth += 1
+            elif token == ")":
+                variation_depth = max(variation_depth - 1, 0)
+            elif variation_depth or token.startswith("$"):
+                continue
+            elif token in RESULTS:
+                headers.setdefault("Result", token)
+                yield headers, moves
+                headers, moves = {}, []
+            else:
+                san = _MOVE_NUMBER.sub("", token)
+                if san:
+                    moves.append(san)
+
+    if moves or headers:
+        yield headers, moves
+
+
+def _tokens(line: str) -> List[str]:
+    """ Split a movetext line into tokens, the brackets of comments/variations are tokens of their own """
+    for bracket in "{}();":
+        line = line.replace(bracket, f" {bracket} ")
+    return line.split()
+
+
+def from_san(state: GameState, san: str) -> Move:
+    """ Legal move of the player to move from its Standard Algebraic Notation, e.g. Nbd7, exd6, e8=Q+, O-O """
+    text = san.rstrip("+#!?")
+    codes = state.get_valid_move_codes()
+    mailbox = state.mailbox
+
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        dest_col = 6 if len(text) == 3 else 2
+        candidates = [code for code in codes if code >> 12 == CASTLE and code >> 6 & 7 == dest_col]
+    else:
+        parsed = _SAN.match(text)
+        if parsed is None:
+            raise PgnError(f"Can't read the move {san!r}")
+        piece_letter, from_file, from_rank, dest_notation, promotion = parsed.groups()
+        kind = SAN_PIECE_LETTERS.index(piece_letter or "P")
+        dest = ChessNotationParser.from_notation(dest_notation)
+        dest = dest.row * 8 + dest.col
+        from_col = None if from_file is None else ChessNotationParser.files_to_columns[from_file]
+        from_row = None if from_rank is None else ChessNotationParser.ranks_to_rows[from_rank]
+        promotion_kind = None if promotion is None else SAN_PIECE_LETTERS.index(promotion)
+
+        candidates = []
+        for code in codes:
+            start, flag = code & 63, code >> 12
+            if (
+                code >> 6 & 63 == dest
+                and mailbox[start].kind == kind
+                and flag != CASTLE
+                and (from_col is None or start & 7 == from_col)
+                and (from_row is None or start >> 3 == from_row)
+                and (KNIGHT + flag - PROMOTION if flag & PROMOTION else None) == promotion_kind
+            ):
+                candidates.append(code)
+
+    if len(candidates) != 1:
+        problem = "isn't legal" if not candidates else "is ambiguous"
+        raise PgnError(f"{san!r} {problem} in {state.to_fen()}")
+    return Move.from_code(candidates[0], mailbox)
+
+
+def to_san(state: GameState, move: Move) -> str:
+    """ Standard Algebraic Notation of a legal move of the player to move """
+    code = move.code
+    start, dest, flag = code & 63, code >> 6 & 63, code >> 12
+    mailbox = state.mailbox
+    piece = mailbox[start]
+
+    if flag == CASTLE:
+        san = "O-O" if dest & 7 == 6 else "O-O-O"
+    else:
+        capture = mailbox[dest] != EMPTY_SQUARE or flag == EN_PASSANT
+        dest_notation = ChessNotationParser.from_row_and_col(row=dest >> 3, col=dest & 7)
+        if piece.kind == PAWN:
+            san = ChessNotationParser.columns_to_files[start & 7] + "x" if capture else ""
+            san += dest_notation
+            if flag & PROMOTION:
+                san += "=" + SAN_PIECE_LETTERS[KNIGHT + flag - PROMOTION]
+        else:
+            san = SAN_PIECE_LETTERS[piece.kind] + _disambiguation(state, piece.kind, start, dest)
+            san += ("x" if capture else "") + dest_notation
+
+    # Check/checkmate suffix
+    state._make_move(move)
+    if state.in_check():
+        san += "#" if not state.get_valid_move_codes() else "+"
+    state.undo_move()
+    return san
+
+
+def _disambiguation(state: GameState, kind: int, start: int, dest: int) -> str:
+    """ File, rank or square of the starting square when another piece of the same type can move to dest as well """
+    if kind == KING:
+        return ""
+    others = [
+        code & 63
+        for code in state.get_valid_move_codes()
+        if code >> 6 & 63 == dest and code & 63 != start and state.mailbox[code & 63].kind == kind
+    ]
+    if not others:
+        return ""
+    if all(other & 7 != start & 7 for other in others):
+        return ChessNotationParser.columns_to_files[start & 7]
+    if all(other >> 3 != start >> 3 for other in others):
+        return ChessNotationParser.rows_to_ranks[start >> 3]
+    return ChessNotationParser.from_row_and_col(row=start >> 3, col=start & 7)
+
+
+class PgnWriter:
+    """
+    Writes games to a PGN file (gzip compressed if the path ends with .gz) as they're finished, one at a time.
+    Use as a context manager, or call close().
+    """
+
+    def __init__(self, target: Union[str, TextIO]):
+        self._owns_file = isinstance(target, str)
+        self.file = _open(target, "w") if self._owns_file else target
+        self.games_written = 0
+
+    def __enter__(self) -> "PgnWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write_game(self, state: GameState, headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Write the game in state.move_log. The moves are taken back and replayed to get their SAN, the state ends up
+        where it was. Missing Seven Tag Roster headers are filled in with "?", a game that didn't start from the
+        starting position gets SetUp/FEN headers.
+        """
+        moves = list(state.move_log)
+        game_over = state.checkmate, state.stalemate
+        for _ in moves:
+            state.undo_move()
+
+        headers = dict(headers or {})
+        start_fen = state.to_fen()
+        if start_fen != STARTING_FEN:
+            headers.setdefault("SetUp", "1")
+            headers.setdefault("FEN", start_fen)
+        headers.setdefault("Result", _result(state, moves))
+
+        tokens = []
+        fullmove_number = state.fullmove_number
+        for index, move in enumerate(moves):
+            if state.white_turn:
+                tokens.append(f"{state.fullmove_number}.")
+            elif index == 0:
+                tokens.append(f"{fullmove_number}...")
+            tokens.append(to_san(state, move))
+            state._make_move(move)
+        tokens.append(headers["Result"])
+        state.checkmate, state.stalemate = game_over
+
+        for name in SEVEN_TAG_ROSTER:
+            value = headers.pop(name, "?")
+            self.file.write(f'[{name} "{_escape(value)}"]\n')
+        for name, value in headers.items():
+            self.file.write(f'[{name} "{_escape(value)}"]\n')
+        self.file.write("\n")
+
+        line = ""
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > _LINE_LENGTH:
+                self.file.write(line + "\n")
+                line = token
+            else:
+                line = f"{line} {token}" if line else token
+        self.file.write(line + "\n\n")
+        self.games_written += 1
+
+    def close(self) -> None:
+        if self._owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+def _result(state: GameState, moves: List[Move]) -> str:
+    """ Result of the game if it ended on the board (state is at the start of the game), "*" otherwise """
+    for move in moves:
+        state._make_move(move)
+    result = "*"
+    if not state.get_valid_move_codes():
+        result = ("0-1" if state.white_turn else "1-0") if state.in_check() else "1/2-1/2"
+    for _ in moves:
+        state.undo_move()
+    return result
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _open(path: str, mode: str) -> TextIO:
+    """ Open a PGN file in text mode, through gzip for .gz paths """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return io.open(path, mode, encoding="utf-8")
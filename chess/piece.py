@@ -1,27 +1,54 @@
 import logging
-import uuid
+from array import array
 from abc import ABC, abstractmethod
-from copy import deepcopy
-from typing import List
-from collections import namedtuple
-
+from typing import TYPE_CHECKING, List, Type
+
+from .bitboard import (
+    BISHOP,
+    BISHOP_DIRECTIONS,
+    BLACK,
+    CASTLING_MOVES,
+    FULL,
+    KING,
+    KING_ATTACKS,
+    KNIGHT,
+    KNIGHT_ATTACKS,
+    PAWN,
+    PAWN_ATTACKS,
+    QUEEN,
+    QUEEN_DIRECTIONS,
+    ROOK,
+    ROOK_DIRECTIONS,
+    WHITE,
+    sliding_attacks,
+)
 from .chess_notation import ChessNotationParser
-from .move import Move
-from .utils import EMPTY_SQUARE, Board, Color, Square
+from .move import CASTLE, EN_PASSANT, PROMOTION, Move
+from .utils import Color, Square
 
-logger = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from .state import GameState
 
+logger = logging.getLogger(__name__)
 
-# TODO: Refactor potential moves, a lot of repeating logic... BRUTE FORCING for now.
+_COLORS = {"w": (Color.WHITE, WHITE), "b": (Color.BLACK, BLACK)}  # color string -> (Color, side)
 
 
 class Piece(ABC):
+    """
+    Pieces are compared by identity and only hold a handful of slots. Everything the move generators need per
+    piece type (attack tables, slider directions) is shared at the class/module level.
+    """
+
+    __slots__ = ("color", "side", "code", "square", "moves_made", "name")
+    kind: int  # Piece type, pieces live in GameState.bitboards[side * 6 + kind]
+
     def __init__(self, color: str, row: int, col: int):
-        self.color = Color(color)
-        self.pos = Square(row, col)
+        self.color, self.side = _COLORS[color]
+        self.code = self.side * 6 + self.kind  # index of the pieces bitboard in GameState.bitboards
+        self.square = row * 8 + col  # Bitboard index of the square the piece is on
         self.moves_made = 0
         self.name = color + self.__class__.__name__  # name is color + piece type, e.g. bKnight
-        self.id = uuid.uuid4()
 
     def __repr__(self) -> str:
         """ Return the piece name/color  """
@@ -30,75 +57,94 @@ class Piece(ABC):
 
         return f"{color} {type_}"
 
-    def __eq__(self, other: "Piece") -> bool:
-        """ Checks if two pieces are equal """
-        if isinstance(other, Piece):
-            return self.id == other.id
-        return False
+    @property
+    def pos(self) -> Square:
+        """ Row/col of the square the piece is on """
+        return Square(row=self.square >> 3, col=self.square & 7)
 
     @property
     def pos_chess_notation(self) -> str:
         """ Position on the chess board in standard chess notation """
-        return ChessNotationParser.from_row_and_col(self.pos.row, self.pos.col)
+        return ChessNotationParser.from_row_and_col(self.square >> 3, self.square & 7)
 
     @abstractmethod
-    def possible_moves(self, board: Board) -> List[Move]:
-        """ Interface we can use to generate all possible moves for the piece given the current state of the board """
+    def attacks(self, occupied: int) -> int:
+        """ Bitboard of every square the piece attacks given the occupied squares """
         pass
 
-    def capture(self, board: Board, piece_to_capture: "Piece", moves: List[Move]) -> None:
-        """ Interface used to generate a capture move on the board and add it to the list of moves """
-        if isinstance(piece_to_capture, Piece) and piece_to_capture.color != self.color:
-            move = Move(start_square=self.pos, dest_square=deepcopy(piece_to_capture.pos), board=board)
-            moves.append(move)
+    def possible_moves(self, state: "GameState") -> List[Move]:
+        """ Interface we can use to generate all possible moves for the piece given the current state of the board """
+        moves = array("H")
+        self.add_move_codes(state, targets=FULL, moves=moves)
+        return [Move.from_code(code, state.mailbox) for code in moves]
+
+    def add_move_codes(self, state: "GameState", targets: int, moves: array) -> None:
+        """
+        Append the possible moves landing on one of the target squares, packed into ints (see move.py).
+        The legal move generator narrows the targets down to the squares that don't leave the king in check,
+        and every piece appends to the same array, so nothing but the move ints gets allocated.
+        """
+        square = self.square
+        targets &= self.attacks(state.occupied) & ~state.occupancy[self.side]
+        while targets:
+            dest = targets & -targets
+            moves.append(square | (dest.bit_length() - 1) << 6)
+            targets ^= dest
 
 
 class Pawn(Piece):
+    __slots__ = ()
     value = 1
+    kind = PAWN
 
-    def __init__(self, color: str, row: int, col: int):
-        super().__init__(color=color, row=row, col=col)
+    def attacks(self, occupied: int) -> int:
+        """ Pawns attack one square diagonally forward """
+        return PAWN_ATTACKS[self.side][self.square]
 
-    # TODO: Reduce complexity
-    def possible_moves(self, board: Board) -> List[Move]:
+    def add_move_codes(self, state: "GameState", targets: int, moves: array) -> None:
         """
         Get all the pawn moves for its current position on the board.
         Pawns can't move backwards
         Pawns can move two squares on the first move
-        Pawns Capture Diagonally
+        Pawns Capture Diagonally (including en passant)
+        Pawns reaching the last rank promote, generating one move per promotion piece
         """
-        moves = []
-        row, col = self.pos.row, self.pos.col
-
-        # TODO: Better way to do this?
-        one_square_up = row - 1 if self.color == Color.WHITE else row + 1
-        two_square_up = row - 2 if self.color == Color.WHITE else row + 2
-
-        # In bounds
-        if 7 >= one_square_up >= 0 and 7 >= col >= 0:
-            if board[one_square_up][col] == EMPTY_SQUARE:
-                one_square_advance = Move(start_square=self.pos, dest_square=Square(one_square_up, col), board=board)
-                moves.append(one_square_advance)
-
-                # 2 square pawn advance if it hasn't moved already
-                if self.moves_made == 0 and board[two_square_up][col] == EMPTY_SQUARE:
-                    two_square_advance = Move(
-                        start_square=self.pos, dest_square=Square(two_square_up, col), board=board
-                    )
-                    moves.append(two_square_advance)
-
-            # Check if were in bounds (going left won't push us off the board)
-            if col - 1 >= 0:
-                self.capture(board=board, piece_to_capture=board[one_square_up][col - 1], moves=moves)
-
-            # Check if were in bounds (going right won't push us off the board)
-            if col + 1 <= 7:
-                self.capture(board=board, piece_to_capture=board[one_square_up][col + 1], moves=moves)
-
-        return moves
-
-    def promote(self) -> Piece:
-        """ Promote the pawn """
+        square = self.square
+        occupied = state.occupied
+        step, starting_row = (-8, 6) if self.side == WHITE else (8, 1)
+
+        one_square_up = square + step
+        if not occupied >> one_square_up & 1:
+            if targets >> one_square_up & 1:
+                self._add_moves(square, one_square_up, moves)
+
+            # 2 square pawn advance from the starting row
+            two_square_up = one_square_up + step
+            if square >> 3 == starting_row and not occupied >> two_square_up & 1 and targets >> two_square_up & 1:
+                moves.append(square | two_square_up << 6)
+
+        attacks = self.attacks(occupied)
+        captures = attacks & state.occupancy[1 - self.side] & targets
+        while captures:
+            dest = captures & -captures
+            self._add_moves(square, dest.bit_length() - 1, moves)
+            captures ^= dest
+
+        en_passant = state.en_passant
+        if en_passant is not None and attacks >> en_passant & 1 and targets >> en_passant & 1:
+            moves.append(square | en_passant << 6 | EN_PASSANT << 12)
+
+    @staticmethod
+    def _add_moves(square: int, dest: int, moves: array) -> None:
+        """ Add the move to dest, or one move per promotion piece if dest is on the last rank """
+        if dest < 8 or dest >= 56:
+            for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                moves.append(square | dest << 6 | (PROMOTION + kind - KNIGHT) << 12)
+        else:
+            moves.append(square | dest << 6)
+
+    def promote(self) -> Type[Piece]:
+        """ Ask the player which piece the pawn is promoted to """
         promote_to = {"q": Queen, "k": Knight, "r": Rook, "b": Bishop}
 
         while True:
@@ -109,185 +155,93 @@ class Pawn(Piece):
         promoted_cls = promote_to[promoted_type]
         logger.debug(f"{self} Promoted to {promoted_cls}")
 
-        return promoted_cls(color=self.color.value, row=self.pos.row, col=self.pos.col)
+        return promoted_cls
 
 
 class Bishop(Piece):
+    __slots__ = ()
+    directions = BISHOP_DIRECTIONS
     value = 3
-    _Directions = namedtuple("Directions", "up_right_diag, up_left_diag down_left_diag down_right_diag")
+    kind = BISHOP
 
-    def __init__(self, color: str, row: int, col: int):
-        super().__init__(color=color, row=row, col=col)
-
-    # TODO: Bishop move logic is very similar to rooks, possible refactor (add method on piece?)
-    def possible_moves(self, board: Board) -> List[Move]:
+    def attacks(self, occupied: int) -> int:
         """
         Bishops can only move on diagonals. It can potentially move up to 7 square diagonally if no piece is blocking.
         If it starts on a dark square, it can only attack dark square pieces.
         If it starts on a light square, it can only attack light square pieces
         """
-        moves = []
-        row, col = self.pos.row, self.pos.col
-
-        directions = self._Directions(
-            up_right_diag=Square(-1, 1),
-            up_left_diag=Square(-1, -1),
-            down_left_diag=Square(1, -1),
-            down_right_diag=Square(1, 1),
-        )
-
-        for direction in directions:
-            for i in range(1, 8):
-                row_advancement = row + direction.row * i
-                col_advancement = col + direction.col * i
-
-                if 0 <= row_advancement <= 7 and 0 <= col_advancement <= 7:
-                    piece = board[row_advancement][col_advancement]
-                    if isinstance(piece, Piece) and piece.color == self.color:
-                        break
-                    elif piece == EMPTY_SQUARE:
-                        move = Move(
-                            start_square=self.pos, dest_square=Square(row_advancement, col_advancement), board=board
-                        )
-                        moves.append(move)
-                    else:
-                        self.capture(board=board, piece_to_capture=piece, moves=moves)
-                        break
-        return moves
+        return sliding_attacks(self.square, occupied, self.directions)
 
 
 class Knight(Piece):
+    __slots__ = ()
     value = 3
-    _potential_advancements = [(1, 2), (-1, 2), (1, -2), (-1, -2), (2, 1), (-2, 1), (2, -1), (-2, -1)]
-
-    def __init__(self, color: str, row: int, col: int):
-        super().__init__(color=color, row=row, col=col)
+    kind = KNIGHT
 
-    def possible_moves(self, board: Board) -> List[Move]:
+    def attacks(self, occupied: int) -> int:
         """
         Knights move in L-Shapes on the board and can jump over pieces to reach its destination.
         Two square advancement vertically with one square horizontally or vice versa.
         This means a knight has a maximum of 8 potential landing squares.
         """
-        moves = []
-        row, col = self.pos.row, self.pos.col
-        knight_advancements = [Square(*adv) for adv in self._potential_advancements]
-
-        for advancement in knight_advancements:
-            row_advancement = row + advancement.row
-            col_advancement = col + advancement.col
-
-            # In bounds
-            if 0 <= row_advancement <= 7 and 0 <= col_advancement <= 7:
-                piece = board[row_advancement][col_advancement]
-
-                if isinstance(piece, Piece) and piece.color == self.color:
-                    continue
-                elif piece == EMPTY_SQUARE:
-                    move = Move(
-                        start_square=self.pos, dest_square=Square(row_advancement, col_advancement), board=board
-                    )
-                    moves.append(move)
-                else:
-                    self.capture(board=board, piece_to_capture=piece, moves=moves)
-
-        return moves
+        return KNIGHT_ATTACKS[self.square]
 
 
 class Rook(Piece):
+    __slots__ = ()
+    directions = ROOK_DIRECTIONS
     value = 5
-    _Directions = namedtuple("Directions", "up down left right")
-
-    def __init__(self, color: str, row: int, col: int):
-        super().__init__(color=color, row=row, col=col)
+    kind = ROOK
 
-    def possible_moves(self, board: Board) -> List[Move]:
+    def attacks(self, occupied: int) -> int:
         """
         Rooks can move left-right-up-down any amount of squares as long as pieces aren't in the way
         A rook can potentially move up to 7 squares (in four directions)
         """
-
-        moves = []
-        row, col = self.pos.row, self.pos.col
-        directions = self._Directions(up=Square(-1, 0), down=Square(1, 0), left=Square(0, -1), right=Square(0, 1))
-
-        for direction in directions:
-            for i in range(1, 8):
-                # Up to 7 square advancements for each direction
-                row_advancement = row + direction.row * i
-                col_advancement = col + direction.col * i
-
-                # In bounds
-                if 0 <= row_advancement <= 7 and 0 <= col_advancement <= 7:
-                    piece = board[row_advancement][col_advancement]
-
-                    # Our piece is blocking the square
-                    if isinstance(piece, Piece) and piece.color == self.color:
-                        break
-                    # It's empty... Add the move!
-                    elif piece == EMPTY_SQUARE:
-                        move = Move(
-                            start_square=self.pos, dest_square=Square(row_advancement, col_advancement), board=board
-                        )
-                        moves.append(move)
-                    # Capture enemy piece!
-                    else:
-                        self.capture(board=board, piece_to_capture=piece, moves=moves)
-                        break
-        return moves
+        return sliding_attacks(self.square, occupied, self.directions)
 
 
 class Queen(Piece):
+    __slots__ = ()
+    directions = QUEEN_DIRECTIONS
     value = 9
+    kind = QUEEN
 
-    def __init__(self, color: str, row: int, col: int):
-        super().__init__(color=color, row=row, col=col)
-
-    def possible_moves(self, board: Board) -> List[Move]:
+    def attacks(self, occupied: int) -> int:
         """
         Queens can move any number of unoccupied squares vertically, horizontally or diagonally.
         Thus combining the moves of the rook(vertical/horizontal) and the bishop(diagonal)
         """
-        # This feels hacky but this abstraction will work for now
-        _rook = Rook(color=self.color.value, row=self.pos.row, col=self.pos.col)
-        _bishop = Bishop(color=self.color.value, row=self.pos.row, col=self.pos.col)
-        moves = [*_rook.possible_moves(board), *_bishop.possible_moves(board)]
-
-        return moves
+        return sliding_attacks(self.square, occupied, self.directions)
 
 
 class King(Piece):
+    __slots__ = ()
     value = 100
-    _potential_advancements = [(0, -1), (0, 1), (1, -1), (1, 0), (1, 1), (-1, -1), (-1, 0), (-1, 1)]
+    kind = KING
 
-    def __init__(self, color: str, row: int, col: int):
-        super().__init__(color=color, row=row, col=col)
+    def attacks(self, occupied: int) -> int:
+        """ Kings can only move one space in any direction. Up to 8 potential landing squares. """
+        return KING_ATTACKS[self.square]
 
-    def possible_moves(self, board: Board) -> List[Move]:
+    def add_move_codes(self, state: "GameState", targets: int, moves: array) -> None:
         """
-        Kings can only move one space in any direction. Up to 8 potential landing squares.
-        The king can never move into a spot where it will be danger (checked)
+        One step moves plus castling.
+        Castling needs the right to castle on that side, empty squares between the king and rook,
+        and the king can't castle out of, through or into check.
         """
-        moves = []
-        row, col = self.pos.row, self.pos.col
-        king_advancements = [Square(*adv) for adv in self._potential_advancements]
-
-        for advancement in king_advancements:
-            row_advancement = row + advancement.row
-            col_advancement = col + advancement.col
-
-            # In bounds
-            if 0 <= row_advancement <= 7 and 0 <= col_advancement <= 7:
-                piece = board[row_advancement][col_advancement]
-
-                if isinstance(piece, Piece) and piece.color == self.color:
-                    continue
-                elif piece == EMPTY_SQUARE:
-                    move = Move(
-                        start_square=self.pos, dest_square=Square(row_advancement, col_advancement), board=board
-                    )
-                    moves.append(move)
-                else:
-                    self.capture(board=board, piece_to_capture=piece, moves=moves)
-
-        return moves
+        super().add_move_codes(state, targets, moves)
+        square = self.square
+
+        for right, king_start, king_dest, must_be_empty, must_be_safe in CASTLING_MOVES[self.side]:
+            if (
+                state.castling_rights & right
+                and square == king_start
+                and targets >> king_dest & 1
+                and not state.occupied & must_be_empty
+                and not any(state._is_attacked(sq, 1 - self.side) for sq in must_be_safe)
+            ):
+                moves.append(square | king_dest << 6 | CASTLE << 12)
+
+
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)  # Indexed by Piece.kind
@@ -0,0 +1,188 @@
+"""
+Validate a game corpus in parallel: the PGN files are read as a stream and cut into chunks of games, the chunks are
+replayed by a pool of worker processes, and the reports come back in the order of the corpus.
+
+Every move is checked against GameState's legal move generator, a game stops being replayed at its first illegal
+or unreadable move. Only a bounded number of chunks is in flight at a time, so memory doesn't grow with the corpus.
+
+Usage:
+    python -m chess.replay games.pgn.gz more_games.pgn --workers 8
+    python -m chess.replay nightly.pgn --chunk-size 500 --errors
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .pgn import PgnError, from_san, read_games
+from .state import GameState
+
+GameRecord = Tuple[Dict[str, str], List[str]]  # Headers and SAN moves, as read_games yields them
+
+_PROGRESS_INTERVAL = 1.0  # Seconds between progress lines
+
+
+@dataclass
+class GameReport:
+    index: int  # Position of the game in the corpus, counting from 0
+    plies: int  # Moves replayed, up to the first illegal one
+    result: str  # Result header, "*" if missing
+    final_result: str  # Result on the board after the last move: "1-0", "0-1", "1/2-1/2", or "*" if the game goes on
+    error: Optional[str] = None  # Why the replay stopped early
+
+
+@dataclass
+class ReplayStats:
+    games: int = 0
+    plies: int = 0
+    illegal: int = 0  # Games with an illegal or unreadable move
+    mismatched: int = 0  # Games that ended on the board with a different result than their Result header
+    results: Counter = field(default_factory=Counter)  # Result header -> games
+    seconds: float = 0.0
+
+    def add(self, report: GameReport) -> None:
+        self.games += 1
+        self.plies += report.plies
+        self.results[report.result] += 1
+        if report.error is not None:
+            self.illegal += 1
+        elif report.final_result != "*" and report.result != report.final_result:
+            self.mismatched += 1
+
+    def __str__(self) -> str:
+        games_per_second = self.games / self.seconds if self.seconds else 0
+        plies_per_second = self.plies / self.seconds if self.seconds else 0
+        return (
+            f"{self.games} games, {self.plies} plies in {self.seconds:.1f}s "
+            f"({games_per_second:.0f} games/s, {plies_per_second:.0f} plies/s), "
+            f"{self.illegal} illegal, {self.mismatched} result mismatches"
+        )
+
+
+def validate_game(index: int, headers: Dict[str, str], sans: List[str]) -> GameReport:
+    """ Replay one game from its starting position (FEN header or the standard one) and report on it """
+    result = headers.get("Result", "*")
+    try:
+        state = GameState(fen=headers.get("FEN"), move_cache_size=0)
+    except Exception as error:
+        return GameReport(index=index, plies=0, result=result, final_result="*", error=f"bad FEN: {error}")
+
+    ply = 0
+    try:
+        for ply, san in enumerate(sans):
+            state._make_move(from_san(state, san))
+        ply = len(sans)
+        final_result = "*"
+        if not state.get_valid_move_codes():
+            final_result = ("0-1" if state.white_turn else "1-0") if state.in_check() else "1/2-1/2"
+    except PgnError as error:
+        return GameReport(index=index, plies=ply, result=result, final_result="*", error=f"ply {ply + 1}: {error}")
+    except Exception as exc:  # A bug hit by one game is reported on that game instead of stopping the whole run
+        error = f"ply {ply + 1}: unexpected {type(exc).__name__}: {exc}"
+        return GameReport(index=index, plies=ply, result=result, final_result="*", error=error)
+    return GameReport(index=index, plies=len(sans), result=result, final_result=final_result)
+
+
+def validate_chunk(first_index: int, games: List[GameRecord]) -> List[GameReport]:
+    """ Worker: validate a chunk of consecutive games, the first one being game first_index of the corpus """
+    return [validate_game(first_index + offset, headers, sans) for offset, (headers, sans) in enumerate(games)]
+
+
+def read_corpus(paths: Iterable[str]) -> Iterator[GameRecord]:
+    """ Games of all the PGN files one after the other """
+    for path in paths:
+        yield from read_games(path)
+
+
+def replay_corpus(
+    games: Iterable[GameRecord],
+    workers: Optional[int] = None,
+    chunk_size: int = 200,
+    on_chunk: Optional[Callable[[List[GameReport]], None]] = None,
+) -> Iterator[GameReport]:
+    """
+    Validate the games in chunks of chunk_size over a pool of worker processes (os.cpu_count() by default) and yield
+    the reports in corpus order. With one worker the chunks are validated in this process.
+    on_chunk: Called with the reports of each chunk as it's done, e.g. for progress reporting.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunked(games, chunk_size)
+
+    if workers == 1:
+        for first_index, chunk in chunks:
+            reports = validate_chunk(first_index, chunk)
+            if on_chunk is not None:
+                on_chunk(reports)
+            yield from reports
+        return
+
+    # Keep a couple of chunks per worker queued, results are taken in submission order
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for first_index, chunk in chunks:
+            pending.append(executor.submit(validate_chunk, first_index, chunk))
+            if len(pending) >= 2 * workers:
+                yield from _collect(pending.popleft(), on_chunk)
+        while pending:
+            yield from _collect(pending.popleft(), on_chunk)
+
+
+def _chunked(games: Iterable[GameRecord], chunk_size: int) -> Iterator[Tuple[int, List[GameRecord]]]:
+    """ (index of the first game, games) chunks, read from the stream as they're needed """
+    games = iter(games)
+    first_index = 0
+    while True:
+        chunk = list(islice(games, chunk_size))
+        if not chunk:
+            return
+        yield first_index, chunk
+        first_index += len(chunk)
+
+
+def _collect(future, on_chunk: Optional[Callable[[List[GameReport]], None]]) -> List[GameReport]:
+    reports = future.result()
+    if on_chunk is not None:
+        on_chunk(reports)
+    return reports
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess.replay", description="Validate PGN game corpora in parallel")
+    parser.add_argument("paths", nargs="+", help="PGN files, .pgn.gz files are decompressed on the fly")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="games sent to a worker at a time")
+    parser.add_argument("--errors", action="store_true", help="print every game with an illegal move")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines, only the summary")
+    args = parser.parse_args(argv)
+
+    stats = ReplayStats()
+    start = last_progress = time.perf_counter()
+
+    def on_chunk(reports: List[GameReport]) -> None:
+        nonlocal last_progress
+        for report in reports:
+            stats.add(report)
+        now = time.perf_counter()
+        stats.seconds = now - start
+        if not args.quiet and now - last_progress >= _PROGRESS_INTERVAL:
+            last_progress = now
+            print(stats, file=sys.stderr, flush=True)
+
+    games = read_corpus(args.paths)
+    for report in replay_corpus(games, workers=args.workers, chunk_size=args.chunk_size, on_chunk=on_chunk):
+        if args.errors and report.error is not None:
+            print(f"game {report.index + 1}: {report.error}")
+
+    stats.seconds = time.perf_counter() - start
+    print(stats)
+    print("results: " + ", ".join(f"{result} {count}" for result, count in stats.results.most_common()))
+    return 1 if stats.illegal else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Game server: hosts many games at once over TCP, speaking line delimited JSON.
+
+Every request is one JSON object on a line, answered by one line in the order the requests came in:
+    {"op": "new_game", "fen": "..."}            -> {"ok": true, "game": "1", "fen": ..., "turn": "w", ...}
+    {"op": "move", "game": "1", "move": "Nf3"}  -> {"ok": true, "move": "Nf3", "fen": ..., ...}
+    {"op": "legal_moves", "game": "1"}          -> {"ok": true, "moves": ["a3", "a4", ...]}
+    {"op": "undo", "game": "1"}                 -> {"ok": true, "fen": ..., ...}
+    {"op": "state", "game": "1"}                -> {"ok": true, "fen": ..., "turn": "w", "status": "playing", ...}
+    {"op": "close", "game": "1"}                -> {"ok": true}
+Moves are in SAN (see pgn.py), "fen" is optional for new games. A request can carry an "id", which is echoed back.
+Errors come back as {"ok": false, "error": "..."}. A game lasts until it's closed or the client that started it
+disconnects.
+
+Move generation and validation run in a thread pool so the event loop keeps serving the other connections while
+a game is busy. Requests on the same game are handled one at a time.
+
+Usage:
+    python -m chess.server --host 127.0.0.1 --port 8765
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .pgn import from_san, to_san
+from .settings import Settings
+from .state import GameState
+
+logger = logging.getLogger(__name__)
+
+Response = Dict[str, Any]
+
+
+class RequestError(Exception):
+    """ The request can't be carried out, the message is sent back to the client """
+
+
+class _Session:
+    __slots__ = ("state", "lock")
+
+    def __init__(self, state: GameState):
+        self.state = state
+        self.lock = asyncio.Lock()
+
+
+class GameServer:
+    """
+    Games by id and the request handlers working on them.
+    executor: Where the CPU work on the games runs, a thread pool by default.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None, move_cache_size: int = Settings.SERVER_MOVE_CACHE_SIZE):
+        self.sessions: Dict[str, _Session] = {}
+        self.executor = executor or ThreadPoolExecutor(thread_name_prefix="chess-server")
+        self.move_cache_size = move_cache_size
+        self._game_ids = itertools.count(1)
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "new_game": self._new_game,
+            "move": self._move,
+            "legal_moves": self._legal_moves,
+            "undo": self._undo,
+            "state": self._state,
+            "close": self._close,
+        }
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        """ Start listening, the returned server is already serving """
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.debug(f"Serving on {', '.join(str(socket.getsockname()) for socket in server.sockets)}")
+        return server
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """ Answer the requests of one client until it disconnects, then drop the games it started """
+        game_ids: Set[str] = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.handle_request(line)
+                if response["ok"] and "game" in response:  # Only new_game answers with the game id
+                    game_ids.add(response["game"])
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as error:
+            logger.debug(f"Dropping connection: {error!r}")
+        finally:
+            for game_id in game_ids:
+                self.sessions.pop(game_id, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def handle_request(self, line: bytes) -> Response:
+        """ Response to one request line """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "request isn't valid JSON"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "request isn't a JSON object"}
+
+        handler = self._handlers.get(request.get("op"))
+        try:
+            if handler is None:
+                raise RequestError(f"unknown op {request.get('op')!r}")
+            response = {"ok": True, **await handler(request)}
+        except RequestError as error:
+            response = {"ok": False, "error": str(error)}
+        except Exception as error:  # A bug hit by one request mustn't drop the connection and its other games
+            logger.exception(f"Request {request.get('op')!r} failed")
+            response = {"ok": False, "error": f"internal error: {error!r}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    async def _run(self, function: Callable[..., Response], *args) -> Response:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def _session(self, request: Dict[str, Any]) -> _Session:
+        session = self.sessions.get(str(request.get("game")))
+        if session is None:
+            raise RequestError(f"no game {request.get('game')!r}")
+        return session
+
+    async def _new_game(self, request: Dict[str, Any]) -> Response:
+        fen = request.get("fen")
+        if fen is not None and not isinstance(fen, str):
+            raise RequestError("fen has to be a string")
+        state = await self._run(_new_state, fen, self.move_cache_size)
+        game_id = str(next(self._game_ids))
+        self.sessions[game_id] = _Session(state)
+        return {"game": game_id, **await self._run(_describe, state)}
+
+    async def _move(self, request: Dict[str, Any]) -> Response:
+        session = self._session(request)
+        san = request.get("move")
+        if not isinstance(san, str):
+            raise RequestError("move has to be a string in SAN, e.g. Nf3")
+        async with session.lock:
+            return await self._run(_play, session.state, san)
+
+    async def _legal_moves(self, request: Dict[str, Any]) -> Response:
+        session = self._session(request)
+        async with session.lock:
+            return await self._run(_legal_moves, session.state)
+
+    async def _undo(self, request: Dict[str, Any]) -> Response:
+        session = self._session(request)
+        async with session.lock:
+            return await self._run(_undo, session.state)
+
+    async def _state(self, request: Dict[str, Any]) -> Response:
+        session = self._session(request)
+        async with session.lock:
+            return await self._run(_describe, session.state)
+
+    async def _close(self, request: Dict[str, Any]) -> Response:
+        session = self._session(request)
+        async with session.lock:  # Let the request working on the game finish first
+            self.sessions.pop(str(request["game"]), None)
+        return {}
+
+
+# The work on the games, run in the executor
+
+
+def _new_state(fen: Optional[str], move_cache_size: int) -> GameState:
+    try:
+        return GameState(fen=fen, move_cache_size=move_cache_size)
+    except ValueError as error:
+        raise RequestError(f"bad FEN: {error}") from None
+
+
+def _play(state: GameState, san: str) -> Response:
+    try:
+        move = from_san(state, san)
+    except ValueError as error:
+        raise RequestError(str(error)) from None
+    played = to_san(state, move)
+    state._make_move(move)
+    return {"move": played, **_describe(state)}
+
+
+def _legal_moves(state: GameState) -> Response:
+    return {"moves": [to_san(state, move) for move in state.get_valid_moves()]}
+
+
+def _undo(state: GameState) -> Response:
+    if not state.move_log:
+        raise RequestError("no move to undo")
+    state.undo_move()
+    return _describe(state)
+
+
+def _describe(state: GameState) -> Response:
+    codes = state.get_valid_move_codes()
+    in_check = state.in_check()
+    if codes:
+        status = "playing"
+    else:
+        status = "checkmate" if in_check else "stalemate"
+    return {
+        "fen": state.to_fen(),
+        "turn": "w" if state.white_turn else "b",
+        "status": status,
+        "check": in_check,
+        "ply": len(state.move_log),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m chess.server", description="Host games over line delimited JSON")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument("--threads", type=int, default=None, help="threads the game work runs on")
+    args = parser.parse_args(argv)
+
+    async def run() -> None:
+        game_server = GameServer(executor=ThreadPoolExecutor(max_workers=args.threads))
+        server = await game_server.serve(args.host, args.port)
+        print(f"Serving on {args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
+import os
+
+
 class Settings:
     WIDTH = 800
     HEIGHT = 800
     SQUARE_SIZE = HEIGHT // 8
     BOARD_COLORS = ("white", "gray")
     IMAGE_DIR = "images"
+    SPRITE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "python-chess")  # None to skip the cache
+    MAX_FPS = 60  # Cap on the GUI repaints per second, it only repaints after input
+    MOVE_CACHE_SIZE = 4096  # Positions kept in GameState.move_cache
+    SERVER_MOVE_CACHE_SIZE = 256  # Positions kept per game hosted by chess.server, which holds many games at once
+    HISTORY_CHECKPOINT_INTERVAL = 16  # Plies between the positions GameHistory keeps to jump through the game from
+    SEARCH_DEPTH = 3  # Plies the engine searches when it isn't given a depth or time limit
+    TRANSPOSITION_TABLE_SIZE = 1 << 16  # Positions kept in the engine's transposition table
@@ -0,0 +1,81 @@
+"""
+Piece sprites for the GUI, scaled to the square size and kept in a cache file so later launches skip the PNG
+decoding and scaling.
+
+There's a cache file per square size, sprites_<size>.bin in Settings.SPRITE_CACHE_DIR, laid out little endian as:
+the 8 byte magic SPRITE_MAGIC, the square size (uint16), a checksum of the source images' sizes and modification times
+(uint32), then the raw RGBA pixels of the sprites in SPRITE_NAMES order. It's rebuilt when the images change.
+"""
+import logging
+import os
+import struct
+import zlib
+from typing import Dict, List, Optional
+
+import pygame
+
+from .piece import PIECE_CLASSES
+
+logger = logging.getLogger(__name__)
+
+SPRITE_NAMES = tuple(color + piece_class.__name__ for color in "wb" for piece_class in PIECE_CLASSES)  # e.g. bKnight
+SPRITE_MAGIC = b"CHSSPRT1"
+_HEADER = struct.Struct("<8sHI")
+
+# frombytes/tobytes are pygame 2.1.3+, the 2.0.2 in requirements.txt only has the deprecated fromstring/tostring
+_frombytes = getattr(pygame.image, "frombytes", None) or pygame.image.fromstring
+_tobytes = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+
+
+def load_sprites(image_dir: str, size: int, cache_dir: Optional[str] = None) -> Dict[str, pygame.Surface]:
+    """
+    The piece sprites by name (see Piece.name), scaled to size x size pixels and converted to the display's pixel
+    format, so call it after pygame.display.set_mode. Without a cache_dir the images are always loaded from image_dir.
+    """
+    paths = [os.path.join(image_dir, f"{name}.png") for name in SPRITE_NAMES]
+    stamp = _stamp(paths)
+    cache_path = os.path.join(cache_dir, f"sprites_{size}.bin") if cache_dir else None
+
+    sprites = _read_cache(cache_path, size, stamp) if cache_path else None
+    if sprites is None:
+        sprites = [pygame.transform.scale(pygame.image.load(path), (size, size)) for path in paths]
+        if cache_path:
+            _write_cache(cache_path, size, stamp, sprites)
+    return {name: sprite.convert_alpha() for name, sprite in zip(SPRITE_NAMES, sprites)}
+
+
+def _stamp(paths: List[str]) -> int:
+    """ Checksum of the sizes and modification times of the images, which changes when any of them does """
+    stats = [os.stat(path) for path in paths]
+    return zlib.crc32(repr([(stat.st_size, stat.st_mtime_ns) for stat in stats]).encode())
+
+
+def _read_cache(path: str, size: int, stamp: int) -> Optional[List[pygame.Surface]]:
+    """ The cached sprites, None if the file is missing, stale or broken """
+    sprite_bytes = size * size * 4
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    expected_length = _HEADER.size + len(SPRITE_NAMES) * sprite_bytes
+    if len(data) != expected_length or _HEADER.unpack_from(data) != (SPRITE_MAGIC, size, stamp):
+        logger.debug(f"Sprite cache {path} is stale, rebuilding it")
+        return None
+
+    offsets = range(_HEADER.size, len(data), sprite_bytes)
+    return [_frombytes(data[offset : offset + sprite_bytes], (size, size), "RGBA") for offset in offsets]
+
+
+def _write_cache(path: str, size: int, stamp: int, sprites: List[pygame.Surface]) -> None:
+    """ Save the sprites, the GUI works without the cache so failing to write it is only logged """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(_HEADER.pack(SPRITE_MAGIC, size, stamp))
+            for sprite in sprites:
+                file.write(_tobytes(sprite, "RGBA"))
+        os.replace(temporary_path, path)  # Readers never see a half written file
+    except OSError as error:
+        logger.debug(f"Couldn't write the sprite cache {path}: {error}")
@@ -1,45 +1,19 @@
 from .piece import Bishop, King, Knight, Pawn, Queen, Rook
+from .utils import EMPTY_SQUARE, Board
 
-BLACKS_STARTING_KINGS_ROW = [
-    Rook(color="b", row=0, col=0),
-    Knight(color="b", row=0, col=1),
-    Bishop(color="b", row=0, col=2),
-    Queen(color="b", row=0, col=3),
-    King(color="b", row=0, col=4),
-    Bishop(color="b", row=0, col=5),
-    Knight(color="b", row=0, col=6),
-    Rook(color="b", row=0, col=7),
-]
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+STARTING_KINGS_ROW = (Rook, Knight, Bishop, Queen, King, Bishop, Knight, Rook)  # Piece types from the a to the h file
 
-BLACKS_STARTING_PAWN_ROW = [
-    Pawn(color="b", row=1, col=0),
-    Pawn(color="b", row=1, col=1),
-    Pawn(color="b", row=1, col=2),
-    Pawn(color="b", row=1, col=3),
-    Pawn(color="b", row=1, col=4),
-    Pawn(color="b", row=1, col=5),
-    Pawn(color="b", row=1, col=6),
-    Pawn(color="b", row=1, col=7),
-]
 
-WHITES_STARTING_KINGS_ROW = [
-    Rook(color="w", row=7, col=0),
-    Knight(color="w", row=7, col=1),
-    Bishop(color="w", row=7, col=2),
-    Queen(color="w", row=7, col=3),
-    King(color="w", row=7, col=4),
-    Bishop(color="w", row=7, col=5),
-    Knight(color="w", row=7, col=6),
-    Rook(color="w", row=7, col=7),
-]
-
-WHITES_STARTING_PAWN_ROW = [
-    Pawn(color="w", row=6, col=0),
-    Pawn(color="w", row=6, col=1),
-    Pawn(color="w", row=6, col=2),
-    Pawn(color="w", row=6, col=3),
-    Pawn(color="w", row=6, col=4),
-    Pawn(color="w", row=6, col=5),
-    Pawn(color="w", row=6, col=6),
-    Pawn(color="w", row=6, col=7),
-]
+def starting_board() -> Board:
+    """
+    8x8 board with the pieces in their starting squares.
+    The pieces are created when a board is asked for (every game gets its own), not when the module is imported.
+    """
+    return [
+        [piece_cls(color="b", row=0, col=col) for col, piece_cls in enumerate(STARTING_KINGS_ROW)],
+        [Pawn(color="b", row=1, col=col) for col in range(8)],
+        *([EMPTY_SQUARE] * 8 for _ in range(4)),
+        [Pawn(color="w", row=6, col=col) for col in range(8)],
+        [piece_cls(color="w", row=7, col=col) for col, piece_cls in enumerate(STARTING_KINGS_ROW)],
+    ]
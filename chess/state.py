@@ -1,24 +1,69 @@
-import copy
 import logging
-import pygame
+import struct
 import sys
-
-from typing import List
-from functools import reduce
-from itertools import chain
-
-from .piece import Piece, King
-from .move import Move
-from .utils import EMPTY_SQUARE, Board, Color, Square
-from .starting_pieces import (
-    BLACKS_STARTING_KINGS_ROW,
-    BLACKS_STARTING_PAWN_ROW,
-    WHITES_STARTING_KINGS_ROW,
-    WHITES_STARTING_PAWN_ROW,
+import time
+
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .bitboard import (
+    ALL_CASTLING_RIGHTS,
+    BISHOP,
+    BISHOP_DIRECTIONS,
+    BISHOP_RAYS,
+    BLACK,
+    BLACK_KINGSIDE,
+    BLACK_QUEENSIDE,
+    CASTLING_MOVES,
+    CASTLING_RIGHTS_MASK,
+    CASTLING_ROOK_MOVES,
+    FULL,
+    KING,
+    KING_ATTACKS,
+    KNIGHT,
+    KNIGHT_ATTACKS,
+    PAWN,
+    PAWN_ATTACKS,
+    QUEEN,
+    ROOK,
+    ROOK_DIRECTIONS,
+    ROOK_RAYS,
+    WHITE,
+    WHITE_KINGSIDE,
+    WHITE_QUEENSIDE,
+    iter_bits,
+    sliding_attacks,
 )
+from .cache import MoveCache
+from .chess_notation import ChessNotationParser
+from .move import CASTLE, EN_PASSANT, PROMOTION, Move
+from .piece import PIECE_CLASSES, Piece, King
+from .settings import Settings
+from .utils import EMPTY_SQUARE, Board, Color
+from .zobrist import BLACK_TO_MOVE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS, PIECE_KEYS, position_key
+from .starting_pieces import starting_board
 
 logger = logging.getLogger(__name__)
 
+FEN_PIECE_LETTERS = "PNBRQKpnbrqk"  # Indexed by Piece.code
+_FEN_PIECES = {  # FEN letter -> (piece type, color)
+    letter: (PIECE_CLASSES[code % 6], "w" if code < 6 else "b") for code, letter in enumerate(FEN_PIECE_LETTERS)
+}
+_FEN_EMPTY_SQUARES = {str(count): count for count in range(1, 9)}
+_FEN_CASTLING = {"K": WHITE_KINGSIDE, "Q": WHITE_QUEENSIDE, "k": BLACK_KINGSIDE, "q": BLACK_QUEENSIDE}
+_FEN_SQUARES = {ChessNotationParser.from_row_and_col(row=square >> 3, col=square & 7): square for square in range(64)}
+DEFAULT_FEN_FIELDS = ["", "", "-", "-", "0", "1"]  # Placement, side, castling, en passant, halfmove, fullmove
+_BACK_RANKS = 0xFF | 0xFF << 56  # Ranks 8 and 1, no pawn can stand there
+_MAX_CLOCK = 0xFFFF  # Move clocks are stored in 16 bits by to_bytes
+
+# Binary snapshots (see GameState.to_bytes): a fixed size header with the current position, then one little endian
+# 64-bit word per move of the log: the move code in the low 16 bits, its GameState._undo_record above
+SNAPSHOT_VERSION = 2
+# Version, placement (Piece.code + 1 per square, 4 bits each), flags, en passant (64: none), halfmove clock,
+# fullmove number, Zobrist key, moves in the log
+_SNAPSHOT_HEADER = struct.Struct("<B32sBBHHQH")
+_NO_EN_PASSANT = 64
+
 
 class GameState:
     """
@@ -26,67 +71,154 @@ class GameState:
     Update state (make moves), record move log, keep track of who's got the piece advantage etc."
     """
 
-    def __init__(self):
+    def __init__(self, move_cache_size: int = Settings.MOVE_CACHE_SIZE, fen: Optional[str] = None):
         """
-        board: 8x8 matrix with starting chess pieces for black/white. '**' represents empty squares.
+        fen: Position to start from in Forsyth-Edwards Notation, the starting position if not given.
+        bitboards: One 64-bit occupancy mask per piece type and color, indexed by Piece.code.
+        occupancy: Occupancy mask of all white pieces and all black pieces.
+        mailbox: Flat 64 square board holding the piece objects. '**' represents empty squares.
+        castling_rights: Bit flags of the castling moves still available (see bitboard.py).
+        en_passant: Square a pawn can capture en passant onto, None if the last move wasn't a double pawn push.
+        key: 64-bit Zobrist key of the position, kept up to date by every move/undo (see zobrist.py).
+        move_cache: Legal moves of recently seen positions, keyed by the Zobrist key.
+        pieces: The pieces on the board of each side, indexed by Piece.side.
+        king_squares: Square of each side's king.
+        material: Running total of the piece values of each side.
+        The piece index (pieces/king_squares/material) is kept up to date by _put_piece/_remove_piece.
+        halfmove_clock: Moves (plies) since the last capture or pawn move, for the fifty-move rule.
+        fullmove_number: Starts at 1 and goes up after every black move.
         """
-
-        self.board = self.initial_board_state()
+        self.bitboards = [0] * 12
+        self.occupancy = [0, 0]
+        self.mailbox = [EMPTY_SQUARE] * 64
+        self.pieces = ([], [])
+        self.king_squares = [None, None]
+        self.material = [0, 0]
+        self.castling_rights = ALL_CASTLING_RIGHTS
+        self.en_passant = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.key = 0
         self.move_log = []
-        self.time_elapsed = pygame.time.Clock()
+        # (castling rights, en passant square, halfmove clock, key, moved piece, captured piece) for each move
+        self._state_log = []
+        self.start_time = time.monotonic()
         self.white_turn = True
         self.checkmate = False  # No valid moves while the king in check
         self.stalemate = False  # No valid moves while the king is not in check
+        self.move_cache = MoveCache(max_entries=move_cache_size)
+
+        if fen is None:
+            self._load_board(self.initial_board_state())
+            self.key = position_key(self)
+        else:
+            self._load_fen(fen)
 
     def __repr__(self) -> str:
         """ Current chess board state represented in unicode """
         # TODO: Print unicode chess board
         return str(self.board)
 
-    def __len__(self) -> str:
-        """ Return the total time elapsed in the game """
-        return self.time_elapsed
+    def __len__(self) -> int:
+        """ Return the total time elapsed in the game (whole seconds) """
+        return int(self.time_elapsed)
+
+    @property
+    def time_elapsed(self) -> float:
+        """ Seconds since the game started """
+        return time.monotonic() - self.start_time
 
     @staticmethod
     def initial_board_state() -> Board:
-        board = [
-            [*BLACKS_STARTING_KINGS_ROW],
-            [*BLACKS_STARTING_PAWN_ROW],
-            [EMPTY_SQUARE for _ in range(8)],
-            [EMPTY_SQUARE for _ in range(8)],
-            [EMPTY_SQUARE for _ in range(8)],
-            [EMPTY_SQUARE for _ in range(8)],
-            [*WHITES_STARTING_PAWN_ROW],
-            [*WHITES_STARTING_KINGS_ROW],
-        ]
-
-        return copy.deepcopy(board)
+        return starting_board()
+
+    @classmethod
+    def from_fen(cls, fen: str, move_cache_size: int = Settings.MOVE_CACHE_SIZE) -> "GameState":
+        """
+        Alternate constructor to set up a position from Forsyth-Edwards Notation
+        e.g. rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1
+        Only the placement and side to move are required, raises ValueError if the FEN can't be read.
+        """
+        return cls(move_cache_size=move_cache_size, fen=fen)
+
+    def to_fen(self) -> str:
+        """ The position in Forsyth-Edwards Notation """
+        rows = []
+        for row in range(8):
+            text, empty = "", 0
+            for piece in self.mailbox[row * 8 : row * 8 + 8]:
+                if piece == EMPTY_SQUARE:
+                    empty += 1
+                    continue
+                if empty:
+                    text, empty = text + str(empty), 0
+                text += FEN_PIECE_LETTERS[piece.code]
+            rows.append(text + str(empty) if empty else text)
+
+        side = "w" if self.white_turn else "b"
+        castling = "".join(letter for letter, right in _FEN_CASTLING.items() if self.castling_rights & right) or "-"
+        en_passant = "-"
+        if self.en_passant is not None:
+            en_passant = ChessNotationParser.from_row_and_col(row=self.en_passant >> 3, col=self.en_passant & 7)
+        return f"{'/'.join(rows)} {side} {castling} {en_passant} {self.halfmove_clock} {self.fullmove_number}"
+
+    @classmethod
+    def from_bytes(cls, data: bytes, move_cache_size: int = Settings.MOVE_CACHE_SIZE) -> "GameState":
+        """ Alternate constructor restoring a game saved by to_bytes, raises ValueError if the data isn't a snapshot """
+        state = cls(move_cache_size=move_cache_size)
+        state._load_snapshot(data)
+        return state
+
+    def to_bytes(self) -> bytes:
+        """
+        Compact binary snapshot of the game, variable size: 49 bytes for the current position, its key and the game
+        over flags, plus 8 bytes per move played (the move and its undo record), so from_bytes doesn't replay anything.
+        """
+        placement, white_turn, castling_rights, en_passant, halfmove, fullmove, key = self._save_checkpoint()
+        packed = bytearray(32)
+        for square, code in enumerate(placement):
+            packed[square >> 1] |= code << (square & 1) * 4
+        flags = white_turn | castling_rights << 1 | self.checkmate << 5 | self.stalemate << 6
+        header = _SNAPSHOT_HEADER.pack(
+            SNAPSHOT_VERSION,
+            bytes(packed),
+            flags,
+            _NO_EN_PASSANT if en_passant is None else en_passant,
+            halfmove,
+            fullmove,
+            key,
+            len(self.move_log),
+        )
+
+        moves = array("Q", [move.code | self._undo_record(ply)[0] << 16 for ply, move in enumerate(self.move_log)])
+        if sys.byteorder == "big":
+            moves.byteswap()
+        return header + moves.tobytes()
+
+    @property
+    def board(self) -> Board:
+        """ 8x8 matrix view of the mailbox, derived on access for the GUI and player input """
+        return [self.mailbox[row * 8 : row * 8 + 8] for row in range(8)]
+
+    @property
+    def occupied(self) -> int:
+        """ Bitboard of every occupied square """
+        return self.occupancy[0] | self.occupancy[1]
 
     @property
     def all_pieces(self) -> List[Piece]:
         """ Return a 1D list containing all active pieces on the board"""
-        board = copy.deepcopy(self.board)
-        flattened_board = list(chain.from_iterable(board))
-        return list(filter(lambda p: isinstance(p, Piece), flattened_board))  # filter out empty squares
+        return self.pieces[WHITE] + self.pieces[BLACK]
 
     @property
     def current_color(self) -> Color:
         return Color.WHITE if self.white_turn else Color.BLACK
 
-    @staticmethod
-    def _get_total_piece_score(pieces: List[Piece]) -> int:
-        """ Add up all the values for each piece """
-        return reduce(lambda a, b: a + b, [p.value for p in pieces])
-
     def score(self) -> None:
         """ Who has the piece advantage? """
         logger.debug(f"{self.current_color} Turn")
 
-        white_pieces = list(filter(lambda p: p.color == Color.WHITE, self.all_pieces))
-        black_pieces = list(filter(lambda p: p.color == Color.BLACK, self.all_pieces))
-
-        white_score = self._get_total_piece_score(white_pieces)
-        black_score = self._get_total_piece_score(black_pieces)
+        white_score, black_score = self.material
 
         result = "No player has a piece advantage, the game is even"
 
@@ -100,7 +232,7 @@ class GameState:
 
     def king(self, color: Color) -> King:
         """ Return king object given the color """
-        return list(filter(lambda p: isinstance(p, King) and p.color == color, self.all_pieces)).pop()
+        return self.mailbox[self.king_squares[WHITE if color == Color.WHITE else BLACK]]
 
     def make_move(self, move: Move) -> None:
         """ Move a piece on the chess board """
@@ -113,105 +245,203 @@ class GameState:
             logger.debug(f"GAME OVER! STALEMATE!")
             sys.exit(1)
 
-        if move in valid_moves:
-            logger.debug(f"Move made: {move}")
-            self._make_move(move=move)
-
-            if move.is_pawn_promotion():
-                promoted = move.piece_to_move.promote()
-                self.board[move.dest_row][move.dest_col] = promoted
-        else:
+        # Play the generated move, it carries the castling/en passant details a clicked move doesn't have
+        matches = [valid_move for valid_move in valid_moves if valid_move.code & 0xFFF == move.code & 0xFFF]
+        if not matches:
             logger.debug(f"{move} isn't a valid move. Please make a valid move")
+            return
+
+        if len(matches) > 1:  # A promotion, there's a move per piece the pawn can become
+            promotion = move.promotion
+            if promotion is None:
+                promotion = move.piece_to_move.promote().kind  # Only ask the player once the move is known to be legal
+            matches = [valid_move for valid_move in matches if valid_move.promotion == promotion]
+        move = matches[0]
+        logger.debug(f"Move made: {move}")
+        self._make_move(move=move)
+        self.get_valid_moves()  # Flag checkmate/stalemate for the player to move
 
     def _make_move(self, move: Move) -> None:
         """ Make a move without validating it """
-        # Makes original spot empty since we're moving the piece
-        piece = move.piece_to_move
+        code = move.code
+        start, dest, flag = code & 63, code >> 6 & 63, code >> 12
+        captured_square = (start & 56) | (dest & 7) if flag == EN_PASSANT else dest
+        piece, captured = self.mailbox[start], self.mailbox[captured_square]
+        self._state_log.append((self.castling_rights, self.en_passant, self.halfmove_clock, self.key, piece, captured))
+
+        if captured != EMPTY_SQUARE:
+            self._remove_piece(captured_square)
 
-        self._make_square_empty(row=move.start_row, col=move.start_col)
-        self.board[move.dest_row][move.dest_col] = piece  # Move the piece
+        # Makes original spot empty since we're moving the piece
+        self._remove_piece(start)
+        if flag & PROMOTION:
+            promoted_cls = PIECE_CLASSES[KNIGHT + flag - PROMOTION]
+            self._put_piece(promoted_cls(color=piece.color.value, row=dest >> 3, col=dest & 7), dest)
+        else:
+            self._put_piece(piece, dest)  # Move the piece
 
-        piece.pos = Square(row=move.dest_row, col=move.dest_col)
+        piece.square = dest
         piece.moves_made += 1
 
+        if flag == CASTLE:
+            rook_start, rook_dest = CASTLING_ROOK_MOVES[dest]
+            self._move_piece(rook_start, rook_dest)
+
+        # Pieces were hashed in/out by _put_piece/_remove_piece, update the rest of the key
+        key = self.key ^ BLACK_TO_MOVE_KEY ^ CASTLING_KEYS[self.castling_rights]
+        if self.en_passant is not None:
+            key ^= EN_PASSANT_KEYS[self.en_passant % 8]
+
+        # A double pawn push lets the opponent capture en passant on the skipped square
+        self.en_passant = (start + dest) // 2 if piece.kind == PAWN and abs(dest - start) == 16 else None
+        self.castling_rights &= CASTLING_RIGHTS_MASK[start] & CASTLING_RIGHTS_MASK[dest]
+
+        key ^= CASTLING_KEYS[self.castling_rights]
+        if self.en_passant is not None:
+            key ^= EN_PASSANT_KEYS[self.en_passant % 8]
+        self.key = key
+
+        self.halfmove_clock = 0 if piece.kind == PAWN or captured != EMPTY_SQUARE else self.halfmove_clock + 1
+        if not self.white_turn:
+            self.fullmove_number += 1
+
         self.move_log.append(move)
         self.white_turn = not self.white_turn
 
-    # TODO: Refactor
     def undo_move(self) -> None:
         """ Undo the previous move """
         if not self.move_log:
             return
-        previous_move = self.move_log.pop()
-        previous_move.piece_to_move.pos = Square(previous_move.start_row, previous_move.start_col)  # reset the square
-        self.board[previous_move.start_row][previous_move.start_col] = previous_move.piece_to_move
-        self.board[previous_move.dest_row][previous_move.dest_col] = previous_move.piece_to_capture
-        previous_move.piece_to_move.moves_made -= 1  # decrement moves made
+        code = self.move_log.pop().code
+        self.castling_rights, self.en_passant, self.halfmove_clock, key, piece, captured = self._state_log.pop()
+        start, dest = code & 63, code >> 6 & 63
+
+        if code >> 12 == CASTLE:
+            rook_start, rook_dest = CASTLING_ROOK_MOVES[dest]
+            self._move_piece(rook_dest, rook_start)
+
+        self._remove_piece(dest)  # The moved piece, or the piece it was promoted to
+        self._put_piece(piece, start)
+        piece.square = start  # reset the square
+        piece.moves_made -= 1  # decrement moves made
+
+        if captured != EMPTY_SQUARE:
+            # En passant captures the pawn beside the starting square, not on the destination
+            square = (start & 56) | (dest & 7) if code >> 12 == EN_PASSANT else dest
+            self._put_piece(captured, square)
+            captured.square = square
+
+        self.key = key
         self.white_turn = not self.white_turn  # Switch the turn back since we undid a move
+        if not self.white_turn:
+            self.fullmove_number -= 1
         self.checkmate, self.stalemate = False, False
 
-    def redo_move(self) -> None:
-        pass
-
     def reset_game(self) -> None:
         logger.debug("Reset Game")
-        self.board = self.initial_board_state()
+        self._load_board(self.initial_board_state())
+        self.castling_rights = ALL_CASTLING_RIGHTS
+        self.en_passant = None
+        self.halfmove_clock, self.fullmove_number = 0, 1
         self.move_log.clear()
+        self._state_log.clear()
         self.white_turn = True
+        self.start_time = time.monotonic()
+        self.key = position_key(self)
+        self.checkmate, self.stalemate = False, False
 
     def in_check(self) -> bool:
         """ Is the current player in check? """
-        # generate opponent moves
-        color = Color.WHITE if self.white_turn else Color.BLACK
-        opponent_moves = self._get_all_possible_moves_for_color(color)  # valid moves?
-        for move in opponent_moves:
-            if move.is_check():
-                return True
-        return False
-
-    # TODO: Improve algorithm. Naive approach generating all moves / future opponent moves
-    #  probably a more efficient way to do this
+        us = WHITE if self.white_turn else BLACK
+        return self._is_attacked(self.king_squares[us], 1 - us)
+
+    def is_square_attacked(self, square: int, by_color: Color) -> bool:
+        """
+        Is the square (bitboard index, row * 8 + col) attacked by any piece of the given color?
+        Rather than generating the opponents moves, look outward from the square: a knight/king/pawn of the color
+        on one of the squares a knight/king/pawn on the square would attack, or a slider at the end of one of its rays.
+        """
+        return self._is_attacked(square, WHITE if by_color == Color.WHITE else BLACK)
+
     def get_valid_moves(self) -> List[Move]:
         """
         Gets all valid moves for current player.
-        To validate a move, we need to do the following:
-        1. Generate every possible move for the current player
-        2. Make each move
-        3. After each move is made, generate all opponents moves and see if our king is under attack
-        4. Evaluate all opponent moves, if ANY of there moves attack your king, your original move isn't valid.
-        5. Undo each move
-
-        This algorithm is very expensive... Gotta work on it...
+        Positions seen recently (the same position again after an undo/reset, or reached by a different move order)
+        are answered from the move cache. It stores the packed move ints rather than Move objects, the moves are
+        wrapped against the current pieces since cached ones could reference pieces from another game.
         """
-        valid_moves = []
-
-        # Generate all moves for the current player
-        possible_moves = self._get_all_possible_moves_for_color(self.current_color)
-
-        for move in possible_moves:
-            is_valid_move = True
-            self._make_move(move)
-
-            # Generate opponent moves (color will switch since a move was made)
-            opponent_possible_moves = self._get_all_possible_moves_for_color(self.current_color)
-
-            for o_move in opponent_possible_moves:
-                if o_move.is_check():
-                    is_valid_move = False
-                    break
-
-            self.undo_move()
-            if is_valid_move:
-                valid_moves.append(move)
+        mailbox = self.mailbox
+        return [Move.from_code(code, mailbox) for code in self.get_valid_move_codes()]
+
+    def get_valid_move_codes(self) -> array:
+        """ Valid moves for the current player packed into ints (see move.py) """
+        cached = self.move_cache.get(self.key)
+        if cached is None:
+            codes, in_check = self._generate_valid_moves()
+            self.move_cache.put(self.key, (codes, in_check))
+        else:
+            codes, in_check = cached
 
-        # No possible moves :( Either checkmate or stalemate
-        if len(possible_moves) == 0:
-            if self.in_check():
+        # No valid moves :( Either checkmate or stalemate
+        if len(codes) == 0:
+            if in_check:
                 self.checkmate = True
             else:
                 self.stalemate = True
 
-        return valid_moves
+        return codes
+
+    def _generate_valid_moves(self) -> Tuple[array, bool]:
+        """
+        Generate the valid moves for the current player, and whether they're in check.
+        Instead of making every move and generating the opponents replies, the position is analysed once:
+        1. Checkers: enemy pieces attacking our king. In double check only the king can move, in single check
+           every other piece has to capture the checker or block the checking ray.
+        2. Pins: our pieces shielding the king from an enemy slider can only move along the pin ray.
+        3. King moves: each square the king can step to is probed with _is_attacked (seeing through our king).
+        Each possible move is then accepted/rejected with a couple of bitboard lookups.
+        """
+        valid_moves = array("H")
+        us = WHITE if self.white_turn else BLACK
+        them = 1 - us
+        king_square = self.king_squares[us]
+
+        checkers, check_mask, pins = self._checks_and_pins(king_square, us)
+        double_check = checkers & (checkers - 1)
+
+        # Pawns capturing en passant are handled separately below, the capture can resolve a check or expose the
+        # king in ways the check/pin masks don't describe
+        en_passant = self.en_passant
+        not_en_passant = FULL if en_passant is None else FULL ^ (1 << en_passant)
+
+        mailbox = self.mailbox
+        for square in iter_bits(self.occupancy[us]):
+            piece = mailbox[square]
+            if piece.kind == KING:
+                # Look from each square the king could step to with the king itself off the board,
+                # so it can't step back along the ray of a slider checking it. Castling checks its own squares.
+                occupied = self.occupied ^ (1 << king_square)
+                targets = FULL ^ KING_ATTACKS[king_square]
+                steps = KING_ATTACKS[king_square] & ~self.occupancy[us]
+                while steps:
+                    dest = steps & -steps
+                    if not self._is_attacked(dest.bit_length() - 1, them, occupied):
+                        targets |= dest
+                    steps ^= dest
+                piece.add_move_codes(state=self, targets=targets, moves=valid_moves)
+            elif not double_check:
+                allowed = check_mask & pins.get(piece.square, FULL)
+                if piece.kind == PAWN:
+                    allowed &= not_en_passant
+                piece.add_move_codes(state=self, targets=allowed, moves=valid_moves)
+
+        if en_passant is not None and not double_check:
+            for square in iter_bits(PAWN_ATTACKS[them][en_passant] & self.bitboards[us * 6 + PAWN]):
+                code = square | en_passant << 6 | EN_PASSANT << 12
+                if self._is_legal_en_passant(code, king_square, checkers):
+                    valid_moves.append(code)
+
+        return valid_moves, bool(checkers)
 
     def print_valid_moves(self) -> None:
         """ Print all valid moves for the current player """
@@ -227,22 +457,345 @@ class GameState:
     def _get_all_possible_moves(self) -> List[Move]:
         """
         Generate all possible moves for each piece
-        Iterate over the entire board evaluating every pieces potential moves (zero validation done)
+        Iterate over the pieces of both sides evaluating every pieces potential moves (zero validation done)
         """
         moves = []
-        n = len(self.board)
-        for row in range(n):
-            for col in range(n):
-                piece = self.board[row][col]
-                if piece != EMPTY_SQUARE:
-                    moves.extend(piece.possible_moves(board=self.board))
+        for piece in self.all_pieces:
+            moves.extend(piece.possible_moves(state=self))
 
         return moves
 
     def _get_all_possible_moves_for_color(self, color: Color) -> List[Move]:
         """ Get all possible moves for the given color (white or black) """
-        return list(filter(lambda m: m.maker == color, self._get_all_possible_moves()))
+        moves = []
+        for piece in self.pieces[WHITE if color == Color.WHITE else BLACK]:
+            moves.extend(piece.possible_moves(state=self))
+        return moves
 
-    def _make_square_empty(self, row: int, col: int) -> None:
-        """ Render the square empty on the given row/col"""
-        self.board[row][col] = EMPTY_SQUARE
+    def _is_attacked(self, square: int, by_side: int, occupied: Optional[int] = None) -> bool:
+        """ is_square_attacked for a side index, sliders are blocked by the given occupancy (the board's by default) """
+        bitboards, base = self.bitboards, by_side * 6
+        if occupied is None:
+            occupied = self.occupied
+        if KNIGHT_ATTACKS[square] & bitboards[base + KNIGHT] or KING_ATTACKS[square] & bitboards[base + KING]:
+            return True
+        # A pawn attacks the square if a pawn of the other side on the square would attack it
+        if PAWN_ATTACKS[1 - by_side][square] & bitboards[base + PAWN]:
+            return True
+        # Only walk the rays when a slider lines up with the square on an empty board
+        diagonal_sliders = (bitboards[base + BISHOP] | bitboards[base + QUEEN]) & BISHOP_RAYS[square]
+        if diagonal_sliders and sliding_attacks(square, occupied, BISHOP_DIRECTIONS) & diagonal_sliders:
+            return True
+        straight_sliders = (bitboards[base + ROOK] | bitboards[base + QUEEN]) & ROOK_RAYS[square]
+        return bool(straight_sliders and sliding_attacks(square, occupied, ROOK_DIRECTIONS) & straight_sliders)
+
+    def _checks_and_pins(self, king_square: int, us: int) -> Tuple[int, int, Dict[int, int]]:
+        """
+        Look outward from our king once and return:
+        checkers: bitboard of the enemy pieces giving check
+        check_mask: squares a non-king move has to land on to resolve the check (every square when not in check)
+        pins: square of each pinned piece -> the ray (up to and including the pinner) it's allowed to move along
+        """
+        bitboards, base = self.bitboards, (1 - us) * 6
+        occupied = self.occupied
+        checkers = KNIGHT_ATTACKS[king_square] & bitboards[base + KNIGHT]
+        checkers |= PAWN_ATTACKS[us][king_square] & bitboards[base + PAWN]
+        check_mask = checkers
+        pins = {}
+
+        for directions, sliders in (
+            (ROOK_DIRECTIONS, bitboards[base + ROOK] | bitboards[base + QUEEN]),
+            (BISHOP_DIRECTIONS, bitboards[base + BISHOP] | bitboards[base + QUEEN]),
+        ):
+            if not sliders:
+                continue
+            for direction in directions:
+                ray = sliding_attacks(king_square, occupied, (direction,))
+                blocker = ray & occupied
+                if blocker & sliders:
+                    checkers |= blocker
+                    check_mask |= ray
+                elif blocker & self.occupancy[us]:
+                    # Look through our piece, if an enemy slider is behind it the piece is pinned
+                    pin_ray = sliding_attacks(king_square, occupied ^ blocker, (direction,))
+                    if pin_ray & occupied & sliders:
+                        pins[blocker.bit_length() - 1] = pin_ray
+
+        return checkers, check_mask if checkers else FULL, pins
+
+    def _is_legal_en_passant(self, code: int, king_square: int, checkers: int) -> bool:
+        """
+        En passant removes two pawns from the same rank, which can expose the king in ways the pin rays don't cover.
+        Look from the king through the position after the capture instead.
+        """
+        start, dest = code & 63, code >> 6 & 63
+        captured_square = (start & 56) | (dest & 7)
+        us = self.mailbox[start].side
+        bitboards, base = self.bitboards, (1 - us) * 6
+
+        # A knight or pawn giving check has to be the captured pawn
+        if checkers & (bitboards[base + KNIGHT] | bitboards[base + PAWN]) & ~(1 << captured_square):
+            return False
+
+        occupied = self.occupied ^ (1 << start) ^ (1 << captured_square) | (1 << dest)
+        straight_sliders = bitboards[base + ROOK] | bitboards[base + QUEEN]
+        diagonal_sliders = bitboards[base + BISHOP] | bitboards[base + QUEEN]
+        return not (
+            sliding_attacks(king_square, occupied, ROOK_DIRECTIONS) & straight_sliders
+            or sliding_attacks(king_square, occupied, BISHOP_DIRECTIONS) & diagonal_sliders
+        )
+
+    def _clear_board(self) -> None:
+        """ Take every piece off the board """
+        self.bitboards = [0] * 12
+        self.occupancy = [0, 0]
+        self.mailbox = [EMPTY_SQUARE] * 64
+        self.pieces = ([], [])
+        self.king_squares = [None, None]
+        self.material = [0, 0]
+        self.key = 0
+
+    def _load_board(self, board: Board) -> None:
+        """ Fill the bitboards/mailbox from an 8x8 matrix of pieces """
+        self._clear_board()
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece != EMPTY_SQUARE:
+                    self._put_piece(piece, row * 8 + col)
+
+    def _load_fen(self, fen: str) -> None:
+        """
+        Set up the position from a FEN string. The placement is read a character at a time, each piece goes straight
+        onto its square (hashing itself into the key), there's no 8x8 board in between.
+        """
+        fields = fen.split()
+        if not 2 <= len(fields) <= 6 or fields[1] not in ("w", "b"):
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        # Castling, en passant and the move clocks take their defaults when left out
+        fields += DEFAULT_FEN_FIELDS[len(fields) :]
+        placement, side, castling, en_passant, halfmove_clock, fullmove_number = fields
+
+        self._clear_board()
+        ranks = placement.split("/")
+        if len(ranks) != 8:
+            raise ValueError(f"Invalid FEN, expected 8 ranks: {fen!r}")
+        for row, rank in enumerate(ranks):
+            col = 0
+            for char in rank:
+                if char in _FEN_EMPTY_SQUARES:
+                    col += _FEN_EMPTY_SQUARES[char]
+                elif char in _FEN_PIECES and col < 8:
+                    piece_cls, color = _FEN_PIECES[char]
+                    self._put_piece(piece_cls(color=color, row=row, col=col), row * 8 + col)
+                    col += 1
+                else:
+                    raise ValueError(f"Invalid FEN placement: {fen!r}")
+            if col != 8:
+                raise ValueError(f"Invalid FEN, rank {8 - row} doesn't have 8 squares: {fen!r}")
+        bitboards = self.bitboards
+        if bin(bitboards[KING]).count("1") != 1 or bin(bitboards[6 + KING]).count("1") != 1:
+            raise ValueError(f"Invalid FEN, expected one king for both sides: {fen!r}")
+        if (bitboards[PAWN] | bitboards[6 + PAWN]) & _BACK_RANKS:
+            raise ValueError(f"Invalid FEN, pawn on the first or last rank: {fen!r}")
+
+        self.white_turn = side == "w"
+        us = WHITE if self.white_turn else BLACK
+        if self._is_attacked(self.king_squares[1 - us], us):
+            raise ValueError(f"Invalid FEN, the side that just moved is in check: {fen!r}")
+        if castling != "-" and not set(castling) <= _FEN_CASTLING.keys():
+            raise ValueError(f"Invalid FEN castling rights: {fen!r}")
+        rights = 0
+        for char in castling.strip("-"):
+            rights |= _FEN_CASTLING[char]
+        self.castling_rights = self._castling_rights_on_board(rights)
+        self.en_passant = None
+        if en_passant != "-":
+            # The square the pawn skipped: on the 6th rank when white is to move, on the 3rd when black is
+            if en_passant not in _FEN_SQUARES or _FEN_SQUARES[en_passant] >> 3 != (2 if self.white_turn else 5):
+                raise ValueError(f"Invalid FEN en passant square: {fen!r}")
+            self.en_passant = _FEN_SQUARES[en_passant]
+        if not (halfmove_clock.isdecimal() and fullmove_number.isdecimal()) or max(
+            int(halfmove_clock), int(fullmove_number)
+        ) > _MAX_CLOCK:
+            raise ValueError(f"Invalid FEN move clocks: {fen!r}")
+        self.halfmove_clock, self.fullmove_number = int(halfmove_clock), int(fullmove_number)
+
+        # Pieces are already hashed in, add the rest of the key
+        self.key ^= CASTLING_KEYS[self.castling_rights]
+        if not self.white_turn:
+            self.key ^= BLACK_TO_MOVE_KEY
+        if self.en_passant is not None:
+            self.key ^= EN_PASSANT_KEYS[self.en_passant & 7]
+
+    def _castling_rights_on_board(self, rights: int) -> int:
+        """ The castling rights whose king and rook are still on their starting squares """
+        bitboards = self.bitboards
+        for side, castling_moves in CASTLING_MOVES.items():
+            for right, king_start, king_dest, _, _ in castling_moves:
+                rook_start = CASTLING_ROOK_MOVES[king_dest][0]
+                if not bitboards[side * 6 + KING] >> king_start & bitboards[side * 6 + ROOK] >> rook_start & 1:
+                    rights &= ~right
+        return rights
+
+    def _load_snapshot(self, data: bytes) -> None:
+        """
+        Unpack a to_bytes snapshot. Nothing is replayed, the only checks are the cheap ones: every field in range and
+        the stored key matching the position.
+        """
+        if len(data) < _SNAPSHOT_HEADER.size or data[0] != SNAPSHOT_VERSION:
+            raise ValueError("Not a GameState snapshot")
+        _, packed, flags, en_passant, halfmove_clock, fullmove_number, key, plies = _SNAPSHOT_HEADER.unpack_from(data)
+        if len(data) != _SNAPSHOT_HEADER.size + 8 * plies or en_passant > _NO_EN_PASSANT:
+            raise ValueError("Corrupt GameState snapshot")
+        placement = bytes(packed[square >> 1] >> (square & 1) * 4 & 15 for square in range(64))
+        if max(placement) > 12:
+            raise ValueError("Corrupt GameState snapshot")
+
+        moves = array("Q")
+        moves.frombytes(data[_SNAPSHOT_HEADER.size :])
+        if sys.byteorder == "big":
+            moves.byteswap()
+        codes, records = array("H", [move & 0xFFFF for move in moves]), array("Q", [move >> 16 for move in moves])
+        castling_rights = flags >> 1 & ALL_CASTLING_RIGHTS
+        en_passant = None if en_passant == _NO_EN_PASSANT else en_passant
+        keys = _keys_before_moves(key, castling_rights, en_passant, codes, records)
+
+        checkpoint = (placement, bool(flags & 1), castling_rights, en_passant, halfmove_clock, fullmove_number, key)
+        self._restore_checkpoint(checkpoint, codes, records, keys)
+        if None in self.king_squares or position_key(self) != key:
+            raise ValueError("Corrupt GameState snapshot, the position doesn't match its key")
+        self.checkmate, self.stalemate = bool(flags & 32), bool(flags & 64)
+
+    def _save_checkpoint(self) -> tuple:
+        """ The position without its logs, to come back to with _restore_checkpoint (see history.py) """
+        return (
+            bytes(0 if piece == EMPTY_SQUARE else piece.code + 1 for piece in self.mailbox),
+            self.white_turn,
+            self.castling_rights,
+            self.en_passant,
+            self.halfmove_clock,
+            self.fullmove_number,
+            self.key,
+        )
+
+    def _undo_record(self, ply: int) -> Tuple[int, int]:
+        """
+        The undo log entry of the move on the ply as a packed int and the key before the move, enough for
+        _restore_checkpoint to rebuild it. Packed: castling rights, en passant square (64: none), moved piece code,
+        captured piece code + 1 (0: none) and the halfmove clock, from the low bits up.
+        """
+        castling_rights, en_passant, halfmove_clock, key, piece, captured = self._state_log[ply]
+        captured_code = 0 if captured == EMPTY_SQUARE else captured.code + 1
+        en_passant = _NO_EN_PASSANT if en_passant is None else en_passant
+        return castling_rights | en_passant << 4 | piece.code << 11 | captured_code << 15 | halfmove_clock << 19, key
+
+    def _restore_checkpoint(self, checkpoint: tuple, codes: array, records: array, keys: array) -> None:
+        """
+        Go back to a position saved by _save_checkpoint, the codes, _undo_record records and keys of the moves that
+        led to it rebuild the move and undo logs. The pieces are new objects: undo_move works from the move codes and
+        puts whichever piece object it's given back.
+        """
+        placement, self.white_turn, self.castling_rights, self.en_passant = checkpoint[:4]
+        self.halfmove_clock, self.fullmove_number, key = checkpoint[4:]
+        self._clear_board()
+        for square, code in enumerate(placement):
+            if code:
+                self._put_piece(_new_piece(code - 1, square), square)
+        self.key = key
+
+        move_log, state_log = [], []
+        for code, record, key in zip(codes, records, keys):
+            start, dest = code & 63, code >> 6 & 63
+            piece, captured = _new_piece(record >> 11 & 15, start), EMPTY_SQUARE
+            if record >> 15 & 15:
+                square = (start & 56) | (dest & 7) if code >> 12 == EN_PASSANT else dest
+                captured = _new_piece((record >> 15 & 15) - 1, square)
+            en_passant = record >> 4 & 127
+            state_log.append(
+                (record & 15, None if en_passant == _NO_EN_PASSANT else en_passant, record >> 19, key, piece, captured)
+            )
+            move = Move.from_code(code, self.mailbox)
+            move.piece_to_move, move.piece_to_capture = piece, captured
+            move_log.append(move)
+        self.move_log[:] = move_log
+        self._state_log[:] = state_log
+        self.checkmate, self.stalemate = False, False
+
+    def _put_piece(self, piece: Piece, square: int) -> None:
+        """ Place the piece on the (empty) square """
+        self.mailbox[square] = piece
+        self.bitboards[piece.code] |= 1 << square
+        self.occupancy[piece.side] |= 1 << square
+        self.key ^= PIECE_KEYS[piece.code][square]
+        self.pieces[piece.side].append(piece)
+        self.material[piece.side] += piece.value
+        if piece.kind == KING:
+            self.king_squares[piece.side] = square
+
+    def _remove_piece(self, square: int) -> Piece:
+        """ Render the square empty, returning the piece that was on it """
+        piece = self.mailbox[square]
+        self.mailbox[square] = EMPTY_SQUARE
+        self.bitboards[piece.code] ^= 1 << square
+        self.occupancy[piece.side] ^= 1 << square
+        self.key ^= PIECE_KEYS[piece.code][square]
+        self.pieces[piece.side].remove(piece)
+        self.material[piece.side] -= piece.value
+        return piece
+
+    def _move_piece(self, start: int, dest: int) -> None:
+        """ Move the piece between two squares (used for the rook when castling) """
+        piece = self._remove_piece(start)
+        self._put_piece(piece, dest)
+        piece.square = dest
+
+
+def _keys_before_moves(
+    key: int, castling_rights: int, en_passant: Optional[int], codes: array, records: array
+) -> array:
+    """
+    The key before each move, worked out backwards from the key after the last one: every move only XORs in the
+    numbers of what it changed, which the move code and its _undo_record tell. Raises ValueError on a record out of
+    range.
+    """
+    keys = array("Q", bytes(8 * len(codes)))
+    for ply in range(len(codes) - 1, -1, -1):
+        code, record = codes[ply], records[ply]
+        start, dest, flag = code & 63, code >> 6 & 63, code >> 12
+        piece_code, captured_code, en_passant_before = record >> 11 & 15, record >> 15 & 15, record >> 4 & 127
+        if (
+            piece_code > 11
+            or captured_code > 12
+            or en_passant_before > _NO_EN_PASSANT
+            or flag == 3
+            or flag > PROMOTION + QUEEN - KNIGHT
+            or flag == CASTLE
+            and (piece_code % 6 != KING or dest not in CASTLING_ROOK_MOVES)
+        ):
+            raise ValueError(f"Corrupt GameState snapshot, bad undo record on ply {ply + 1}")
+
+        key ^= BLACK_TO_MOVE_KEY ^ CASTLING_KEYS[castling_rights] ^ CASTLING_KEYS[record & 15]
+        if en_passant is not None:
+            key ^= EN_PASSANT_KEYS[en_passant % 8]
+        if en_passant_before != _NO_EN_PASSANT:
+            key ^= EN_PASSANT_KEYS[en_passant_before % 8]
+        castling_rights, en_passant = record & 15, None if en_passant_before == _NO_EN_PASSANT else en_passant_before
+
+        # The piece on dest is the moved one, or the piece a pawn was promoted to
+        moved_code = piece_code - PAWN + KNIGHT + flag - PROMOTION if flag & PROMOTION else piece_code
+        key ^= PIECE_KEYS[piece_code][start] ^ PIECE_KEYS[moved_code][dest]
+        if captured_code:
+            square = (start & 56) | (dest & 7) if flag == EN_PASSANT else dest
+            key ^= PIECE_KEYS[captured_code - 1][square]
+        if flag == CASTLE:
+            rook_start, rook_dest = CASTLING_ROOK_MOVES[dest]
+            key ^= PIECE_KEYS[piece_code - KING + ROOK][rook_start] ^ PIECE_KEYS[piece_code - KING + ROOK][rook_dest]
+        keys[ply] = key
+    return keys
+
+
+def _new_piece(code: int, square: int) -> Piece:
+    """ New piece object for a Piece.code on the square """
+    side, kind = divmod(code, 6)
+    return PIECE_CLASSES[kind](color="wb"[side], row=square >> 3, col=square & 7)
@@ -0,0 +1,379 @@
+"""
+Endgame tablebases: the exact result and distance to mate of every position of a few small endings, made by
+retrograde analysis and probed through memory mapped files.
+
+The generator starts from the mates and works backwards. A position where the strong side (the side with more
+than a king) is to move is won when one of its moves leads to a won position. A position where the lone king is to
+move is lost when all its moves do. Positions are taken in increasing distance to mate, so each one gets the
+shortest mate the first time it's reached. Moves are generated from the attack tables GameState's move generator uses
+(bitboard.py). Building a GameState per position would make the 5M positions of KBNK take hours.
+
+A table file is the magic TABLEBASE_MAGIC followed by one byte per position index (see _Table):
+    0: draw, 1-254: won by the strong side in value - 1 plies, 255: not a legal or canonical position
+Pawnless tables only store one position per 8 board symmetries, KPK one per 2 (mirrored files).
+
+Usage:
+    python -m chess.tablebase KQK KRK KBNK KPK --directory tablebases
+"""
+import argparse
+import mmap
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .bitboard import (
+    BISHOP,
+    BISHOP_DIRECTIONS,
+    BLACK,
+    KING,
+    KING_ATTACKS,
+    KNIGHT,
+    KNIGHT_ATTACKS,
+    PAWN,
+    PAWN_ATTACKS,
+    QUEEN,
+    QUEEN_DIRECTIONS,
+    ROOK,
+    ROOK_DIRECTIONS,
+    WHITE,
+    sliding_attacks,
+)
+from .state import GameState
+
+TABLEBASE_MAGIC = b"CHSTB001"
+MATERIALS = {"KQK": (QUEEN,), "KRK": (ROOK,), "KBNK": (BISHOP, KNIGHT), "KPK": (PAWN,)}  # Strong side's pieces
+PROMOTION_TABLES = {QUEEN: "KQK", ROOK: "KRK"}  # Tables KPK promotes into, the other promotions are draws
+DRAW, INVALID = 0, 255
+
+_SLIDER_DIRECTIONS = {BISHOP: BISHOP_DIRECTIONS, ROOK: ROOK_DIRECTIONS, QUEEN: QUEEN_DIRECTIONS}
+_PIECE_LETTERS = "PNBRQK"  # Indexed by Piece.kind
+
+
+def _transform(square: int, transpose: bool, flip_rows: bool, flip_cols: bool) -> int:
+    row, col = square >> 3, square & 7
+    if transpose:
+        row, col = col, row
+    if flip_rows:
+        row = 7 - row
+    if flip_cols:
+        col = 7 - col
+    return row * 8 + col
+
+
+# The 8 symmetries of the board as square maps, the first two (identity, mirrored files) keep pawns moving up
+TRANSFORMS = [
+    tuple(_transform(square, transpose, flip_rows, flip_cols) for square in range(64))
+    for transpose, flip_rows, flip_cols in (
+        (False, False, False),
+        (False, False, True),
+        (False, True, False),
+        (False, True, True),
+        (True, False, False),
+        (True, False, True),
+        (True, True, False),
+        (True, True, True),
+    )
+]
+_TRIANGLE = (56, 57, 58, 59, 49, 50, 51, 42, 43, 35)  # a1-d1-d4, where pawnless tables keep the strong king
+_QUEENSIDE = tuple(square for square in range(64) if square & 7 < 4)  # Files a-d, where KPK keeps it
+
+
+class TablebaseResult(NamedTuple):
+    wdl: int  # 1: the side to move wins, 0: draw, -1: the side to move loses
+    plies: int  # Plies to mate with best play (0 for a draw, or when the side to move is mated)
+
+
+class _Table:
+    """
+    Positions of one material set, with the strong side playing white. A position is indexed by
+    (side to move, strong king slot, lone king square, piece squares...), each a digit in its own base, after the
+    board is turned so the strong king is on one of the king slots. When more than one turn does that, the index
+    is the smallest one.
+    """
+
+    def __init__(self, material: str, values):
+        self.material = material
+        self.kinds = MATERIALS[material]
+        if PAWN in self.kinds:
+            self.king_squares, transforms = _QUEENSIDE, TRANSFORMS[:2]
+        else:
+            self.king_squares, transforms = _TRIANGLE, TRANSFORMS
+        self.king_slots = {square: slot for slot, square in enumerate(self.king_squares)}
+        # Transforms that put the strong king on a slot, per square
+        self.king_transforms = [[t for t in transforms if t[square] in self.king_slots] for square in range(64)]
+        self.size = 2 * len(self.king_squares) * 64 ** (1 + len(self.kinds))
+        self.values = values
+
+    def index(self, side: int, king: int, lone_king: int, pieces: Tuple[int, ...]) -> int:
+        best = None
+        for transform in self.king_transforms[king]:
+            index = (side * len(self.king_squares) + self.king_slots[transform[king]]) * 64 + transform[lone_king]
+            for square in pieces:
+                index = index * 64 + transform[square]
+            if best is None or index < best:
+                best = index
+        return best
+
+    def decode(self, index: int) -> Tuple[int, int, int, Tuple[int, ...]]:
+        pieces = []
+        for _ in self.kinds:
+            index, square = divmod(index, 64)
+            pieces.append(square)
+        index, lone_king = divmod(index, 64)
+        side, slot = divmod(index, len(self.king_squares))
+        return side, self.king_squares[slot], lone_king, tuple(reversed(pieces))
+
+    def attacks(self, king: int, pieces: Tuple[int, ...], occupied: int) -> int:
+        """ Squares the strong side attacks """
+        attacks = KING_ATTACKS[king]
+        for kind, square in zip(self.kinds, pieces):
+            if kind == PAWN:
+                attacks |= PAWN_ATTACKS[WHITE][square]
+            elif kind == KNIGHT:
+                attacks |= KNIGHT_ATTACKS[square]
+            else:
+                attacks |= sliding_attacks(square, occupied, _SLIDER_DIRECTIONS[kind])
+        return attacks
+
+    def is_valid(self, index: int) -> bool:
+        """ Is the index a legal position, and the canonical index of it? """
+        side, king, lone_king, pieces = self.decode(index)
+        squares = {king, lone_king, *pieces}
+        if len(squares) != 2 + len(pieces) or KING_ATTACKS[king] >> lone_king & 1:
+            return False
+        if any(kind == PAWN and not 8 <= square < 56 for kind, square in zip(self.kinds, pieces)):
+            return False
+        occupied = sum(1 << square for square in squares)
+        if side == WHITE and self.attacks(king, pieces, occupied) >> lone_king & 1:
+            return False  # The lone king is in check with the strong side to move
+        return self.index(side, king, lone_king, pieces) == index
+
+    def lone_king_moves(self, king: int, lone_king: int, pieces: Tuple[int, ...]) -> Tuple[int, bool]:
+        """ Squares the lone king can move to, and whether it's in check """
+        occupied = 1 << king | 1 << lone_king
+        for square in pieces:
+            occupied |= 1 << square
+        attacks = self.attacks(king, pieces, occupied ^ 1 << lone_king)  # Sliders see through the king
+        return KING_ATTACKS[lone_king] & ~attacks, bool(attacks >> lone_king & 1)
+
+    def strong_unmoves(self, king: int, lone_king: int, pieces: Tuple[int, ...]) -> List[int]:
+        """ Indexes of the positions the strong side could have moved from to get here (lone king to move) """
+        occupied = 1 << king | 1 << lone_king
+        for square in pieces:
+            occupied |= 1 << square
+        empty = ~occupied
+
+        previous = []
+        for start in _bits(KING_ATTACKS[king] & empty & ~KING_ATTACKS[lone_king]):
+            previous.append(self.index(WHITE, start, lone_king, pieces))
+        for i, (kind, square) in enumerate(zip(self.kinds, pieces)):
+            if kind == PAWN:
+                starts = []
+                if square < 48 and empty >> square + 8 & 1:
+                    starts.append(square + 8)
+                    if 32 <= square < 40 and empty >> square + 16 & 1:
+                        starts.append(square + 16)  # Double push from the second rank
+            elif kind == KNIGHT:
+                starts = _bits(KNIGHT_ATTACKS[square] & empty)
+            else:
+                starts = _bits(sliding_attacks(square, occupied, _SLIDER_DIRECTIONS[kind]) & empty)
+            for start in starts:
+                previous.append(self.index(WHITE, king, lone_king, pieces[:i] + (start,) + pieces[i + 1 :]))
+        return previous
+
+    def lone_king_unmoves(self, king: int, lone_king: int, pieces: Tuple[int, ...]) -> List[int]:
+        """ Indexes of the positions the lone king could have moved from to get here (strong side to move) """
+        occupied = 1 << king | 1 << lone_king
+        for square in pieces:
+            occupied |= 1 << square
+        starts = KING_ATTACKS[lone_king] & ~occupied & ~KING_ATTACKS[king]
+        return [self.index(BLACK, king, start, pieces) for start in _bits(starts)]
+
+
+def _bits(bb: int) -> List[int]:
+    squares = []
+    while bb:
+        low = bb & -bb
+        squares.append(low.bit_length() - 1)
+        bb ^= low
+    return squares
+
+
+def generate(material: str, promotion_tables: Optional[Dict[str, bytes]] = None) -> bytearray:
+    """
+    Values of every position index of the material set (see the module docstring).
+    promotion_tables: Values of KQK and KRK, needed by KPK.
+    """
+    table = _Table(material, bytearray(_table_size(material)))
+    values = table.values
+    buckets: Dict[int, List[int]] = {}  # Value -> indexes it may be the value of
+    promoted_tables = (
+        [_Table(name, promotion_tables[name]) for name in PROMOTION_TABLES.values()] if PAWN in table.kinds else []
+    )
+
+    for index in range(table.size):
+        if not table.is_valid(index):
+            values[index] = INVALID
+            continue
+        side, king, lone_king, pieces = table.decode(index)
+        if side == BLACK:
+            moves, in_check = table.lone_king_moves(king, lone_king, pieces)
+            if not moves and in_check:
+                buckets.setdefault(1, []).append(index)  # Mated
+        elif PAWN in table.kinds and pieces[0] < 16 and not (1 << king | 1 << lone_king) >> pieces[0] - 8 & 1:
+            # Promotions lead into the tables of the promoted piece
+            for promoted in promoted_tables:
+                value = promoted.values[promoted.index(BLACK, king, lone_king, (pieces[0] - 8,))]
+                if value not in (DRAW, INVALID):
+                    buckets.setdefault(value + 1, []).append(index)
+
+    value = 0
+    while buckets:
+        value += 1
+        for index in buckets.pop(value, ()):
+            if values[index] != DRAW:
+                continue  # Already has a shorter mate
+            side, king, lone_king, pieces = table.decode(index)
+            if side == BLACK and value > 1 and not _all_moves_lose(table, king, lone_king, pieces):
+                continue
+            values[index] = value
+            if side == BLACK:
+                previous = table.strong_unmoves(king, lone_king, pieces)
+            else:
+                previous = table.lone_king_unmoves(king, lone_king, pieces)
+            buckets.setdefault(value + 1, []).extend(index for index in previous if values[index] == DRAW)
+    return values
+
+
+def _all_moves_lose(table: _Table, king: int, lone_king: int, pieces: Tuple[int, ...]) -> bool:
+    """ Does every move of the lone king lead to a position already known to be won for the strong side? """
+    moves, _ = table.lone_king_moves(king, lone_king, pieces)
+    values = table.values
+    for dest in _bits(moves):
+        if dest in pieces:
+            return False  # Takes a piece, none of the endings can be won with what's left
+        if values[table.index(WHITE, king, dest, pieces)] == DRAW:
+            return False
+    return True
+
+
+def _table_size(material: str) -> int:
+    king_squares = len(_QUEENSIDE) if PAWN in MATERIALS[material] else len(_TRIANGLE)
+    return 2 * king_squares * 64 ** (1 + len(MATERIALS[material]))
+
+
+def write_table(path: str, values: bytes) -> None:
+    with open(path, "wb") as file:
+        file.write(TABLEBASE_MAGIC)
+        file.write(values)
+
+
+class Tablebase:
+    """
+    The tables found in a directory (files named like KQK.tb), memory mapped: probing reads one byte per position.
+    Use as a context manager, or call close().
+    """
+
+    def __init__(self, directory: str):
+        self._files: Dict[str, mmap.mmap] = {}
+        self._tables: Dict[str, _Table] = {}
+        try:
+            for material in MATERIALS:
+                path = os.path.join(directory, f"{material}.tb")
+                if not os.path.exists(path):
+                    continue
+                with open(path, "rb") as file:
+                    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                size = len(TABLEBASE_MAGIC) + _table_size(material)
+                if data[: len(TABLEBASE_MAGIC)] != TABLEBASE_MAGIC or len(data) != size:
+                    data.close()
+                    raise ValueError(f"{path} isn't a {material} table")
+                self._files[material] = data
+                self._tables[material] = _Table(material, memoryview(data)[len(TABLEBASE_MAGIC) :])
+        except BaseException:
+            self.close()  # Don't leave the tables opened before the bad one mapped
+            raise
+
+    def __enter__(self) -> "Tablebase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __contains__(self, material: str) -> bool:
+        return material in self._tables
+
+    def close(self) -> None:
+        for table in self._tables.values():
+            table.values.release()
+        for data in self._files.values():
+            data.close()
+        self._tables.clear()
+        self._files.clear()
+
+    def probe(self, state: GameState) -> Optional[TablebaseResult]:
+        """ Result of the position from the side to move's point of view, None if no table covers it """
+        if state.castling_rights or len(state.pieces[WHITE]) + len(state.pieces[BLACK]) > 4:
+            return None
+        if len(state.pieces[BLACK]) == 1:
+            strong, flip = WHITE, 0
+        elif len(state.pieces[WHITE]) == 1:
+            strong, flip = BLACK, 56  # Play the tables from black's side by mirroring the rows
+        else:
+            return None
+
+        pieces = sorted((piece for piece in state.pieces[strong] if piece.kind != KING), key=lambda piece: -piece.kind)
+        table = self._tables.get("K" + "".join(_PIECE_LETTERS[piece.kind] for piece in pieces) + "K")
+        if table is None:
+            return None
+
+        side = WHITE if (WHITE if state.white_turn else BLACK) == strong else BLACK
+        index = table.index(
+            side,
+            state.king_squares[strong] ^ flip,
+            state.king_squares[1 - strong] ^ flip,
+            tuple(piece.square ^ flip for piece in pieces),
+        )
+        value = table.values[index]
+        if value == DRAW:
+            return TablebaseResult(wdl=0, plies=0)
+        if value == INVALID:
+            return None
+        return TablebaseResult(wdl=1 if side == WHITE else -1, plies=value - 1)
+
+
+def generate_files(materials: List[str], directory: str) -> None:
+    """ Generate the tables into the directory, along with the tables KPK depends on, skipping existing files """
+    os.makedirs(directory, exist_ok=True)
+    for material in materials:
+        path = os.path.join(directory, f"{material}.tb")
+        if os.path.exists(path):
+            continue
+        promotion_tables = None
+        if PAWN in MATERIALS[material]:
+            generate_files(list(PROMOTION_TABLES.values()), directory)
+            promotion_tables = {}
+            for name in PROMOTION_TABLES.values():
+                with open(os.path.join(directory, f"{name}.tb"), "rb") as file:
+                    promotion_tables[name] = file.read()[len(TABLEBASE_MAGIC) :]
+
+        start = time.perf_counter()
+        values = generate(material, promotion_tables)
+        write_table(path, values)
+        won = [value for value in values if value not in (DRAW, INVALID)]
+        print(
+            f"{material}: {len(values) - values.count(INVALID)} positions, {len(won)} won, "
+            f"longest mate {max(won) - 1} plies, {time.perf_counter() - start:.1f}s"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m chess.tablebase", description="Generate endgame tablebases")
+    parser.add_argument("materials", nargs="*", default=list(MATERIALS), choices=list(MATERIALS), metavar="MATERIAL")
+    parser.add_argument("--directory", default="tablebases", help="where the table files go (default: tablebases)")
+    args = parser.parse_args(argv)
+    generate_files(args.materials, args.directory)
+
+
+if __name__ == "__main__":
+    main()
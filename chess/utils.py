@@ -4,6 +4,7 @@ from typing import List, Union
 
 EMPTY_SQUARE = "**"
 Board = List[List[Union[str, object]]]  # Board is composed of pieces/empty squares (strings)
+Mailbox = List[Union[str, object]]  # Flat 64 square board, indexed by row * 8 + col
 
 
 @dataclass
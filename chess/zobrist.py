@@ -0,0 +1,32 @@
+"""
+Zobrist hashing: a position's key is the XOR of one random 64-bit number per (piece, square), plus numbers for
+the side to move, the castling rights and the en passant file. Making a move only XORs the few numbers that
+changed in or out, so GameState keeps its key up to date in O(1).
+"""
+import random
+from typing import TYPE_CHECKING
+
+from .bitboard import iter_bits
+
+if TYPE_CHECKING:
+    from .state import GameState
+
+_random = random.Random(0x5EED_C4E55)  # Fixed seed, keys have to be the same in every process
+
+PIECE_KEYS = [[_random.getrandbits(64) for _ in range(64)] for _ in range(12)]  # [Piece.code][square]
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+CASTLING_KEYS = [_random.getrandbits(64) for _ in range(16)]  # [castling rights]
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]  # [file of the en passant square]
+
+
+def position_key(state: "GameState") -> int:
+    """ Compute the key of a position from scratch """
+    key = CASTLING_KEYS[state.castling_rights]
+    for code, bitboard in enumerate(state.bitboards):
+        for square in iter_bits(bitboard):
+            key ^= PIECE_KEYS[code][square]
+    if not state.white_turn:
+        key ^= BLACK_TO_MOVE_KEY
+    if state.en_passant is not None:
+        key ^= EN_PASSANT_KEYS[state.en_passant % 8]
+    return key
@@ -0,0 +1,29 @@
+from chess.bitboard import (
+    BISHOP_DIRECTIONS,
+    KING_ATTACKS,
+    KNIGHT_ATTACKS,
+    PAWN_ATTACKS,
+    ROOK_DIRECTIONS,
+    WHITE,
+    iter_bits,
+    sliding_attacks,
+    square_index,
+)
+
+
+def test_leaper_tables() -> None:
+    assert sorted(iter_bits(KNIGHT_ATTACKS[square_index(7, 6)])) == [square_index(5, 5), square_index(5, 7), 52]
+    assert bin(KING_ATTACKS[square_index(0, 0)]).count("1") == 3
+    assert bin(KING_ATTACKS[square_index(4, 4)]).count("1") == 8
+    assert sorted(iter_bits(PAWN_ATTACKS[WHITE][square_index(6, 0)])) == [square_index(5, 1)]
+
+
+def test_sliding_attacks_stop_at_blockers() -> None:
+    rook = square_index(7, 0)  # a1
+    blockers = 1 << square_index(4, 0) | 1 << square_index(7, 3)  # a4, d1
+    attacks = sliding_attacks(rook, blockers, ROOK_DIRECTIONS)
+    expected = {square_index(row, 0) for row in (4, 5, 6)} | {square_index(7, col) for col in (1, 2, 3)}
+    assert set(iter_bits(attacks)) == expected
+
+    bishop = square_index(3, 3)  # d5
+    assert bin(sliding_attacks(bishop, 0, BISHOP_DIRECTIONS)).count("1") == 13
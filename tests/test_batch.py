@@ -0,0 +1,95 @@
+import random
+from array import array
+
+import numpy as np
+import pytest
+
+from chess.batch import (
+    encode_board,
+    encode_planes,
+    encode_squares,
+    evaluate_batch,
+    generate_moves_batch,
+    planes_to_squares,
+)
+from chess.bitboard import FULL
+from chess.evaluation import evaluate
+from chess.move import CASTLE
+from chess.state import GameState
+
+POSITION_4 = "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"
+POSITION_5 = "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8"
+
+
+def _random_positions(count: int) -> list:
+    rng = random.Random(3)
+    states = []
+    for _ in range(count):
+        game_state = GameState(move_cache_size=0)
+        for _ in range(rng.randrange(60)):
+            moves = game_state.get_valid_moves()
+            if not moves:
+                break
+            game_state._make_move(rng.choice(moves))
+        states.append(game_state)
+    return states
+
+
+def test_batch_matches_evaluate() -> None:
+    states = _random_positions(40)
+    white_to_move = np.array([game_state.white_turn for game_state in states])
+    expected = [evaluate(game_state) for game_state in states]
+
+    squares, planes = encode_squares(states), encode_planes(states)
+    assert squares.shape == (40, 64) and planes.shape == (40, 12, 64)
+    assert (planes_to_squares(planes) == squares).all()
+    assert evaluate_batch(squares, white_to_move).tolist() == expected
+    assert evaluate_batch(planes, white_to_move).tolist() == expected
+
+
+def test_encode_board() -> None:
+    game_state = GameState()
+    assert (encode_board(game_state.board) == encode_squares([game_state])[0]).all()
+    assert evaluate_batch(encode_board(game_state.board)[None]).tolist() == [0]
+
+
+def test_rejects_other_shapes() -> None:
+    with pytest.raises(ValueError):
+        evaluate_batch(np.zeros((2, 8, 8), dtype=np.int8))
+
+
+def _pseudo_legal_codes(game_state: GameState) -> list:
+    """ Reference: Piece.add_move_codes over the pieces of the player to move """
+    moves = array("H")
+    for piece in game_state.pieces[0 if game_state.white_turn else 1]:
+        piece.add_move_codes(game_state, targets=FULL, moves=moves)
+    return sorted(moves)
+
+
+def test_batch_moves_match_piece_moves() -> None:
+    states = _random_positions(40) + [GameState.from_fen(POSITION_4), GameState.from_fen(POSITION_5)]
+    result = generate_moves_batch(
+        encode_planes(states),
+        white_to_move=np.array([game_state.white_turn for game_state in states]),
+        castling_rights=np.array([game_state.castling_rights for game_state in states], dtype=np.uint8),
+        en_passant=np.array([-1 if game_state.en_passant is None else game_state.en_passant for game_state in states]),
+    )
+
+    assert result.counts.sum() == len(result.moves)
+    for index, game_state in enumerate(states):
+        moves = result.moves[result.boards == index]
+        assert len(moves) == result.counts[index]
+        # The batch generator doesn't look at attacked squares, castling through check is the only difference
+        assert sorted(code for code in moves.tolist() if code >> 12 != CASTLE) == [
+            code for code in _pseudo_legal_codes(game_state) if code >> 12 != CASTLE
+        ]
+
+
+def test_batch_castling_and_promotions() -> None:
+    game_state = GameState.from_fen("r3k3/1P6/8/8/8/8/8/R3K2R w KQq - 0 1")
+    squares = encode_squares([game_state])
+    codes = generate_moves_batch(squares, np.array([True]), np.array([game_state.castling_rights])).moves.tolist()
+
+    assert sum(code >> 12 == CASTLE for code in codes) == 2
+    assert sorted(code >> 12 for code in codes if code & 63 == 9) == [4, 4, 5, 5, 6, 6, 7, 7]  # b7-b8 and b7xa8
+    assert not any(code >> 12 == CASTLE for code in generate_moves_batch(squares, np.array([True])).moves.tolist())
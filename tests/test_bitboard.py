@@ -0,0 +1,43 @@
+from chess.move import Move
+from chess.state import GameState
+from chess.utils import EMPTY_SQUARE
+
+
+def _snapshot(game_state: GameState) -> tuple:
+    return list(game_state.bitboards), list(game_state.mailbox), game_state.castling_rights, game_state.en_passant
+
+
+def test_bitboards_match_mailbox() -> None:
+    game_state = GameState()
+    for square, piece in enumerate(game_state.mailbox):
+        for code, bb in enumerate(game_state.bitboards):
+            expected = piece != EMPTY_SQUARE and piece.code == code
+            assert bool(bb >> square & 1) == expected
+
+
+def test_undo_restores_position() -> None:
+    game_state = GameState()
+    for notation in ("e2->e4", "d7->d5", "e4->d5", "g8->f6", "g1->f3", "c7->c5"):
+        game_state.make_move(Move.from_chess_notation(notation=notation, board=game_state.board))
+
+    before = _snapshot(game_state)
+    for move in game_state.get_valid_moves():
+        game_state._make_move(move)
+        game_state.undo_move()
+        assert _snapshot(game_state) == before
+
+
+def test_castling_and_en_passant() -> None:
+    game_state = GameState()
+    sequence = ("e2->e4", "a7->a6", "e4->e5", "d7->d5", "e5->d6", "a6->a5", "g1->f3", "a5->a4", "f1->e2", "a4->a3")
+    for notation in sequence:
+        game_state.make_move(Move.from_chess_notation(notation=notation, board=game_state.board))
+
+    assert game_state.board[3][3] == EMPTY_SQUARE  # d5 pawn was captured en passant
+    game_state.make_move(Move.from_chess_notation(notation="e1->g1", board=game_state.board))
+    assert game_state.board[7][6].name == "wKing"
+    assert game_state.board[7][5].name == "wRook"
+
+    game_state.undo_move()
+    assert game_state.board[7][4].name == "wKing"
+    assert game_state.board[7][7].name == "wRook"
@@ -0,0 +1,66 @@
+import io
+import random
+
+import pytest
+
+from chess.book import OpeningBook, build_book
+from chess.engine import search
+from chess.pgn import from_san, read_games, to_san
+from chess.state import GameState
+
+GAMES = """
+1. e4 e5 2. Nf3 Nc6 3. Bb5 *
+1. e4 e5 2. Nf3 Nc6 3. Bc4 *
+1. e4 c5 2. Nf3 d6 *
+1. d4 d5 2. c4 *
+1. Nf3 d5 2. g3 *
+"""
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = str(tmp_path / "book.bin")
+    build_book(read_games(io.StringIO(GAMES)), path, plies=3)
+    with OpeningBook(path) as book:
+        yield book
+
+
+def _book_sans(book: OpeningBook, game_state: GameState):
+    return [(to_san(game_state, move), weight) for move, weight in book.moves(game_state)]
+
+
+def test_lookup(book: OpeningBook) -> None:
+    assert len(book) == 11
+    game_state = GameState()
+    assert _book_sans(book, game_state) == [("e4", 3), ("d4", 1), ("Nf3", 1)]  # Ties by move code
+
+    for san in ("e4", "e5", "Nf3"):
+        game_state._make_move(from_san(game_state, san))
+    assert _book_sans(book, game_state) == []  # Past the plies that went in the book
+
+
+def test_transpositions(book: OpeningBook) -> None:
+    # Positions are found by key, whatever the moves that led to them
+    game_state = GameState.from_fen("rnbqkbnr/ppp1pppp/8/3p4/3P4/8/PPP1PPPP/RNBQKBNR w KQkq d6 0 2")
+    assert _book_sans(book, game_state) == [("c4", 1)]
+
+
+def test_min_games(tmp_path) -> None:
+    path = str(tmp_path / "book.bin")
+    assert build_book(read_games(io.StringIO(GAMES)), path, plies=3, min_games=2) == 3  # e4, e5, Nf3
+    with OpeningBook(path) as book:
+        assert search(GameState(), book=book).best_move == from_san(GameState(), "e4")
+        assert book.choose(GameState.from_fen("8/8/8/4k3/8/8/8/4K3 w - - 0 1"), random.Random(1)) is None
+
+
+def test_bad_fen_header(tmp_path) -> None:
+    path = str(tmp_path / "book.bin")
+    games = '[FEN "8/8/8 w - - 0 1"]\n\n1. e4 *\n\n' + GAMES
+    assert build_book(read_games(io.StringIO(games)), path, plies=3, min_games=2) == 3  # The other games still count
+
+
+def test_not_a_book(tmp_path) -> None:
+    path = tmp_path / "book.bin"
+    path.write_bytes(b"not a book")
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
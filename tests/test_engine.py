@@ -0,0 +1,66 @@
+import time
+
+from chess.engine import INFINITY, MATE_SCORE, MAX_PLY, Searcher, _score_from_table, _score_to_table, search
+from chess.starting_pieces import STARTING_FEN
+from chess.state import GameState
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+def test_finds_mate_in_one() -> None:
+    game_state = GameState.from_fen("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1")
+    result = search(game_state, max_depth=3)
+    assert (result.best_move.dest_row, result.best_move.dest_col) == (0, 3)  # Rd8#
+    assert result.score == MATE_SCORE - 1
+    assert len(result.pv) == 1
+
+
+def test_wins_hanging_queen() -> None:
+    game_state = GameState.from_fen("4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1")
+    result = search(game_state, max_depth=2)
+    assert (result.best_move.dest_row, result.best_move.dest_col) == (3, 3)  # Rxd5
+    assert result.score > 300
+
+
+def test_search_leaves_the_state_untouched() -> None:
+    game_state = GameState.from_fen(KIWIPETE)
+    key, mailbox = game_state.key, list(game_state.mailbox)
+    result = search(game_state, max_depth=2)
+
+    assert (game_state.key, game_state.mailbox, game_state.move_log) == (key, mailbox, [])
+    assert result.depth == 2 and result.nodes > 0
+    assert result.pv[0] == result.best_move
+
+
+def test_time_limit() -> None:
+    game_state = GameState.from_fen(STARTING_FEN)
+    start = time.perf_counter()
+    result = search(game_state, time_limit_ms=200)
+
+    assert time.perf_counter() - start < 0.5
+    assert result.best_move in game_state.get_valid_moves()
+    assert game_state.move_log == []
+
+
+def test_no_legal_moves() -> None:
+    game_state = GameState.from_fen("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")  # stalemate
+    result = search(game_state, max_depth=2)
+    assert result.best_move is None and result.score == 0
+
+
+def test_depth_one_sees_mate_and_stalemate() -> None:
+    game_state = GameState.from_fen("k7/8/1K6/8/8/8/8/2Q5 w - - 0 1")
+    result = search(game_state, max_depth=1)
+    assert (result.best_move.dest_row, result.best_move.dest_col) == (0, 2)  # Qc8#
+    assert result.score == MATE_SCORE - 1
+
+    # Qc7 stalemates, the queen up doesn't count for anything then
+    game_state._make_move(next(move for move in game_state.get_valid_moves() if move.start == 58 and move.dest == 10))
+    assert Searcher(game_state)._quiescence(-INFINITY, INFINITY, 1) == 0
+
+
+def test_long_tablebase_mates_keep_their_distance_in_the_table() -> None:
+    # A tablebase hit near the search horizon can be a mate further away than MAX_PLY, e.g. KBNK's 66 plies
+    score = MATE_SCORE - MAX_PLY - 66
+    assert _score_from_table(_score_to_table(score, ply=MAX_PLY), ply=3) == score + MAX_PLY - 3
+    assert _score_from_table(_score_to_table(-score, ply=MAX_PLY), ply=3) == -score - MAX_PLY + 3
@@ -0,0 +1,76 @@
+import pytest
+
+from chess.move import Move
+from chess.starting_pieces import STARTING_FEN
+from chess.state import GameState
+from chess.zobrist import position_key
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+POSITION_5 = "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8"
+
+
+@pytest.mark.parametrize("fen", [STARTING_FEN, KIWIPETE, POSITION_5, "8/8/8/3pP3/8/8/k7/7K w - d6 0 42"])
+def test_round_trip(fen: str) -> None:
+    game_state = GameState.from_fen(fen)
+    assert game_state.to_fen() == fen
+    assert game_state.key == position_key(game_state)
+
+
+def test_starting_position() -> None:
+    game_state = GameState()
+    assert game_state.to_fen() == STARTING_FEN
+    assert GameState.from_fen(STARTING_FEN).key == game_state.key
+
+
+def test_clocks_follow_the_moves() -> None:
+    game_state = GameState()
+    for notation in ("e2->e4", "g8->f6", "g1->f3"):
+        game_state.make_move(Move.from_chess_notation(notation=notation, board=game_state.board))
+    assert game_state.to_fen() == "rnbqkb1r/pppppppp/5n2/8/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 2 2"
+
+    game_state.undo_move()
+    game_state.undo_move()
+    assert game_state.to_fen() == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+
+
+def test_clocks_are_optional() -> None:
+    assert GameState.from_fen("4k3/8/8/8/8/8/8/4K3 b -").to_fen() == "4k3/8/8/8/8/8/8/4K3 b - - 0 1"
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        "",
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1",  # 7 ranks
+        "rnbqkbnr/pppppppp/8/8/8/88/RNBQKBNR w KQkq - 0 1",  # 7 ranks, one of them 16 squares long
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR/8 w KQkq - 0 1",  # 9 ranks
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w XYZ - 0 1",
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e3 0 1",  # White to move, the ep square is on rank 6
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR b KQkq e6 0 1",
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e4 0 1",
+        "rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "rnbqkbnr/ppxppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "rnbq1bnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",  # no black king
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1",
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKKNR w kq - 0 1",  # two white kings
+        "P3k3/8/8/8/8/8/8/4K3 w - - 0 1",  # pawn on the last rank
+        "4k3/8/8/8/8/8/8/4K2p b - - 0 1",  # pawn on the first rank
+        "4k3/8/8/8/8/8/4Q3/4K3 w - - 0 1",  # black is in check with white to move
+        "4k3/8/8/8/8/8/8/4K3 w - - -3 1",
+        "4k3/8/8/8/8/8/8/4K3 w - - 0 1.5",
+        "4k3/8/8/8/8/8/8/4K3 w - - x 1",
+    ],
+)
+def test_invalid_fen(fen: str) -> None:
+    with pytest.raises(ValueError):
+        GameState.from_fen(fen)
+
+
+def test_castling_rights_need_the_king_and_rook() -> None:
+    game_state = GameState.from_fen("4k3/8/8/8/8/8/8/4K3 w K - 0 1")  # No rook
+    assert game_state.castling_rights == 0 and game_state.to_fen() == "4k3/8/8/8/8/8/8/4K3 w - - 0 1"
+    assert game_state.key == position_key(game_state)
+    assert all(not move.is_castle for move in game_state.get_valid_moves())
+
+    # The queenside rook moved, the kingside rights stay
+    assert GameState.from_fen("r3k2r/8/8/8/8/8/8/1R2K2R w KQkq - 0 1").to_fen().split()[2] == "Kkq"
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from chess.gui import GUI  # noqa: E402
+from chess.history import GameHistory  # noqa: E402
+from chess.pgn import from_san  # noqa: E402
+from chess.settings import Settings  # noqa: E402
+from chess.sprites import SPRITE_NAMES, _tobytes, load_sprites  # noqa: E402
+from chess.state import GameState  # noqa: E402
+
+
+class _TestSettings(Settings):
+    IMAGE_DIR = os.path.join(os.path.dirname(__file__), "..", "images")
+    SPRITE_CACHE_DIR = None
+
+
+@pytest.fixture
+def gui(monkeypatch):
+    monkeypatch.setenv("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    yield GUI(settings=_TestSettings, state=GameState())
+    pygame.display.quit()
+
+
+def _squares(gui: GUI, rects) -> set:
+    return {(rect.y // gui.square_size) * 8 + rect.x // gui.square_size for rect in rects}
+
+
+def test_draw_repaints_changed_squares(gui) -> None:
+    assert len(gui.draw()) == 64  # First frame paints the whole board
+    assert gui.draw() == []  # Nothing moved
+
+    history = GameHistory(gui.state)
+    history.make_move(from_san(gui.state, "e4"))
+    assert _squares(gui, gui.draw()) == {52, 36}  # e2, e4
+    history.undo()
+    assert _squares(gui, gui.draw()) == {52, 36}
+
+    gui.redraw()
+    assert len(gui.draw()) == 64
+
+
+def test_draw_matches_full_repaint(gui) -> None:
+    state = gui.state
+    gui.draw()
+    for san in ["e4", "d5", "exd5", "Qxd5", "Nc3", "Bg4", "Nf3", "Nc6", "Be2", "O-O-O"]:
+        state._make_move(from_san(state, san))
+        gui.draw()
+    incremental = _tobytes(gui.screen, "RGB")
+
+    gui.redraw()
+    gui.draw()
+    assert _tobytes(gui.screen, "RGB") == incremental
+
+
+def test_sprite_cache(gui, tmp_path) -> None:
+    images = tmp_path / "images"
+    images.mkdir()
+    for name in SPRITE_NAMES:
+        (images / f"{name}.png").write_bytes(open(os.path.join(_TestSettings.IMAGE_DIR, f"{name}.png"), "rb").read())
+    cache = tmp_path / "cache"
+
+    loaded = load_sprites(str(images), 40, cache_dir=str(cache))
+    assert sorted(loaded) == sorted(SPRITE_NAMES)
+    assert (cache / "sprites_40.bin").exists() and not (cache / "sprites_100.bin").exists()
+
+    cached = load_sprites(str(images), 40, cache_dir=str(cache))
+    for name in SPRITE_NAMES:
+        assert cached[name].get_size() == (40, 40)
+        assert _tobytes(cached[name], "RGBA") == _tobytes(loaded[name], "RGBA")
+
+    # Changed images make the cache stale
+    (images / "wKing.png").write_bytes((images / "bKing.png").read_bytes())
+    rebuilt = load_sprites(str(images), 40, cache_dir=str(cache))
+    assert _tobytes(rebuilt["wKing"], "RGBA") == _tobytes(cached["bKing"], "RGBA")
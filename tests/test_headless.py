@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+
+def test_core_imports_without_pygame() -> None:
+    code = (
+        "import sys\n"
+        "from chess.chess_notation import ChessNotationParser\n"
+        "from chess.move import Move\n"
+        "from chess.piece import Piece\n"
+        "from chess.state import GameState\n"
+        "GameState()\n"
+        "assert 'pygame' not in sys.modules, 'pygame was imported'\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_every_game_gets_fresh_pieces() -> None:
+    from chess.state import GameState
+
+    first, second = GameState(), GameState()
+    assert all(a is not b for a, b in zip(first.all_pieces, second.all_pieces))
+    assert len(first) == 0 and first.time_elapsed >= 0
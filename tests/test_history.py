@@ -0,0 +1,97 @@
+import random
+
+from chess.event_handler import EventHandler
+from chess.history import GameHistory
+from chess.state import GameState
+from chess.zobrist import position_key
+
+
+def _play(history: GameHistory, plies: int, seed: int):
+    """ Random game through the history, returns the FEN after each ply """
+    rng = random.Random(seed)
+    fens = [history.state.to_fen()]
+    for _ in range(plies):
+        moves = history.state.get_valid_moves()
+        if len(moves) < 2:  # Stop before the end, make_move exits once the game is over
+            break
+        assert history.make_move(rng.choice(moves))
+        fens.append(history.state.to_fen())
+    return fens
+
+
+def test_undo_redo() -> None:
+    history = GameHistory(GameState())
+    fens = _play(history, plies=40, seed=1)
+    assert history.ply == len(history) == len(fens) - 1
+
+    while history.undo():
+        assert history.state.to_fen() == fens[history.ply]
+    assert history.ply == 0 and len(history) == len(fens) - 1
+    while history.redo():
+        assert history.state.to_fen() == fens[history.ply]
+    assert history.state.key == position_key(history.state)
+
+
+def test_new_move_drops_redo() -> None:
+    history = GameHistory(GameState())
+    _play(history, plies=10, seed=2)
+    for _ in range(4):
+        history.undo()
+    history.make_move(history.state.get_valid_moves()[0])
+    assert history.ply == len(history) == 7
+    assert not history.redo()
+
+
+def test_go_to() -> None:
+    history = GameHistory(GameState.from_fen("8/1P5k/8/8/8/8/5Kp1/8 w - - 0 1"), checkpoint_interval=8)
+    fens = _play(history, plies=300, seed=3)
+    assert len(fens) > 100  # Promotions, and a long game to jump through
+
+    rng = random.Random(4)
+    for ply in [0, len(fens) - 1, 1, 57] + [rng.randrange(len(fens)) for _ in range(30)]:
+        history.go_to(ply)
+        game_state = history.state
+        assert game_state.to_fen() == fens[ply]
+        assert game_state.key == position_key(game_state)
+        assert sorted(piece.square for piece in game_state.all_pieces) == [
+            square for square, piece in enumerate(game_state.mailbox) if piece != "**"
+        ]
+
+    # Undo keeps working from a restored checkpoint
+    history.go_to(len(fens) - 1)
+    history.go_to(len(fens) // 2)
+    for ply in range(len(fens) // 2 - 1, -1, -1):
+        history.undo()
+        assert history.state.to_fen() == fens[ply]
+
+
+def test_event_handler_keys() -> None:
+    event_handler = EventHandler(GameState())
+    event_handler.left_click_square(6, 4)
+    event_handler.left_click_square(4, 4)  # e2-e4
+    after_e4 = event_handler.state.to_fen()
+
+    event_handler.press_key(ord("u"))
+    assert event_handler.state.move_log == []
+    event_handler.press_key(ord("r"))
+    assert event_handler.state.to_fen() == after_e4
+
+
+def test_checkpoints_rebuild_the_logs() -> None:
+    reference = GameHistory(GameState())
+    _play(reference, plies=70, seed=5)
+
+    # A history started on a game in progress picks up its moves
+    history = GameHistory(GameState.from_bytes(reference.state.to_bytes()), checkpoint_interval=8)
+    assert len(history) == history.ply == 70
+
+    history.go_to(0)
+    history.go_to(70)
+    assert sorted(history._checkpoints) == list(range(8, 70, 8))
+    assert all(len(checkpoint) == 7 for checkpoint in history._checkpoints.values())  # Only the position is kept
+    history.go_to(43)  # From the checkpoint at ply 40
+    reference.go_to(43)
+    assert [move.code for move in history.state.move_log] == [move.code for move in reference.state.move_log]
+    entries = [(entry[:4], entry[4].code, getattr(entry[5], "code", None)) for entry in history.state._state_log]
+    expected = [(entry[:4], entry[4].code, getattr(entry[5], "code", None)) for entry in reference.state._state_log]
+    assert entries == expected
@@ -0,0 +1,49 @@
+import random
+from typing import List
+
+import pytest
+
+from chess.move import Move
+from chess.state import GameState
+
+
+def make_undo_valid_moves(game_state: GameState) -> List[Move]:
+    """ The original validation: make every possible move and look for an opponent reply capturing the king """
+    valid_moves = []
+    for move in game_state._get_all_possible_moves_for_color(game_state.current_color):
+        game_state._make_move(move)
+        opponent_moves = game_state._get_all_possible_moves_for_color(game_state.current_color)
+        if not any(o_move.is_check() for o_move in opponent_moves):
+            valid_moves.append(move)
+        game_state.undo_move()
+    return valid_moves
+
+
+def _move_set(moves: List[Move]) -> set:
+    return {(m.start, m.dest, m.promotion, m.is_castle, m.is_en_passant) for m in moves}
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_legal_moves_match_make_undo_filtering(seed: int) -> None:
+    """ Play random games and compare both generators in every position along the way """
+    rng = random.Random(seed)
+    game_state = GameState()
+
+    for _ in range(120):
+        valid_moves = game_state.get_valid_moves()
+        assert _move_set(valid_moves) == _move_set(make_undo_valid_moves(game_state))
+        assert len(valid_moves) == len(_move_set(valid_moves))
+        if not valid_moves:
+            break
+        game_state._make_move(rng.choice(valid_moves))
+
+
+def test_pinned_piece_and_check_evasions() -> None:
+    game_state = GameState()
+    for notation in ("e2->e4", "e7->e5", "d1->h5", "d7->d6", "h5->f7"):
+        game_state._make_move(Move.from_chess_notation(notation=notation, board=game_state.board))
+
+    # Black is in check from the queen on f7, the king has to take it
+    valid_moves = game_state.get_valid_moves()
+    assert [(m.start, m.dest) for m in valid_moves] == [(4, 13)]
+    assert _move_set(valid_moves) == _move_set(make_undo_valid_moves(game_state))
@@ -0,0 +1,49 @@
+from array import array
+
+import pytest
+
+from chess.bitboard import KNIGHT, QUEEN
+from chess.move import CASTLE, PROMOTION, Move, encode_move
+from chess.state import GameState
+from chess.utils import Square
+
+
+def test_packed_move() -> None:
+    game_state = GameState()
+    move = Move.from_chess_notation(notation="e2->e4", board=game_state.board)
+
+    assert move.code == encode_move(52, 36)
+    assert (move.start_row, move.start_col, move.dest_row, move.dest_col) == (6, 4, 4, 4)
+    assert move == Move.from_code(move.code, game_state.mailbox)
+    assert len({move, Move.from_code(move.code, game_state.mailbox)}) == 1
+
+    codes = array("H", (m.code for m in game_state.get_valid_moves()))
+    assert move.code in codes
+
+
+def test_clicked_moves_match_generated_moves() -> None:
+    game_state = GameState.from_fen("4k3/P7/8/8/8/8/8/4K2R w K - 0 1")
+    valid_moves = game_state.get_valid_moves()
+
+    castle = Move(start_square=Square(7, 4), dest_square=Square(7, 6), board=game_state.board)
+    assert castle.code >> 12 == CASTLE
+    assert castle in valid_moves
+
+    promotion = Move(start_square=Square(1, 0), dest_square=Square(0, 0), board=game_state.board, promotion=QUEEN)
+    assert promotion.code >> 12 == PROMOTION + QUEEN - KNIGHT
+    assert promotion.promotion == QUEEN
+    assert promotion in valid_moves
+
+
+def test_make_move_asks_for_the_promotion_after_checking_the_move(monkeypatch: pytest.MonkeyPatch) -> None:
+    game_state = GameState.from_fen("nn2k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+    monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("asked for the promotion of an illegal move"))
+    blocked = Move(start_square=Square(1, 0), dest_square=Square(0, 0), board=game_state.board)
+    game_state.make_move(blocked)
+    assert blocked.promotion is None and not game_state.move_log
+
+    monkeypatch.setattr("builtins.input", lambda prompt: "k")
+    promotion = Move(start_square=Square(1, 0), dest_square=Square(0, 1), board=game_state.board)
+    game_state.make_move(promotion)
+    assert promotion.promotion is None  # The player's move is left alone, the generated one is played
+    assert game_state.to_fen() == "nN2k3/8/8/8/8/8/8/4K3 b - - 0 1"
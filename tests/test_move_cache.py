@@ -0,0 +1,40 @@
+from chess.cache import MoveCache
+from chess.move import Move
+from chess.state import GameState
+
+
+def test_lru_eviction() -> None:
+    cache = MoveCache(max_entries=2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    assert cache.get(1) == "a"  # 1 is now the most recently used
+    cache.put(3, "c")
+
+    assert 2 not in cache
+    assert cache.get(1) == "a" and cache.get(3) == "c"
+    assert cache.get(2) is None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_undo_and_reset_hit_the_cache() -> None:
+    game_state = GameState()
+    starting_moves = game_state.get_valid_moves()
+    game_state.make_move(Move.from_chess_notation(notation="e2->e4", board=game_state.board))
+    game_state.undo_move()
+
+    hits = game_state.move_cache.hits
+    assert game_state.get_valid_moves() == starting_moves
+    assert game_state.move_cache.hits == hits + 1
+
+    # After a reset the pieces are new objects, cached moves have to point at them rather than the old ones
+    game_state.reset_game()
+    for move in game_state.get_valid_moves():
+        assert move.piece_to_move is game_state.mailbox[move.start]
+    assert game_state.move_cache.hits == hits + 2
+
+
+def test_cache_size_is_capped() -> None:
+    game_state = GameState(move_cache_size=3)
+    for notation in ("e2->e4", "e7->e5", "g1->f3", "b8->c6", "f1->c4"):
+        game_state.make_move(Move.from_chess_notation(notation=notation, board=game_state.board))
+    assert len(game_state.move_cache) == 3
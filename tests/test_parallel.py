@@ -0,0 +1,21 @@
+from chess.engine import MATE_SCORE
+from chess.parallel import parallel_search, search_root_move
+from chess.state import GameState
+
+
+def test_parallel_search_finds_mate() -> None:
+    game_state = GameState.from_fen("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1")
+    result = parallel_search(game_state, depth=2, workers=2)
+    assert (result.best_move.dest_row, result.best_move.dest_col) == (0, 3)  # Rd8#
+    assert result.score == MATE_SCORE - 1
+    assert result.nodes > 0
+    assert game_state.move_log == []
+
+
+def test_depth_one_sees_mate_and_stalemate() -> None:
+    game_state = GameState.from_fen("k7/8/1K6/8/8/8/8/2Q5 w - - 0 1")
+    result = parallel_search(game_state, depth=1, workers=2)
+    assert (result.best_move.start, result.best_move.dest) == (58, 2)  # Qc8#
+    assert result.score == MATE_SCORE - 1
+
+    assert search_root_move(game_state.to_fen(), 58 | 10 << 6, depth=1)[0] == 0  # Qc7 stalemates
@@ -0,0 +1,54 @@
+"""
+Perft node counts against the published reference numbers (https://www.chessprogramming.org/Perft_Results).
+Only depths up to PERFT_DEPTH (default 3) run, e.g. PERFT_DEPTH=5 python -m pytest tests/test_perft.py
+"""
+import os
+
+import pytest
+
+from chess.perft import divide, perft
+from chess.starting_pieces import STARTING_FEN
+from chess.state import GameState
+
+MAX_DEPTH = int(os.environ.get("PERFT_DEPTH", 3))
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+POSITION_3 = "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+POSITION_4 = "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"
+POSITION_5 = "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8"
+POSITION_6 = "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10"
+
+REFERENCE_COUNTS = {
+    STARTING_FEN: (20, 400, 8902, 197281, 4865609),
+    KIWIPETE: (48, 2039, 97862, 4085603),
+    POSITION_3: (14, 191, 2812, 43238, 674624),
+    POSITION_4: (6, 264, 9467, 422333),
+    POSITION_5: (44, 1486, 62379, 2103487),
+    POSITION_6: (46, 2079, 89890, 3894594),
+}
+
+CASES = [
+    pytest.param(fen, depth, nodes, id=f"{name}-{depth}")
+    for name, fen in (
+        ("startpos", STARTING_FEN),
+        ("kiwipete", KIWIPETE),
+        ("position3", POSITION_3),
+        ("position4", POSITION_4),
+        ("position5", POSITION_5),
+        ("position6", POSITION_6),
+    )
+    for depth, nodes in enumerate(REFERENCE_COUNTS[fen], start=1)
+    if depth <= MAX_DEPTH
+]
+
+
+@pytest.mark.parametrize("fen, depth, nodes", CASES)
+def test_perft(fen: str, depth: int, nodes: int) -> None:
+    assert perft(GameState.from_fen(fen), depth) == nodes
+
+
+def test_divide_adds_up_to_perft() -> None:
+    state = GameState.from_fen(KIWIPETE)
+    counts = divide(state, 2)
+    assert len(counts) == 48
+    assert sum(counts.values()) == perft(state, 2)
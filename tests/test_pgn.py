@@ -0,0 +1,109 @@
+import gzip
+import io
+import random
+
+import pytest
+
+from chess.pgn import PgnError, PgnWriter, from_san, read_games, to_san
+from chess.state import GameState
+
+IMMORTAL_GAME = """[Event "London"]
+[Site "London ENG"]
+[Date "1851.06.21"]
+[Round "?"]
+[White "Adolf Anderssen"]
+[Black "Lionel Kieseritzky"]
+[Result "1-0"]
+
+1.e4 e5 2.f4 exf4 3.Bc4 Qh4+ 4.Kf1 b5 5.Bxb5 Nf6 6.Nf3 Qh6 7.d3 Nh5 8.Nh4 Qg5
+9.Nf5 c6 10.g4 Nf6 11.Rg1 cxb5 12.h4 Qg6 13.h5 Qg5 14.Qf3 Ng8 15.Bxf4 Qf6
+16.Nc3 Bc5 17.Nd5 Qxb2 18.Bd6 Bxg1 {It is from this move that Black's defeat
+stems.} 19. e5 Qxa1+ 20. Ke2 Na6 21.Nxg7+ Kd8 22.Qf6+ Nxf6 23.Be7# 1-0
+
+[Event "?"]
+[Result "*"]
+
+1. e4 (1. d4 d5 (1... Nf6)) e5 $1 2. Nf3 ; line comment 2. d4
+Nc6 *
+"""
+
+
+def _random_game(seed: int) -> GameState:
+    rng = random.Random(seed)
+    game_state = GameState()
+    for _ in range(rng.randrange(20, 120)):
+        moves = game_state.get_valid_moves()
+        if not moves:
+            break
+        game_state._make_move(rng.choice(moves))
+    return game_state
+
+
+def test_read_games() -> None:
+    games = list(read_games(io.StringIO(IMMORTAL_GAME)))
+    assert len(games) == 2
+
+    headers, moves = games[0]
+    assert headers["White"] == "Adolf Anderssen" and headers["Result"] == "1-0"
+    assert len(moves) == 45 and moves[:3] == ["e4", "e5", "f4"] and moves[-1] == "Be7#"
+    assert games[1][1] == ["e4", "e5", "Nf3", "Nc6"]  # Variations, glyphs and comments skipped
+
+
+def test_replay() -> None:
+    headers, moves = next(read_games(io.StringIO(IMMORTAL_GAME), replay=True))
+    game_state = GameState()
+    for move in moves:
+        game_state._make_move(move)
+    assert game_state.get_valid_moves() == [] and game_state.checkmate
+
+
+def test_illegal_move() -> None:
+    with pytest.raises(PgnError):
+        list(read_games(io.StringIO("1. e4 e5 2. Ke3 *"), replay=True))
+
+
+def test_san() -> None:
+    game_state = GameState.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    for san in ("O-O", "O-O-O", "Nxf7", "Qxf6", "gxh3", "Bxa6", "Rb1", "d6"):
+        assert to_san(game_state, from_san(game_state, san)) == san
+
+    game_state = GameState.from_fen("7k/8/8/8/R7/5N2/8/RN2K3 w - - 0 1")
+    assert to_san(game_state, from_san(game_state, "Nbd2")) == "Nbd2"
+    assert to_san(game_state, from_san(game_state, "R1a3")) == "R1a3"
+    for san in ("Nd2", "Ra3", "Rb2"):
+        with pytest.raises(PgnError):
+            from_san(game_state, san)
+
+
+@pytest.mark.parametrize("gzipped", [False, True])
+def test_write_and_read_back(tmp_path, gzipped: bool) -> None:
+    path = str(tmp_path / ("games.pgn.gz" if gzipped else "games.pgn"))
+    games = [_random_game(seed) for seed in range(6)]
+    fens = [game_state.to_fen() for game_state in games]
+
+    with PgnWriter(path) as writer:
+        for game_state in games:
+            writer.write_game(game_state, headers={"White": "random", "Black": "random"})
+    assert [game_state.to_fen() for game_state in games] == fens  # The writer leaves the states as they were
+
+    if gzipped:
+        with gzip.open(path, "rt") as file:
+            assert file.readline() == '[Event "?"]\n'
+
+    read_back = list(read_games(path, replay=True))
+    assert len(read_back) == len(games)
+    for (headers, moves), game_state in zip(read_back, games):
+        assert headers["White"] == "random"
+        assert [move.code for move in moves] == [move.code for move in game_state.move_log]
+
+
+def test_write_from_fen() -> None:
+    game_state = GameState.from_fen("4k3/8/8/8/8/8/8/R3K3 b Q - 0 30")
+    game_state._make_move(from_san(game_state, "Kd7"))
+    game_state._make_move(from_san(game_state, "O-O-O+"))
+    output = io.StringIO()
+    PgnWriter(output).write_game(game_state)
+
+    text = output.getvalue()
+    assert '[FEN "4k3/8/8/8/8/8/8/R3K3 b Q - 0 30"]' in text
+    assert "30... Kd7 31. O-O-O+ *" in text
@@ -0,0 +1,35 @@
+from chess.state import GameState
+from chess.utils import EMPTY_SQUARE, Color
+
+POSITION_4 = "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"  # promotions on both sides
+
+
+def _assert_index_matches_board(game_state: GameState) -> None:
+    on_board = [piece for piece in game_state.mailbox if piece != EMPTY_SQUARE]
+    for side in (0, 1):
+        pieces = [piece for piece in on_board if piece.side == side]
+        assert sorted(map(id, game_state.pieces[side])) == sorted(map(id, pieces))
+        assert game_state.material[side] == sum(piece.value for piece in pieces)
+        assert game_state.mailbox[game_state.king_squares[side]].name[1:] == "King"
+
+
+def test_piece_index_follows_make_and_undo() -> None:
+    game_state = GameState.from_fen(POSITION_4)
+    _assert_index_matches_board(game_state)
+
+    for move in game_state.get_valid_moves():
+        game_state._make_move(move)
+        _assert_index_matches_board(game_state)
+        for reply in game_state.get_valid_moves():
+            game_state._make_move(reply)
+            _assert_index_matches_board(game_state)
+            game_state.undo_move()
+        game_state.undo_move()
+        _assert_index_matches_board(game_state)
+
+
+def test_king_lookup() -> None:
+    game_state = GameState()
+    assert game_state.king(Color.WHITE).pos_chess_notation == "e1"
+    assert game_state.king(Color.BLACK).pos_chess_notation == "e8"
+    assert len(game_state.all_pieces) == 32
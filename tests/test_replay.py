@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from chess.pgn import PgnWriter, from_san
+from chess.replay import main, read_corpus, replay_corpus, validate_game
+from chess.state import GameState
+
+
+def _write_corpus(path: str, games: int) -> None:
+    rng = random.Random(7)
+    with PgnWriter(path) as writer:
+        for _ in range(games):
+            game_state = GameState()
+            for _ in range(rng.randrange(10, 80)):
+                moves = game_state.get_valid_moves()
+                if not moves:
+                    break
+                game_state._make_move(rng.choice(moves))
+            writer.write_game(game_state)
+        writer.file.write('[Result "1-0"]\n\n1. e4 e5 2. Ke3 Nc6 1-0\n\n')  # Illegal 3rd ply
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_replay_corpus(tmp_path, workers: int) -> None:
+    path = str(tmp_path / "corpus.pgn.gz")
+    _write_corpus(path, games=12)
+    chunks = []
+    reports = list(replay_corpus(read_corpus([path]), workers=workers, chunk_size=5, on_chunk=chunks.append))
+
+    assert [report.index for report in reports] == list(range(13))
+    assert [len(chunk) for chunk in chunks] == [5, 5, 3]
+    assert all(report.error is None and report.result == report.final_result for report in reports[:12])
+    assert reports[12].plies == 2 and reports[12].error.startswith("ply 3: 'Ke3' isn't legal")
+
+
+def test_main(tmp_path, capsys) -> None:
+    path = str(tmp_path / "corpus.pgn")
+    _write_corpus(path, games=3)
+    assert main([path, "--workers", "1", "--errors", "--quiet"]) == 1
+
+    output = capsys.readouterr().out
+    assert output.startswith("game 4: ply 3:")
+    assert "4 games" in output and "1 illegal" in output
+
+
+def test_unexpected_error_is_reported_on_the_game(monkeypatch) -> None:
+    def broken_from_san(state, san):
+        if san == "Nf3":
+            raise AttributeError("'str' object has no attribute 'code'")
+        return from_san(state, san)
+
+    monkeypatch.setattr("chess.replay.from_san", broken_from_san)
+    report = validate_game(4, {"Result": "*"}, ["e4", "e5", "Nf3", "Nc6"])
+    assert report.index == 4 and report.plies == 2
+    assert report.error == "ply 3: unexpected AttributeError: 'str' object has no attribute 'code'"
+    assert validate_game(5, {}, ["d4", "d5"]).error is None
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+from chess.server import GameServer
+
+
+async def _exchange(requests):
+    game_server = GameServer()
+    server = await game_server.serve("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    responses = []
+    for request in requests:
+        if callable(request):
+            request = request(responses)
+        writer.write((request if isinstance(request, str) else json.dumps(request)).encode() + b"\n")
+        await writer.drain()
+        responses.append(json.loads(await reader.readline()))
+
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    game_server.executor.shutdown()
+    return game_server, responses
+
+
+def test_game_session() -> None:
+    def game(responses):
+        return responses[0]["game"]
+
+    requests = [{"op": "new_game", "id": 7}]
+    for san in ("e4", "e5", "Bc4", "Nc6", "Qh5", "Nf6", "Qxf7#"):
+        requests.append(lambda responses, san=san: {"op": "move", "game": game(responses), "move": san})
+    requests += [
+        lambda responses: {"op": "legal_moves", "game": game(responses)},
+        lambda responses: {"op": "undo", "game": game(responses)},
+        lambda responses: {"op": "move", "game": game(responses), "move": "Qxf8"},
+        lambda responses: {"op": "close", "game": game(responses)},
+        lambda responses: {"op": "state", "game": game(responses)},
+    ]
+    game_server, responses = asyncio.run(_exchange(requests))
+
+    assert responses[0]["ok"] and responses[0]["id"] == 7 and responses[0]["status"] == "playing"
+    assert [response["move"] for response in responses[1:8]] == ["e4", "e5", "Bc4", "Nc6", "Qh5", "Nf6", "Qxf7#"]
+    assert responses[7]["status"] == "checkmate" and responses[7]["turn"] == "b" and responses[7]["ply"] == 7
+    assert responses[8] == {"ok": True, "moves": []}
+    assert responses[9]["status"] == "playing" and responses[9]["ply"] == 6
+    assert not responses[10]["ok"] and "isn't legal" in responses[10]["error"]
+    assert responses[11] == {"ok": True} and responses[12]["ok"] is False
+    assert game_server.sessions == {}
+
+
+def test_bad_requests() -> None:
+    _, responses = asyncio.run(
+        _exchange(
+            [
+                "not json",
+                {"op": "fly"},
+                {"op": "new_game", "fen": "8/8/8 w"},
+                {"op": "new_game", "fen": "4k3/8/8/8/8/8/8/4K2R w K - 0 1"},
+                {"op": "legal_moves", "game": "1"},
+                {"op": "undo", "game": "1"},
+            ]
+        )
+    )
+    assert [response["ok"] for response in responses] == [False, False, False, True, True, False]
+    assert "O-O" in responses[4]["moves"] and len(responses[4]["moves"]) == 15
+    assert responses[5]["error"] == "no move to undo"
+
+
+def test_concurrent_clients() -> None:
+    async def client(port: int) -> str:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b'{"op": "new_game"}\n')
+        game = json.loads(await reader.readline())["game"]
+        for san in ("Nf3", "Nf6", "Ng1", "Ng8"):
+            writer.write(json.dumps({"op": "move", "game": game, "move": san}).encode() + b"\n")
+            await writer.drain()
+            response = json.loads(await reader.readline())
+        writer.close()
+        return response["fen"]
+
+    async def run():
+        game_server = GameServer()
+        server = await game_server.serve("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        fens = await asyncio.gather(*(client(port) for _ in range(50)))
+        for _ in range(100):  # The games go once the server has seen the clients disconnect
+            if not game_server.sessions:
+                break
+            await asyncio.sleep(0.01)
+        server.close()
+        await server.wait_closed()
+        return game_server, fens
+
+    game_server, fens = asyncio.run(run())
+    assert set(fens) == {"rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 4 3"}
+    assert game_server.sessions == {}
+
+
+def test_unexpected_error_keeps_the_connection(monkeypatch) -> None:
+    def broken(state):
+        raise AttributeError("'str' object has no attribute 'code'")
+
+    monkeypatch.setattr("chess.server._legal_moves", broken)
+    _, responses = asyncio.run(
+        _exchange([{"op": "new_game"}, {"op": "legal_moves", "game": "1", "id": 3}, {"op": "state", "game": "1"}])
+    )
+    assert responses[1]["ok"] is False and responses[1]["id"] == 3 and "AttributeError" in responses[1]["error"]
+    assert responses[2]["ok"] and responses[2]["status"] == "playing"
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from chess.state import GameState
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+def _play_random(game_state: GameState, seed: int, plies: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(plies):
+        moves = game_state.get_valid_moves()
+        if not moves:
+            break
+        game_state._make_move(rng.choice(moves))
+
+
+@pytest.mark.parametrize("fen", [None, KIWIPETE, "8/P6k/8/8/8/8/6Kp/8 w - - 7 60"])
+def test_round_trip(fen) -> None:
+    for seed in range(5):
+        game_state = GameState(fen=fen)
+        _play_random(game_state, seed, plies=60)
+        data = game_state.to_bytes()
+        assert len(data) == 49 + 8 * len(game_state.move_log)
+
+        restored = GameState.from_bytes(data)
+        assert restored.to_fen() == game_state.to_fen()
+        assert restored.key == game_state.key
+        assert [move.code for move in restored.move_log] == [move.code for move in game_state.move_log]
+        assert (restored.checkmate, restored.stalemate) == (game_state.checkmate, game_state.stalemate)
+
+        # The history comes back too
+        for _ in range(len(game_state.move_log)):
+            game_state.undo_move()
+            restored.undo_move()
+            assert restored.to_fen() == game_state.to_fen()
+            assert restored.key == game_state.key
+
+
+def test_game_over_flags() -> None:
+    game_state = GameState.from_fen("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1")
+    game_state._make_move(game_state.get_valid_moves()[0])
+    game_state.get_valid_moves()
+    assert GameState.from_bytes(game_state.to_bytes()).checkmate is False
+
+    game_state = GameState.from_fen("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1")
+    game_state.make_move(next(move for move in game_state.get_valid_moves() if move.dest == 3))  # Rd8#
+    assert game_state.checkmate
+    restored = GameState.from_bytes(game_state.to_bytes())
+    assert restored.checkmate and not restored.stalemate
+
+
+@pytest.mark.parametrize("data", [b"", b"\x01" + bytes(48), bytes([2]) + bytes(48), GameState().to_bytes() + b"\x00"])
+def test_bad_snapshot(data: bytes) -> None:
+    with pytest.raises(ValueError):
+        GameState.from_bytes(data)
+
+
+def test_to_bytes_leaves_the_game_alone() -> None:
+    game_state = GameState(fen=KIWIPETE)
+    _play_random(game_state, seed=1, plies=40)
+    mailbox, move_log, state_log = list(game_state.mailbox), list(game_state.move_log), list(game_state._state_log)
+    game_state.to_bytes()
+    assert all(a is b for a, b in zip(game_state.mailbox, mailbox))
+    assert game_state.move_log == move_log and all(a is b for a, b in zip(game_state._state_log, state_log))
+
+
+def test_snapshot_key_mismatch() -> None:
+    data = bytearray(GameState().to_bytes())
+    data[39] ^= 1  # Low byte of the key
+    with pytest.raises(ValueError):
+        GameState.from_bytes(bytes(data))
+
+
+@pytest.mark.parametrize(
+    "move",
+    [
+        52 | 36 << 6 | (64 << 4 | 12 << 11) << 16,  # Moved piece code out of range
+        52 | 36 << 6 | (64 << 4 | 14 << 15) << 16,  # Captured piece code out of range
+        52 | 36 << 6 | (100 << 4) << 16,  # En passant square out of range
+        60 | 36 << 6 | 2 << 12 | (15 | 64 << 4 | 5 << 11) << 16,  # Castling to e4
+    ],
+)
+def test_bad_undo_record_in_snapshot(move: int) -> None:
+    data = bytearray(GameState().to_bytes())
+    data[47:49] = (1).to_bytes(2, "little")  # One ply
+    with pytest.raises(ValueError):
+        GameState.from_bytes(bytes(data) + move.to_bytes(8, "little"))
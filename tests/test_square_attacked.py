@@ -0,0 +1,30 @@
+from chess.state import GameState
+from chess.utils import Color
+
+
+def _attacked_by_move_generation(game_state: GameState, square: int, color: Color) -> bool:
+    """ Reference: does any piece of the color attack the square """
+    return any(
+        piece.attacks(game_state.occupied) >> square & 1
+        for piece in game_state.all_pieces
+        if piece.color == color
+    )
+
+
+def test_is_square_attacked_matches_piece_attacks() -> None:
+    for fen in (
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    ):
+        game_state = GameState.from_fen(fen)
+        for color in (Color.WHITE, Color.BLACK):
+            for square in range(64):
+                expected = _attacked_by_move_generation(game_state, square, color)
+                assert game_state.is_square_attacked(square, color) == expected
+
+
+def test_in_check() -> None:
+    assert not GameState().in_check()
+    assert GameState.from_fen("4k3/8/8/8/8/8/8/4K2r w - - 0 1").in_check()
+    assert not GameState.from_fen("4k3/8/8/8/8/8/8/R3K3 b - - 0 1").in_check()
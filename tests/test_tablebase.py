@@ -0,0 +1,82 @@
+import mmap
+
+import pytest
+
+from chess.engine import MATE_SCORE, search
+from chess.move import Move
+from chess.state import GameState
+from chess.tablebase import Tablebase, TablebaseResult, generate_files
+
+
+@pytest.fixture(scope="module")
+def tablebase(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("tablebases"))
+    generate_files(["KPK"], directory)  # Along with KQK and KRK, which it promotes into
+    with Tablebase(directory) as tablebase:
+        yield tablebase
+
+
+@pytest.mark.parametrize(
+    "fen, result",
+    [
+        ("8/8/8/8/8/8/8/KQ1k4 b - - 0 1", (-1, 14)),
+        ("8/8/8/8/8/8/8/K1Qk4 b - - 0 1", (0, 0)),  # Takes the queen
+        ("k7/2Q5/1K6/8/8/8/8/8 b - - 0 1", (0, 0)),  # Stalemate
+        ("k7/1Q6/1K6/8/8/8/8/8 b - - 0 1", (-1, 0)),  # Mated
+        ("k7/8/1K6/8/8/8/8/7R w - - 0 1", (1, 1)),
+        ("kq1K4/8/8/8/8/8/8/8 w - - 0 1", (-1, 14)),  # Black's queen, the tables are mirrored
+        ("8/4k3/8/4K3/4P3/8/8/8 w - - 0 1", (0, 0)),  # Black has the opposition
+        ("8/4k3/8/4K3/4P3/8/8/8 b - - 0 1", (-1, 28)),
+        ("8/8/8/8/4p3/4k3/8/4K3 b - - 0 1", (1, 21)),  # King in front of the pawn on the sixth rank
+        ("8/8/8/8/8/8/8/K1k2BN1 w - - 0 1", None),  # No KBNK table
+        ("4k3/8/8/8/8/8/8/R3K3 w Q - 0 1", None),  # Castling isn't in the tables
+    ],
+)
+def test_probe(tablebase: Tablebase, fen: str, result) -> None:
+    assert tablebase.probe(GameState.from_fen(fen)) == (None if result is None else TablebaseResult(*result))
+
+
+def test_agrees_with_move_generation(tablebase: Tablebase) -> None:
+    # Every position is scored one ply better than the best of the positions its legal moves lead to
+    for fen in ("8/8/3k4/8/8/2K5/3P4/8 w - - 0 1", "8/8/8/8/4k3/8/8/R3K3 w - - 0 1", "8/8/8/8/8/2k5/8/K2Q4 b - - 0 1"):
+        game_state = GameState.from_fen(fen)
+        result = tablebase.probe(game_state)
+        replies = []
+        for code in game_state.get_valid_move_codes():
+            game_state._make_move(Move.from_code(code, game_state.mailbox))
+            replies.append(tablebase.probe(game_state) or TablebaseResult(wdl=0, plies=0))  # Captures draw
+            game_state.undo_move()
+
+        if any(reply.wdl == -1 for reply in replies):
+            expected = (1, min(reply.plies for reply in replies if reply.wdl == -1) + 1)
+        elif all(reply.wdl == 1 for reply in replies):
+            expected = (-1, max(reply.plies for reply in replies) + 1)
+        else:
+            expected = (0, 0)
+        assert result == expected
+
+
+def test_search_with_tablebase(tablebase: Tablebase) -> None:
+    game_state = GameState.from_fen("8/8/8/8/4k3/8/8/R3K3 w - - 0 1")
+    result = search(game_state, max_depth=2, tablebase=tablebase)
+    mate_plies = tablebase.probe(game_state).plies
+    assert result.score == MATE_SCORE - mate_plies
+
+    # The move played keeps the shortest mate
+    game_state._make_move(result.best_move)
+    assert tablebase.probe(game_state) == TablebaseResult(wdl=-1, plies=mate_plies - 1)
+
+
+def test_bad_table_file(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    generate_files(["KQK"], str(tmp_path))
+    (tmp_path / "KRK.tb").write_bytes(b"not a table")
+    opened, mmap_class = [], mmap.mmap
+
+    def tracked_mmap(*args, **kwargs) -> mmap.mmap:
+        opened.append(mmap_class(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(mmap, "mmap", tracked_mmap)
+    with pytest.raises(ValueError):
+        Tablebase(str(tmp_path))
+    assert len(opened) == 2 and all(data.closed for data in opened)  # KQK was closed along with the bad KRK
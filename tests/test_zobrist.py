@@ -0,0 +1,37 @@
+import random
+
+from chess.move import Move
+from chess.state import GameState
+from chess.zobrist import position_key
+
+
+def test_key_is_updated_incrementally() -> None:
+    rng = random.Random(7)
+    game_state = GameState.from_fen("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1")
+    keys = [game_state.key]
+
+    for _ in range(60):
+        valid_moves = game_state.get_valid_moves()
+        if not valid_moves:
+            break
+        game_state._make_move(rng.choice(valid_moves))
+        assert game_state.key == position_key(game_state)
+        keys.append(game_state.key)
+
+    while game_state.move_log:
+        keys.pop()
+        game_state.undo_move()
+        assert game_state.key == keys[-1]
+
+
+def test_transposition_has_the_same_key() -> None:
+    game_state = GameState()
+    starting_key = game_state.key
+    for notation in ("g1->f3", "g8->f6", "f3->g1", "f6->g8"):
+        game_state.make_move(Move.from_chess_notation(notation=notation, board=game_state.board))
+    assert game_state.key == starting_key
+
+    game_state.make_move(Move.from_chess_notation(notation="e2->e4", board=game_state.board))
+    assert game_state.key != starting_key
+    game_state.reset_game()
+    assert game_state.key == starting_key